@@ -1,29 +1,53 @@
 import os
-import tkinter as tk
-from tkinter import filedialog
 from datetime import datetime
+import atexit
 import glob
 import shutil
+import time
 
 from dotenv import load_dotenv
 from rich import print
 from rich.prompt import Prompt
 
+try:
+    import tkinter as tk
+    from tkinter import filedialog
+except ImportError:  # Python built without Tk; only the source drive dialog needs it
+    tk = filedialog = None
 
 from messageoperations import MessagingService
 import userlist
-from checksumoperations import ChecksumService
-from metadataoperations import WavHeaderRewrite
-from postoperations import PostBackupOperations
+from checksumoperations import ChecksumService, AUDIO_DIGEST
+from checksumcache import default_checksum_cache
+from metadataoperations import WavHeaderRewrite, BLANKED_BEXT_FIELDS, WAV_HEADER_WRITER
+from riffchunks import plan_header_rewrite, verify_header_rewrite, HeaderRewritePlan
+from postoperations import PostBackupOperations, ACCESS_ENCODE_WORKERS
 from drivemirroroperations import DriveMirror
+from copyoperations import copy2
+from transferoperations import transfer_file, transfer_files, TRANSFER_MODE
+from pipeline import run_pipeline, Stage, BACKUP_PIPELINE, PIPELINE_WORKERS
 from progressbar import progress_bar, cycling_progress
 from logging_module import logger
+from metrics import metrics
 
 load_dotenv()
 
-root = tk.Tk()
-root.withdraw()
-root.attributes("-topmost", True)
+_tk_root = None
+
+
+def tk_root():
+    """Return the hidden, topmost Tk root used by the file dialog, creating it on first use.
+
+    Created lazily so the module can be imported headless (e.g. by the benchmarks).
+    """
+    global _tk_root
+    if tk is None:
+        raise ValueError("tkinter is not available; cannot show the source drive dialog")
+    if _tk_root is None:
+        _tk_root = tk.Tk()
+        _tk_root.withdraw()
+        _tk_root.attributes("-topmost", True)
+    return _tk_root
 
 
 class BackupFileService:
@@ -41,8 +65,15 @@ class BackupFileService:
         self.staging_file_list = None
         self.batch_copy = None
         self.mirror_in_progress = False
-
-        self.cs = ChecksumService()
+        self.pipeline = BACKUP_PIPELINE  # stream files through the post-copy stages
+        self.staging_rewrite = os.getenv("STAGING_HEADER_REWRITE", "false").lower() == "true"  # rewrite headers while copying to staging
+        if self.staging_rewrite and WAV_HEADER_WRITER != "native":  # only the native writer can rewrite during a copy
+            logger.warning(f"STAGING_HEADER_REWRITE ignored with WAV_HEADER_WRITER={WAV_HEADER_WRITER}; headers are rewritten after the copy")
+            self.staging_rewrite = False
+        self.transfer_mode = TRANSFER_MODE  # how staged files reach ROOT_BACKUP (see transferoperations)
+        self.rewritten_in_staging = set()  # staged WAVs whose header and checksums are already final
+
+        self.cs = ChecksumService(cache=default_checksum_cache())
         self.whr = WavHeaderRewrite()
         self.ms = MessagingService()
         self.pbo = PostBackupOperations(self.STAGING_LOCATION)
@@ -82,6 +113,7 @@ class BackupFileService:
 
         Prompt.ask(self.ms.welcome_messgage)
 
+        tk_root()
         try:
             source_drive_select = filedialog.askdirectory(initialdir="/media/soundarchive/")
         except FileNotFoundError:
@@ -157,6 +189,7 @@ class BackupFileService:
 
             print(self.ms.copy_files_to_staging)
 
+            copy_start = time.perf_counter()
             for index, file in enumerate(file_list):
                 self.progress_bar(index, len(file_list))
                 staging_file_copy = os.path.join(
@@ -165,24 +198,27 @@ class BackupFileService:
                 if file.endswith(".md5"):
                     pass
                 elif file.endswith(".wav"):
+                    if self.staging_rewrite and self.copy_rewrite_to_staging(file, staging_file_copy):
+                        continue
+
                     md5_file_name = f"{file}.md5"
-                    
-                    if os.path.exists(md5_file_name):
-                        self.cs.file_checksum_generate(file)
-                    else:
-                        self.cs.file_checksum_generate(file)
-                        self.cs.write_checksum_to_file(file, md5_file_name)
-                        logger.info(f"Generated checksum for {file}")
 
-                    try:
-                        shutil.copy2(file, staging_file_copy)
+                    try:  # single read pass: copy to staging + checksum source (file and audio payload)
+                        self.cs.file_copy_and_checksum(file, staging_file_copy)
                         logger.info(f"{file} copied to staging area")
                     except Exception as e:
                         logger.warning(f"Error copying file: {e}")
                         raise ValueError(f"Error copying file: {e}")
-                    
+
+                    if AUDIO_DIGEST in self.cs.file_digests:
+                        self.cs.write_audio_checksum(staging_file_copy)
+
+                    if not os.path.exists(md5_file_name):
+                        self.cs.write_checksum_to_file(file, md5_file_name)
+                        logger.info(f"Generated checksum for {file}")
+
                     try:
-                        shutil.copy2(md5_file_name, f"{staging_file_copy}.md5")
+                        copy2(md5_file_name, f"{staging_file_copy}.md5")
                         logger.info(f"{md5_file_name} copied to staging area")
                     except Exception as e:
                         logger.warning(f"Error copying file: {e}")
@@ -193,10 +229,12 @@ class BackupFileService:
                 
                 else:
                     try:
-                        shutil.copy2(file, staging_file_copy)
+                        with metrics.timer("copy", file, os.path.getsize(file)):
+                            copy2(file, staging_file_copy)
                         logger.info(f"{file} copied to staging area")
                     except Exception as e:
                         logger.warning(f"Error copying file: {e}")
+            metrics.record_wall("copy", time.perf_counter() - copy_start)
 
             if self.cs.failed_files != []:
                 logger.critical(
@@ -211,57 +249,147 @@ Failed Files: {len(self.cs.failed_files)}; {self.cs.failed_files}"""
                 print(self.ms.checksum_pass)
                 logger.info(f"Checksum verification passed for all files")
 
+    def copy_rewrite_to_staging(self, file, staging_file_copy):
+        """Copy a WAV to staging with its normalised header applied on the way.
+
+        One read of the source: its MD5 is checked against the engineer's .md5
+        (or written to the source if there is none, as for a plain copy),
+        while the staged file's checksums are computed from the rewritten
+        stream and written next to it, so post-copy operations skip the file.
+
+        Returns:
+            bool: False if the header cannot be rewritten natively (the file
+                is then copied as usual and rewritten after the copy).
+        Raises:
+            ValueError: If the copy fails or the staged header does not verify.
+        """
+        whr = WavHeaderRewrite()
+        try:
+            whr.file_bext_export(file)
+            info_updates = whr.info_updates(self.engineer_name)
+            if info_updates is None:  # nothing to rewrite; a plain copy
+                plan = HeaderRewritePlan([], None, b"", os.path.getsize(file))
+            else:
+                plan = plan_header_rewrite(file, info_updates, BLANKED_BEXT_FIELDS)
+        except (ValueError, OSError) as e:
+            logger.warning(f"Header of {file} will be rewritten after copying. {e}")
+            return False
+
+        source_checksum = self.cs.file_copy_rewrite_and_checksum(file, staging_file_copy, plan)
+        logger.info(f"{file} copied to staging area with header rewritten")
+
+        md5_file_name = f"{file}.md5"
+        if os.path.exists(md5_file_name):
+            if not self.cs.sidecar_matches(file, source_checksum):
+                self.cs.failed_files.append(os.path.basename(file))
+            logger.info(f"Checksum verification check for {file}")
+        else:
+            self.cs.write_checksum_to_file(file, md5_file_name, source_checksum)
+            logger.info(f"Generated checksum for {file}")
+
+        self.cs.write_checksum_to_file(staging_file_copy, f"{staging_file_copy}.md5", self.cs.file_checksum)
+        self.cs.write_extra_checksums(staging_file_copy, self.cs.file_digests)
+        if AUDIO_DIGEST in self.cs.file_digests:
+            self.cs.write_audio_checksum(staging_file_copy)
+
+        if info_updates is not None:
+            problems = verify_header_rewrite(staging_file_copy, info_updates, BLANKED_BEXT_FIELDS)
+            if problems != []:
+                logger.critical(f"Header rewrite verification failed for {staging_file_copy}. {problems}")
+                raise ValueError(f"Header rewrite verification failed for {staging_file_copy}. {problems}")
+        self.rewritten_in_staging.add(staging_file_copy)
+        return True
+
     def drive_eject_request(self):
         print(self.ms.eject_drive)
 
         logger.info(f"{self.source_directory} ejected drive")
 
-    def post_copy_operations(self):
-        logger.info(f"post_copy_operations started for {self.engineer_name}")
-
-        print(self.ms.post_copy_operations)
+    def prepare_staged_files(self):
+        """Delete the checksums copied to staging and list the staged files (sidecars excluded).
 
-        self.cs.delete_exisiting_checksums(self.STAGING_LOCATION)
+        Checksums of WAVs rewritten during the staging copy are already final and kept.
+        """
+        self.cs.delete_exisiting_checksums(self.STAGING_LOCATION, keep=self.rewritten_in_staging)
         logger.info(f"Deleted existing checksums in {self.STAGING_LOCATION}")
 
         try:
-            self.staging_file_list = glob.glob(self.STAGING_LOCATION + "/*.*")
+            self.staging_file_list = [
+                file
+                for file in glob.glob(self.STAGING_LOCATION + "/*.*")
+                if not self.cs.is_checksum_sidecar(file)
+            ]
         except FileNotFoundError:
             logger.critical(f"Staging area not found. Exiting.")
             raise ValueError(FileNotFoundError)
 
+    @metrics.stage("post_copy")
+    def post_copy_operations(self):
+        logger.info(f"post_copy_operations started for {self.engineer_name}")
+
+        print(self.ms.post_copy_operations)
+
+        self.prepare_staged_files()
+
+        wav_files = []
         for index, file in enumerate(self.staging_file_list):
             self.progress_bar(index, len(self.staging_file_list))
-            if file.endswith(".wav"):
+            if file.endswith(".wav") and file not in self.rewritten_in_staging:
                 wav_file = file
                 self.whr.file_bext_export(wav_file)
                 logger.info(f"self.whr.file_bext_export completed for ({wav_file})")
 
                 self.whr.file_info_import(wav_file, self.engineer_name)
                 logger.info(f"self.whr.file_info_import completed for ({wav_file})")
-
-                self.cs.file_checksum_generate(wav_file)
-                self.cs.write_checksum_to_file(wav_file, f"{wav_file}.md5")
-                logger.info(f"New checksum generated for ({wav_file})")
-
+                wav_files.append(wav_file)
+
+        for index, result in enumerate(self.cs.batch_checksum_generate(wav_files, audio=True)):
+            self.progress_bar(index, len(wav_files))
+            if result.error is not None:
+                raise ValueError(f"Error generating checksum for {result.file}. {result.error}")
+            self.verify_audio_checksum(result.file, result.digests)
+            self.cs.write_checksum_to_file(result.file, f"{result.file}.md5", result.checksum)
+            self.cs.write_extra_checksums(result.file, result.digests)
+            logger.info(f"New checksum generated for ({result.file})")
+
+    @metrics.stage("encode")
     def generate_access_files(self):
         logger.info(f"generate_access_files started for {self.engineer_name}")
 
         print(self.ms.generate_access_files)
-        for index, file in enumerate(self.staging_file_list):
-            self.progress_bar(index, len(self.staging_file_list))
-            if file.endswith(".wav"):
-                wav_file = file
-                self.pbo.get_shelfmark(wav_file)
-                logger.info(f"self.pbo.get_shelfmark completed for ({wav_file})")
+        wav_files = [file for file in self.staging_file_list if file.endswith(".wav")]
+        failed_files = []
+        for index, result in enumerate(self.pbo.batch_access_file_generate(wav_files)):
+            self.progress_bar(index, len(wav_files))
+            if result.error is None:
+                logger.info(f"self.pbo.access_file_generate completed for ({result.wav_file})")
+            else:
+                print(f"[bold red]Access file failed for {os.path.basename(result.wav_file)}:[/bold red] {result.error}")
+                failed_files.append(os.path.basename(result.wav_file))
 
-                self.pbo.access_file_generate(wav_file)
-                logger.info(f"self.pbo.access_file_generate completed for ({wav_file})")
+        if failed_files != []:
+            raise ValueError(f"{len(failed_files)} access files could not be generated: {failed_files}")
 
+    @metrics.stage("move")
     def move_files_to_backup(self):
         logger.info(f"move_files_to_backup started for {self.engineer_name}")
 
         print(self.ms.move_files_to_backup)
+        self.prepare_batch_directory()
+
+        failed_files = []
+        for index, result in enumerate(transfer_files(self.staging_file_list, self.batch_copy, self.cs, mode=self.transfer_mode)):
+            self.progress_bar(index, len(self.staging_file_list))
+            metrics.record("move", result.source, result.bytes, result.elapsed, result.error)
+            if result.error is not None:
+                failed_files.append(os.path.basename(result.source))
+
+        if failed_files != []:
+            logger.critical(f"Error moving files: {failed_files}")
+            raise ValueError(f"Error moving files: {failed_files} remain in staging")
+
+    def prepare_batch_directory(self):
+        """Create the next numbered batch directory for the engineer and set batch_copy."""
         copy_location = os.path.join(self.ROOT_BACKUP, self.engineer_name)
 
         try:
@@ -298,20 +426,120 @@ Failed Files: {len(self.cs.failed_files)}; {self.cs.failed_files}"""
             logger.critical(f"Error creating batch directory: {e}")
             raise ValueError(f"Error creating batch directory: {e}")
 
-        for index, staged_file in enumerate(self.staging_file_list):
-            self.progress_bar(index, len(self.staging_file_list))
-            try:
-                shutil.move(staged_file, self.batch_copy)
-                logger.info(f"{staged_file} moved to {self.batch_copy}")
-                if os.path.exists(f"{staged_file}.md5"):
-                    shutil.move(f"{staged_file}.md5", self.batch_copy)
-                else:
-                    pass
-            except Exception as e:
-                logger.critical(f"Error moving file: {e}")
-                raise ValueError(f"Error moving file: {e}")
+    def move_file_to_backup(self, staged_file):
+        """Move a staged file and its checksum sidecars into the batch directory (see transferoperations)."""
+        result = transfer_file(
+            staged_file,
+            self.batch_copy,
+            self.cs.checksum_sidecars(staged_file),
+            self.cs.algorithms,
+            self.cs.cache,
+            self.transfer_mode,
+        )
+        metrics.record("move", staged_file, result.bytes, result.elapsed, result.error)
+        if result.error is not None:
+            raise ValueError(f"Error moving file: {result.error}")
+
+    def rewrite_header(self, wav_file):
+        """Normalise a staged WAV's header metadata (safe to run concurrently)."""
+        if wav_file in self.rewritten_in_staging:
+            return
+        whr = WavHeaderRewrite()  # holds per-file results, so one per call
+        whr.file_bext_export(wav_file)
+        whr.file_info_import(wav_file, self.engineer_name)
+        logger.info(f"Header rewrite completed for ({wav_file})")
+
+    def write_new_checksums(self, wav_file):
+        """Hash a rewritten WAV and write its .md5 (and extra) sidecars."""
+        if wav_file in self.rewritten_in_staging:
+            return
+        digests = self.cs.generate_digests(wav_file, audio=True)
+        self.verify_audio_checksum(wav_file, digests)
+        self.cs.write_checksum_to_file(wav_file, f"{wav_file}.md5", digests["md5"])
+        self.cs.write_extra_checksums(wav_file, digests)
+        logger.info(f"New checksum generated for ({wav_file})")
+
+    def verify_audio_checksum(self, wav_file, digests):
+        """Check a rewritten WAV's audio payload against the digest taken when it was staged.
+
+        The header rewrite must leave the audio untouched, so its MD5 still
+        matches the .audio.md5 written during the copy (one is written now if
+        there was none).
+
+        Raises:
+            ValueError: If the audio payload has changed.
+        """
+        if AUDIO_DIGEST not in digests:
+            return
+        matches = self.cs.audio_sidecar_matches(wav_file, digests[AUDIO_DIGEST])
+        if matches is None:
+            self.cs.write_audio_checksum(wav_file, digests[AUDIO_DIGEST])
+        elif not matches:
+            logger.critical(f"Audio payload of {wav_file} changed during the header rewrite")
+            raise ValueError(f"Audio payload of {wav_file} changed during the header rewrite")
+
+    def generate_access_file(self, wav_file):
+        """Encode a WAV's access copy into its MSO_STORE collection directory."""
+        collection_no = self.pbo.get_shelfmark(wav_file)
+        self.pbo.access_file_generate(wav_file, collection_no)
+        logger.info(f"Access file generated for ({wav_file})")
+
+    @metrics.stage("pipeline")
+    def run_backup_pipeline(self):
+        """Rewrite, re-hash, encode and move each staged WAV as soon as it is ready.
+
+        Replaces post_copy_operations, generate_access_files and
+        move_files_to_backup with one streaming pass (see pipeline). As before,
+        an access file failure is reported but the WAV is still backed up;
+        a WAV whose header rewrite, checksum or move fails is left in staging.
+        Other staged files are moved once the WAVs are done, and every failure
+        is reported before raising.
+
+        Raises:
+            ValueError: If any file could not be backed up, or a stage is
+                configured with fewer than one worker.
+        """
+        logger.info(f"run_backup_pipeline started for {self.engineer_name}")
+
+        stages = [
+            Stage("rewrite", self.rewrite_header, PIPELINE_WORKERS["rewrite"], True),
+            Stage("hash", self.write_new_checksums, PIPELINE_WORKERS["hash"], True),
+            Stage("encode", self.generate_access_file, ACCESS_ENCODE_WORKERS, False),
+            Stage("move", self.move_file_to_backup, PIPELINE_WORKERS["move"], True),
+        ]
+        print(self.ms.post_copy_operations)
+        self.prepare_staged_files()
+        wav_files = sorted(  # longest first, so a long encode does not start last
+            [file for file in self.staging_file_list if file.endswith(".wav")],
+            key=os.path.getsize,
+            reverse=True,
+        )
+        results = run_pipeline(wav_files, stages)  # checks the stage settings before anything is moved
+        self.prepare_batch_directory()
+
+        failed_files = []
+        for index, result in enumerate(results):
+            self.progress_bar(index, len(wav_files))
+            for stage, error in result.errors:
+                print(f"[bold red]{stage} failed for {os.path.basename(result.item)}:[/bold red] {error}")
+            if not result.completed:
+                failed_files.append(os.path.basename(result.item))
+
+        print(self.ms.move_files_to_backup)
+        for staged_file in self.staging_file_list:
+            if not staged_file.endswith(".wav"):
+                try:
+                    self.move_file_to_backup(staged_file)
+                except ValueError as e:
+                    print(f"[bold red]move failed for {os.path.basename(staged_file)}:[/bold red] {e}")
+                    failed_files.append(os.path.basename(staged_file))
+
+        if failed_files != []:
+            logger.critical(f"Backup pipeline failed for {failed_files}")
+            raise ValueError(f"{len(failed_files)} files could not be backed up and remain in staging: {failed_files}")
 
 def main():
+    atexit.register(metrics.write)  # run metrics are written however the run ends
 ### start backup service
     try:
         bfs = BackupFileService()
@@ -341,7 +569,9 @@ def main():
         Prompt.ask(str(e))
         exit()
 
+    metrics.labels["engineer"] = bfs.engineer_name
     if bfs.engineer_name == bfs.BAU_ENGINEER_1 or bfs.engineer_name == bfs.BAU_ENGINEER_2:
+        metrics.labels["mode"] = "mirror"
         try:
             dmo = DriveMirror(bfs.source_directory, bfs.ROOT_BACKUP, bfs.engineer_name)
             dmo.run_drive_mirror_operations()  # move operations to drive mirror service
@@ -355,6 +585,7 @@ def main():
         )
 
     else:
+        metrics.labels["mode"] = "pipeline" if bfs.pipeline else "backup"
         ### copy files to staging area
         try:
             bfs.copy_files_to_staging()
@@ -366,25 +597,34 @@ def main():
         ### eject drive
         bfs.drive_eject_request()
 
-        ### checksums deleted, file info written, new checksums written
-        try:
-            bfs.post_copy_operations()
-        except Exception as e:
-            Prompt.ask(str(e))
-            exit()
+        if bfs.pipeline:
+            ### file info written, new checksums written, access files generated, files moved per file
+            try:
+                bfs.run_backup_pipeline()
+            except Exception as e:
+                Prompt.ask(str(e))
+                exit()
 
-        try:
-            bfs.generate_access_files()
-        except Exception as e:
-            logger.warning(f"Error generating access files: {e}")
-            print(f"Error generating access files: {e}")
+        else:
+            ### checksums deleted, file info written, new checksums written
+            try:
+                bfs.post_copy_operations()
+            except Exception as e:
+                Prompt.ask(str(e))
+                exit()
 
-        ## move files to backup area
-        try:
-            bfs.move_files_to_backup()
-        except Exception as e:
-            Prompt.ask(str(e))
-            exit()
+            try:
+                bfs.generate_access_files()
+            except Exception as e:
+                logger.warning(f"Error generating access files: {e}")
+                print(f"Error generating access files: {e}")
+
+            ## move files to backup area
+            try:
+                bfs.move_files_to_backup()
+            except Exception as e:
+                Prompt.ask(str(e))
+                exit()
 
         Prompt.ask("[bold magenta][u]Backup complete![/u][/bold magenta]")
 
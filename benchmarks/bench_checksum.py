@@ -0,0 +1,96 @@
+"""Micro-benchmark for the checksum hashing strategies.
+
+Writes a test file into each target directory (e.g. a local disk and a slow
+USB / network device), evicts it from the page cache where the platform
+allows, then times checksumoperations.hash_file for each strategy and block
+size.
+
+Usage:
+    python benchmarks/bench_checksum.py --dir /tmp --dir /media/usb --size-mb 1024
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ROOT_LOCATION", tempfile.gettempdir())  # log to a file rather than the console
+
+from checksumoperations import hash_file  # noqa: E402
+
+STRATEGIES = ["read", "readinto", "mmap"]
+
+
+def write_test_file(directory, size_mb):
+    """Create a file of random-ish data and return its path."""
+    path = os.path.join(directory, "bench_checksum.tmp")
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(block)
+        f.flush()
+        os.fsync(f.fileno())
+    return path
+
+
+def drop_from_cache(path):
+    """Ask the kernel to evict the file from the page cache (cold read)."""
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+    return True
+
+
+def run(directory, size_mb, block_sizes, repeat, algorithms):
+    path = write_test_file(directory, size_mb)
+    cold = drop_from_cache(path)
+    digests = "+".join(["md5", *algorithms])
+    print(f"\n{directory} ({size_mb} MiB, {digests}, {'cold' if cold else 'warm'} cache)")
+    print(f"{'strategy':<10}{'block':>10}{'best s':>10}{'MB/s':>10}")
+    try:
+        for strategy in STRATEGIES:
+            for block_size in block_sizes if strategy != "mmap" else block_sizes[:1]:
+                timings = []
+                for _ in range(repeat):
+                    drop_from_cache(path)
+                    start = time.perf_counter()
+                    hash_file(path, block_size=block_size, strategy=strategy, algorithms=algorithms)
+                    timings.append(time.perf_counter() - start)
+                best = min(timings)
+                block = "-" if strategy == "mmap" else f"{block_size // 1024}K"
+                print(f"{strategy:<10}{block:>10}{best:>10.3f}{size_mb * 1.048576 / best:>10.1f}")
+    finally:
+        os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", action="append", help="directory to benchmark (repeatable)")
+    parser.add_argument("--size-mb", type=int, default=256, help="test file size in MiB")
+    parser.add_argument(
+        "--block-kb",
+        type=int,
+        action="append",
+        help="block size in KiB (repeatable, default: 8, 1024, 4096, 16384)",
+    )
+    parser.add_argument(
+        "--algorithm",
+        action="append",
+        default=[],
+        help="extra hashlib algorithm computed in the same pass (repeatable, e.g. sha256)",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="runs per combination (best is reported)")
+    args = parser.parse_args()
+
+    block_sizes = [kb * 1024 for kb in (args.block_kb or [8, 1024, 4096, 16384])]
+    for directory in args.dir or [tempfile.gettempdir()]:
+        run(directory, args.size_mb, block_sizes, args.repeat, args.algorithm)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark the copy backends on large WAVs and many small sidecar / JSON files.
+
+Compares shutil.copy2, the kernel copy engine (copyoperations.copy2) forced
+to each backend (copy_file_range, sendfile, userspace) and the hashed copy
+used for WAVs (checksumoperations.copy_and_hash). Source pages are dropped
+from the page cache before each run where the platform allows
+(posix_fadvise), so runs start cold rather than from memory; dirty pages of
+the previous run are flushed first.
+
+Note that on Linux shutil.copy2 already copies with sendfile, so the kernel
+engine's gain over it comes from copy_file_range (in-kernel, server-side or
+reflinked on supporting filesystems) and fewer, larger calls.
+
+Usage:
+    python benchmarks/bench_copy.py --src-dir /tmp --dst-dir /media/usb --size-mb 1024 --files 2000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ROOT_LOCATION", tempfile.gettempdir())  # log to a file rather than the console
+
+from checksumoperations import copy_and_hash  # noqa: E402
+from copyoperations import copy2, COPY_ENGINES  # noqa: E402
+
+BACKENDS = {
+    "shutil.copy2": shutil.copy2,
+    **{f"engine:{engine}": (lambda engine: lambda s, d: copy2(s, d, engine))(engine) for engine in COPY_ENGINES},
+    "copy_and_hash": lambda s, d: copy_and_hash(s, d),
+}
+
+
+def drop_cache(files):
+    os.sync()
+    if hasattr(os, "posix_fadvise"):
+        for file in files:
+            with open(file, "rb") as f:
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def make_corpus(directory, size_mb, count):
+    """Write one large WAV-sized file and count small sidecar / JSON files."""
+    block = os.urandom(1024 * 1024)
+    large = os.path.join(directory, "recording.wav")
+    with open(large, "wb") as f:
+        for _ in range(size_mb):
+            f.write(block)
+    small = []
+    for index in range(count):
+        name = f"file_{index:05}.wav.md5" if index % 2 else f"file_{index:05}.json"
+        path = os.path.join(directory, name)
+        with open(path, "w") as f:
+            f.write(os.urandom(64 if index % 2 else 2048).hex())
+        small.append(path)
+    return [large], small
+
+
+def run_backend(function, files, destination_dir):
+    drop_cache(files)
+    start = time.perf_counter()
+    for file in files:
+        function(file, os.path.join(destination_dir, os.path.basename(file)))
+    elapsed = time.perf_counter() - start
+    for file in os.listdir(destination_dir):
+        os.remove(os.path.join(destination_dir, file))
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--src-dir", default=tempfile.gettempdir(), help="directory for the source corpus")
+    parser.add_argument("--dst-dir", default=tempfile.gettempdir(), help="directory to copy into")
+    parser.add_argument("--size-mb", type=int, default=512, help="large file size in MiB")
+    parser.add_argument("--files", type=int, default=2000, help="number of small files")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per backend (best is reported)")
+    args = parser.parse_args()
+
+    source = tempfile.mkdtemp(dir=args.src_dir)
+    destination = tempfile.mkdtemp(dir=args.dst_dir)
+    try:
+        large, small = make_corpus(source, args.size_mb, args.files)
+        small_bytes = sum(os.path.getsize(file) for file in small)
+        print(f"{'backend':<26}{'large MB/s':>12}{'small files/s':>16}{'small MB/s':>12}")
+        for name, function in BACKENDS.items():
+            large_time = min(run_backend(function, large, destination) for _ in range(args.repeat))
+            small_time = min(run_backend(function, small, destination) for _ in range(args.repeat))
+            print(
+                f"{name:<26}{args.size_mb * 2**20 / 1e6 / large_time:>12.1f}"
+                f"{len(small) / small_time:>16.0f}{small_bytes / 1e6 / small_time:>12.2f}"
+            )
+    finally:
+        shutil.rmtree(source)
+        shutil.rmtree(destination)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Benchmark delta mirror updates against a full copy.
+
+Creates a source recording and a mirror copy in each target directory, then
+times refreshing the mirror after a typical edit (header touched in place,
+audio appended) with a full copy (checksumoperations.copy_and_hash) and with
+a delta update (deltaoperations.delta_copy_and_hash), both with and without
+cached mirror block signatures.
+
+Usage:
+    python benchmarks/bench_delta.py --dir /media/usb --size-mb 2048
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ROOT_LOCATION", tempfile.gettempdir())  # log to a file rather than the console
+
+from checksumoperations import copy_and_hash  # noqa: E402
+from checksumcache import ChecksumCache  # noqa: E402
+from deltaoperations import delta_copy_and_hash  # noqa: E402
+
+EDITS = ["header", "append"]
+
+
+def write_file(path, size_mb):
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(block)
+
+
+def edit(path, kind):
+    """Apply a typical engineer edit to the source recording."""
+    if kind == "header":
+        with open(path, "r+b") as f:
+            f.seek(64)
+            f.write(os.urandom(256))
+    else:
+        with open(path, "ab") as f:
+            f.write(os.urandom(4 * 1024 * 1024))
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def run(directory, size_mb):
+    work = tempfile.mkdtemp(dir=directory)
+    source = os.path.join(work, "source.wav")
+    mirror = os.path.join(work, "mirror.wav")
+    cache = ChecksumCache(os.path.join(work, "cache.sqlite"))
+    print(f"\n{directory} ({size_mb} MiB)")
+    print(f"{'edit':<8}{'method':<22}{'s':>10}{'MiB written':>14}")
+    try:
+        write_file(source, size_mb)
+        for kind in EDITS:
+            shutil.copy2(source, mirror)
+            edit(source, kind)
+            elapsed, _ = timed(copy_and_hash, source, mirror)
+            print(f"{kind:<8}{'full copy':<22}{elapsed:>10.3f}{os.path.getsize(mirror) / 2**20:>14.1f}")
+
+            for label, signature_cache in (("delta (read mirror)", None), ("delta (cached)", cache)):
+                shutil.copy2(source, mirror)
+                if signature_cache is not None:
+                    delta_copy_and_hash(source, mirror, cache=signature_cache)  # stores signatures
+                edit(source, kind)
+                elapsed, (_, bytes_written) = timed(delta_copy_and_hash, source, mirror, cache=signature_cache)
+                print(f"{kind:<8}{label:<22}{elapsed:>10.3f}{bytes_written / 2**20:>14.1f}")
+    finally:
+        cache.close()
+        shutil.rmtree(work)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", action="append", help="directory to benchmark (repeatable)")
+    parser.add_argument("--size-mb", type=int, default=512, help="recording size in MiB")
+    args = parser.parse_args()
+
+    for directory in args.dir or [tempfile.gettempdir()]:
+        run(directory, args.size_mb)
+
+
+if __name__ == "__main__":
+    main()
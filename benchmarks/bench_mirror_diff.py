@@ -0,0 +1,109 @@
+"""Benchmark for the drive mirror diff.
+
+Generates synthetic source / mirror trees (ScanEntry records laid out as
+engineer folders of WAVs and sidecars) of increasing size, with a small
+fraction of new, changed and removed files, and times:
+
+  * legacy: the previous list-comprehension diff (quadratic; small trees only)
+  * merge: diffoperations.diff_trees with in-memory sorting
+  * external: diff_trees forced to spill sorted runs to disk
+
+Usage:
+    python benchmarks/bench_mirror_diff.py --sizes 1000 10000 100000 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ROOT_LOCATION", tempfile.gettempdir())  # log to a file rather than the console
+
+from scanoperations import ScanEntry  # noqa: E402
+from diffoperations import diff_trees  # noqa: E402
+
+LEGACY_LIMIT = 10_000  # the quadratic diff takes minutes beyond this
+
+
+def synthetic_trees(size, churn=0.01, seed=0):
+    """Return (source, mirror) ScanEntry lists of roughly `size` files each."""
+    rng = random.Random(seed)
+    mirror = []
+    for index in range(size):
+        folder = f"C{index // 5000:04}/batch_{index // 250:05}"
+        extension = ".wav.md5" if index % 2 else ".wav"
+        mirror.append(ScanEntry(f"{folder}/C1234_{index:08}{extension}", rng.randrange(1, 4 * 2**30), 0))
+    source = []
+    for entry in mirror:
+        roll = rng.random()
+        if roll < churn:
+            continue  # removed from source
+        if roll < churn * 2:
+            entry = entry._replace(size=entry.size + 1)  # changed
+        source.append(entry)
+    source.extend(
+        ScanEntry(f"new/C9999_{index:08}.wav", rng.randrange(1, 2**30), 0)
+        for index in range(int(size * churn))
+    )
+    rng.shuffle(source)
+    rng.shuffle(mirror)
+    return source, mirror
+
+
+def legacy_diff(source_file_paths, mirror_file_paths):
+    new = [
+        key
+        for key in source_file_paths
+        if key[0] not in [source_key[0] for source_key in mirror_file_paths]
+    ]
+    changed = [
+        source_key
+        for source_key in source_file_paths
+        for mirror_key in mirror_file_paths
+        if source_key[0] == mirror_key[0] and source_key[1] != mirror_key[1]
+    ]
+    removed = [
+        key
+        for key in mirror_file_paths
+        if key[0] not in [mirror_key[0] for mirror_key in source_file_paths]
+    ]
+    return len(new), len(changed), len(removed)
+
+
+def merge_diff(source, mirror, max_in_memory=None):
+    counts = {"new": 0, "changed": 0, "removed": 0}
+    for kind, _, _, _ in diff_trees(iter(source), iter(mirror), max_in_memory=max_in_memory):
+        counts[kind] += 1
+    return counts["new"], counts["changed"], counts["removed"]
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--churn", type=float, default=0.01, help="fraction of new/changed/removed files")
+    args = parser.parse_args()
+
+    print(f"{'files':>10}{'legacy s':>12}{'merge s':>12}{'external s':>12}  new/changed/removed")
+    for size in args.sizes:
+        source, mirror = synthetic_trees(size, args.churn)
+        merge_time, counts = timed(merge_diff, source, mirror)
+        legacy = "-"
+        if size <= LEGACY_LIMIT:
+            legacy_time, legacy_counts = timed(legacy_diff, source, mirror)
+            assert counts == legacy_counts
+            legacy = f"{legacy_time:.3f}"
+        external_time, external_counts = timed(merge_diff, source, mirror, max_in_memory=max(size // 8, 1000))
+        assert counts == external_counts
+        print(f"{size:>10}{legacy:>12}{merge_time:>12.3f}{external_time:>12.3f}  {counts}")
+
+
+if __name__ == "__main__":
+    main()
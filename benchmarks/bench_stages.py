@@ -0,0 +1,222 @@
+"""Benchmark every stage of a collection backup and of a drive mirror, headlessly.
+
+Builds a synthetic engineer drive (see synthetic_drive) in a scratch
+directory, puts stub ffmpeg / ffprobe / bwfmetaedit executables with a set
+latency first on PATH, points STAGING_LOCATION, ROOT_BACKUP, MSO_STORE and
+the checksum cache at the scratch directory and times each BackupFileService
+stage in turn:
+
+  copy      copy_files_to_staging (single read pass + verification against .md5)
+  verify    re-verify the staged WAVs against their sidecars (cache bypassed)
+  rewrite   header rewrite of each staged WAV
+  hash      post-rewrite checksums
+  encode    access file generation (stub ffmpeg)
+  move      move_files_to_backup
+  pipeline  rewrite -> hash -> encode -> move as one streaming pass (after a fresh copy)
+
+then the drive mirror of the same drive (first mirror, incremental update
+after edits, and a no-change check), and the mirror diff / commit of larger
+trees of small files (--mirror-sizes, up to 1000000).
+
+Prompts are answered automatically and console output is discarded while a
+stage runs. If userlist.py is missing a temporary one is generated. Other
+settings (e.g. WAV_HEADER_WRITER, PIPELINE_*_WORKERS, TRANSFER_MODE) are
+taken from the environment as usual.
+
+Usage:
+    python benchmarks/bench_stages.py --wavs 8 --wav-mb 64 --latency 0.2 --mirror-sizes 1000 10000 100000
+"""
+import argparse
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_drive import make_engineer_drive, make_file_tree, install_stub_tools  # noqa: E402
+
+ENGINEER = "Benchmark Engineer"
+
+
+@contextlib.contextmanager
+def quiet():
+    """Discard console output (including subprocesses such as 'clear') while a stage runs."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = [os.dup(1), os.dup(2)]
+    with open(os.devnull, "w") as devnull:
+        os.dup2(devnull.fileno(), 1)
+        os.dup2(devnull.fileno(), 2)
+        try:
+            with contextlib.redirect_stdout(devnull):
+                yield
+        finally:
+            sys.stdout.flush()
+            for fd, saved_fd in zip((1, 2), saved):
+                os.dup2(saved_fd, fd)
+                os.close(saved_fd)
+
+
+def timed(label, function, size=None):
+    with quiet():
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+    rate = f"{size / 1e6 / elapsed:>10.1f}" if size else f"{'':>10}"
+    print(f"{label:<34}{elapsed:>10.3f}{rate}")
+    return elapsed
+
+
+def setup_environment(work, latency):
+    """Point the service at the scratch directory and the stub tools (before it is imported)."""
+    for name in ("logs", "staging", "backup", "mso", "mirror"):
+        os.makedirs(os.path.join(work, name), exist_ok=True)
+    os.environ.update(
+        {
+            "ROOT_LOCATION": os.path.join(work, "logs"),
+            "STAGING_LOCATION": os.path.join(work, "staging"),
+            "ROOT_BACKUP": os.path.join(work, "backup"),
+            "MSO_STORE": os.path.join(work, "mso"),
+            "CHECKSUM_CACHE": os.path.join(work, "logs", "checksum_cache.sqlite"),
+        }
+    )
+    stubs = install_stub_tools(os.path.join(work, "bin"), latency)
+    os.environ["PATH"] = stubs + os.pathsep + os.environ["PATH"]
+    try:
+        import userlist  # noqa: F401
+    except ImportError:
+        with open(os.path.join(work, "userlist.py"), "w") as f:
+            f.write(f"engineers = [{ENGINEER!r}]\n")
+        sys.path.insert(0, work)
+
+
+def clear(directory):
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        shutil.rmtree(path) if os.path.isdir(path) else os.remove(path)
+
+
+def bench_backup(work, wav_sizes):
+    import backupservice
+    from rich.prompt import Prompt
+
+    Prompt.ask = staticmethod(lambda *args, **kwargs: "s")  # start without viewing the criteria
+    source = make_engineer_drive(os.path.join(work, "drive"), ENGINEER, wav_sizes)
+    total = sum(wav_sizes)
+
+    def service():
+        bfs = backupservice.BackupFileService()
+        bfs.engineer_name = ENGINEER
+        bfs.source_directory = source
+        return bfs
+
+    print(f"\nCollection backup: {len(wav_sizes)} WAVs, {total / 1e6:.0f} MB")
+    print(f"{'stage':<34}{'s':>10}{'MB/s':>10}")
+    bfs = service()
+    timed("copy (+ verify against .md5)", bfs.copy_files_to_staging, total)
+    staged = [os.path.join(bfs.STAGING_LOCATION, os.path.basename(file)) for file in os.listdir(source) if file.endswith(".wav")]
+    timed("verify (re-read)", lambda: list(bfs.cs.batch_checksum_generate(staged, verify=True, use_cache=False)), total)
+    with quiet():
+        bfs.prepare_staged_files()
+    wavs = [file for file in bfs.staging_file_list if file.endswith(".wav")]
+    timed("rewrite", lambda: [bfs.rewrite_header(file) for file in wavs])
+    timed("hash", lambda: [bfs.write_new_checksums(file) for file in wavs], total)
+    timed("encode", bfs.generate_access_files)
+    timed("move", bfs.move_files_to_backup, total)
+
+    clear(bfs.STAGING_LOCATION)
+    bfs = service()
+    with quiet():
+        bfs.copy_files_to_staging()
+    timed("pipeline (rewrite..move)", bfs.run_backup_pipeline, total)
+    return source
+
+
+def bench_mirror(work, source):
+    from drivemirroroperations import DriveMirror
+
+    mirror = os.path.join(work, "mirror")
+
+    def mirror_run():
+        dmo = DriveMirror(source, mirror, ENGINEER)
+        dmo.check_source_mirror_changes()
+        dmo.commit_file_changes()
+
+    print(f"\nDrive mirror of the same drive")
+    print(f"{'stage':<34}{'s':>10}{'MB/s':>10}")
+    size = sum(entry.stat().st_size for entry in os.scandir(source))
+    timed("first mirror (diff + commit)", mirror_run, size)
+    edited = sorted(file for file in os.listdir(source) if file.endswith(".json"))[:2]
+    for name in edited:
+        with open(os.path.join(source, name), "a") as f:
+            f.write(" ")
+    timed(f"incremental ({len(edited)} edits)", mirror_run)
+    timed("no changes (manifest)", mirror_run)
+
+
+def bench_mirror_scaling(work, sizes, churn):
+    from drivemirroroperations import DriveMirror
+
+    print(f"\nMirror scaling ({churn:.1%} of files edited)")
+    print(f"{'files':>10}{'create s':>10}{'rescan diff s':>15}{'manifest diff s':>17}{'commit s':>10}")
+    for size in sizes:
+        root = os.path.join(work, f"scale_{size}")
+        source = os.path.join(root, "source", ENGINEER)
+        mirror = os.path.join(root, "mirror")
+        start = time.perf_counter()
+        relpaths = make_file_tree(source, size)
+        shutil.copytree(source, os.path.join(mirror, ENGINEER))
+        created = time.perf_counter() - start
+        for relpath in relpaths[:: max(1, int(1 / churn))]:
+            with open(os.path.join(source, relpath), "ab") as f:
+                f.write(b"edit")
+
+        with quiet():
+            dmo = DriveMirror(source, mirror, ENGINEER, full_rescan=True)
+            start = time.perf_counter()
+            dmo.check_source_mirror_changes()  # walks the mirror and writes the manifest
+            rescan = time.perf_counter() - start
+            dmo = DriveMirror(source, mirror, ENGINEER)
+            start = time.perf_counter()
+            dmo.check_source_mirror_changes()
+            manifest = time.perf_counter() - start
+            start = time.perf_counter()
+            dmo.commit_file_changes()
+            commit = time.perf_counter() - start
+        print(f"{size:>10}{created:>10.1f}{rescan:>15.3f}{manifest:>17.3f}{commit:>10.3f}")
+        shutil.rmtree(root)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wavs", type=int, default=4, help="WAVs on the synthetic drive")
+    parser.add_argument("--wav-mb", type=int, nargs="+", default=[64], help="WAV sizes in MB (cycled over the WAVs)")
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds each stub tool call takes")
+    parser.add_argument("--mirror-sizes", type=int, nargs="*", default=[1000, 10000], help="files per mirror scaling run (up to 1000000)")
+    parser.add_argument("--churn", type=float, default=0.01, help="fraction of files edited in the scaling runs")
+    parser.add_argument("--dir", default=tempfile.gettempdir(), help="directory for the scratch files")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="bench_stages_", dir=args.dir)
+    setup_environment(work, args.latency)
+    try:
+        wav_sizes = [args.wav_mb[index % len(args.wav_mb)] * 1_000_000 for index in range(args.wavs)]
+        source = bench_backup(work, wav_sizes)
+        bench_mirror(work, source)
+        if args.mirror_sizes:
+            bench_mirror_scaling(work, args.mirror_sizes, args.churn)
+    finally:
+        if args.keep:
+            print(f"\nScratch files kept in {work}")
+        else:
+            shutil.rmtree(work)
+
+
+if __name__ == "__main__":
+    main()
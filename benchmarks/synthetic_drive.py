@@ -0,0 +1,129 @@
+"""Synthetic engineer drives and external tool stand-ins for the benchmarks.
+
+  * write_wav: a valid RIFF WAV with bext, fmt and data chunks (24 bit
+    stereo 96 kHz) of a given audio size.
+  * make_engineer_drive: <root>/<engineer>/ holding WAVs with .md5 sidecars,
+    one JSON metadata file per WAV and an _ExcelBatchUpload.xlsx placeholder,
+    laid out as the backup service expects.
+  * make_file_tree: many small files in nested folders, for mirror scaling.
+  * install_stub_tools: ffmpeg, ffprobe and bwfmetaedit shell scripts that
+    sleep for a set latency (and, for ffmpeg, write the output file), so the
+    stages can be timed without the real tools.
+"""
+import hashlib
+import json
+import os
+import random
+import struct
+
+BLOCK = os.urandom(1024 * 1024)  # repeated audio payload; content does not affect timings
+
+STUB_TOOLS = {
+    "ffmpeg": 'for arg; do last="$arg"; done\nprintf "m4a" > "$last"\n',
+    "ffprobe": (
+        'echo "    encoded_by      : Synthetic Recorder"\n'
+        'echo "    date            : 2024-01-01"\n'
+        'echo "    creation_time   : 10-00-00"\n'
+    ),
+    "bwfmetaedit": "",
+}
+
+
+def _chunk(chunk_id, data):
+    return struct.pack("<4sI", chunk_id, len(data)) + data + b"\x00" * (len(data) & 1)
+
+
+def _bext(originator, date, time):
+    strings = (
+        b"Synthetic recording".ljust(256, b"\x00")
+        + originator.encode().ljust(32, b"\x00")
+        + b"SYNTH".ljust(32, b"\x00")
+        + date.encode()
+        + time.encode()
+    )
+    return _chunk(b"bext", strings + struct.pack("<QH", 0, 1) + b"\x00" * 254 + b"A=PCM,F=96000,W=24,M=stereo\r\n")
+
+
+def write_wav(path, audio_size, originator="Synthetic Recorder", date="2024-01-01", time="10-00-00"):
+    """Write a RIFF/BEXT WAV with audio_size bytes of audio and return its MD5."""
+    audio_size -= audio_size % 6  # whole 24 bit stereo frames
+    fmt = _chunk(b"fmt ", struct.pack("<HHIIHH", 1, 2, 96000, 96000 * 6, 6, 24))
+    header = b"WAVE" + _bext(originator, date, time) + fmt + struct.pack("<4sI", b"data", audio_size)
+    riff_size = len(header) + audio_size + (audio_size & 1)
+    md5 = hashlib.md5()
+    with open(path, "wb") as f:
+        for data in (b"RIFF" + struct.pack("<I", riff_size), header):
+            f.write(data)
+            md5.update(data)
+        remaining = audio_size
+        while remaining:
+            block = BLOCK[:min(remaining, len(BLOCK))]
+            f.write(block)
+            md5.update(block)
+            remaining -= len(block)
+        if audio_size & 1:
+            f.write(b"\x00")
+            md5.update(b"\x00")
+    return md5.hexdigest()
+
+
+def make_engineer_drive(root, engineer, wav_sizes, collection="C1234"):
+    """Create a synthetic engineer drive and return the engineer directory.
+
+    Args:
+        root (str): Drive root (created if missing).
+        engineer (str): Engineer directory name.
+        wav_sizes (list[int]): Audio bytes of each WAV.
+        collection (str): Collection number embedded in the file names.
+    """
+    directory = os.path.join(root, engineer)
+    os.makedirs(directory, exist_ok=True)
+    for index, size in enumerate(wav_sizes):
+        name = f"{collection}_{collection}-{index + 1:04}_0001.wav"
+        path = os.path.join(directory, name)
+        checksum = write_wav(path, size)
+        with open(f"{path}.md5", "w") as md5_file:
+            md5_file.write(f"{checksum} *{name}")
+        with open(os.path.join(directory, f"{name[:-4]}.json"), "w") as json_file:
+            json.dump({"shelfmark": f"{collection}/{index + 1}", "engineer": engineer, "duration": size / (96000 * 6)}, json_file)
+    with open(os.path.join(directory, f"{collection}_ExcelBatchUpload.xlsx"), "wb") as xlsx:
+        xlsx.write(b"PK\x03\x04 placeholder")
+    return directory
+
+
+def make_file_tree(root, count, seed=0):
+    """Create count small files (WAV and .md5 names) in nested folders under root.
+
+    Returns:
+        list[str]: Relative paths of the files.
+    """
+    rng = random.Random(seed)
+    relpaths = []
+    for index in range(count):
+        folder = f"C{index // 5000:04}/batch_{index // 250:05}"
+        extension = ".wav.md5" if index % 2 else ".wav"
+        relpath = f"{folder}/C1234_{index:08}{extension}"
+        path = os.path.join(root, relpath)
+        if index % 250 == 0:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(rng.randbytes(rng.randrange(16, 64)))
+        relpaths.append(relpath)
+    return relpaths
+
+
+def install_stub_tools(directory, latency=0.0, latencies=None):
+    """Write ffmpeg / ffprobe / bwfmetaedit stand-ins into directory and return it.
+
+    Args:
+        directory (str): Directory to put first on PATH.
+        latency (float): Seconds each call sleeps.
+        latencies (dict[str, float]|None): Per tool overrides.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for tool, body in STUB_TOOLS.items():
+        path = os.path.join(directory, tool)
+        with open(path, "w") as script:
+            script.write(f"#!/bin/sh\nsleep {(latencies or {}).get(tool, latency)}\n{body}")
+        os.chmod(path, 0o755)
+    return directory
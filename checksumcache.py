@@ -0,0 +1,250 @@
+"""Persistent checksum cache.
+
+Stores file digests in a small SQLite database keyed by file identity
+(device, inode, size, mtime_ns) so files that have not changed since they
+were last hashed do not need to be read again. Block signatures used for
+delta mirror updates (see deltaoperations) are stored the same way. Entries
+are evicted least recently used first once the cache exceeds its configured size.
+
+Environment variables used:
+  * CHECKSUM_CACHE: database path, or "off" to disable
+    (default: <ROOT_LOCATION>/checksum_cache.sqlite).
+  * CHECKSUM_CACHE_MAX_ENTRIES: maximum number of cached files (default 200000).
+"""
+import os
+import json
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+
+from logging_module import logger
+
+load_dotenv()
+
+CHECKSUM_CACHE_MAX_ENTRIES = int(os.getenv("CHECKSUM_CACHE_MAX_ENTRIES") or 200000)
+EVICTION_CHECK_INTERVAL = 1000  # puts between eviction checks
+
+
+def default_checksum_cache():
+    """Return the ChecksumCache configured by the environment, or None if disabled."""
+    db_path = os.getenv("CHECKSUM_CACHE")
+    if db_path is None and os.getenv("ROOT_LOCATION"):
+        db_path = os.path.join(os.getenv("ROOT_LOCATION"), "checksum_cache.sqlite")
+    if db_path is None or db_path.lower() == "off":
+        return None
+    try:
+        return ChecksumCache(db_path)
+    except Exception as e:
+        logger.warning(f"Checksum cache unavailable at {db_path}, continuing without it. {e}")
+        return None
+
+
+class ChecksumCache:
+    """SQLite backed digest cache shared safely between threads.
+
+    Args:
+        db_path (str): Path of the SQLite database (created if missing).
+        max_entries (int|None): Maximum cached files; defaults to CHECKSUM_CACHE_MAX_ENTRIES.
+
+    Attributes:
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that required the file to be read.
+    """
+
+    def __init__(self, db_path, max_entries=None):
+        self.db_path = db_path
+        self.max_entries = max_entries or CHECKSUM_CACHE_MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                """CREATE TABLE IF NOT EXISTS checksums (
+                    device INTEGER, inode INTEGER, size INTEGER, mtime_ns INTEGER,
+                    path TEXT, digests TEXT, last_used REAL,
+                    PRIMARY KEY (device, inode, size, mtime_ns))"""
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS checksums_path ON checksums (path)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS checksums_last_used ON checksums (last_used)"
+            )
+            self._connection.execute(
+                """CREATE TABLE IF NOT EXISTS block_signatures (
+                    device INTEGER, inode INTEGER, size INTEGER, mtime_ns INTEGER,
+                    block_size INTEGER, path TEXT, signatures BLOB, last_used REAL,
+                    PRIMARY KEY (device, inode, size, mtime_ns, block_size))"""
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS block_signatures_path ON block_signatures (path)"
+            )
+
+    @staticmethod
+    def _key(stat):
+        return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def get(self, file, algorithms=()):
+        """Return cached digests for an unchanged file, or None.
+
+        Args:
+            file (str): Path to the file.
+            algorithms (iterable[str]): Extra algorithms that must be present with MD5.
+        Returns:
+            dict[str, str]|None: {algorithm: hex digest} if every requested
+                digest is cached for the file's current identity.
+        """
+        try:
+            key = self._key(os.stat(file))
+        except OSError:
+            return None
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT digests FROM checksums WHERE device=? AND inode=? AND size=? AND mtime_ns=?",
+                key,
+            ).fetchone()
+            if row is not None:
+                digests = json.loads(row[0])
+                if all(name in digests for name in ["md5", *algorithms]):
+                    with self._connection:
+                        self._connection.execute(
+                            "UPDATE checksums SET last_used=? WHERE device=? AND inode=? AND size=? AND mtime_ns=?",
+                            (time.time(), *key),
+                        )
+                    self.hits += 1
+                    return digests
+            self.misses += 1
+        return None
+
+    def put(self, file, digests, stat=None):
+        """Store digests for a file, merging with any already cached.
+
+        Args:
+            file (str): Path to the file.
+            digests (dict[str, str]): {algorithm: hex digest}.
+            stat (os.stat_result|None): Identity the digests were computed for;
+                if given and the file has changed since, nothing is stored.
+        """
+        try:
+            current = os.stat(file)
+        except OSError:
+            return
+        key = self._key(current)
+        if stat is not None and self._key(stat) != key:
+            return  # modified while being hashed
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT digests FROM checksums WHERE device=? AND inode=? AND size=? AND mtime_ns=?",
+                key,
+            ).fetchone()
+            merged = {**json.loads(row[0]), **digests} if row is not None else dict(digests)
+            with self._connection:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO checksums VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (*key, os.path.abspath(file), json.dumps(merged), time.time()),
+                )
+            self._puts += 1
+            if self._puts % EVICTION_CHECK_INTERVAL == 0:
+                self._evict()
+
+    def get_signatures(self, file, block_size):
+        """Return cached block signatures for an unchanged file, or None.
+
+        Args:
+            file (str): Path to the file.
+            block_size (int): Block size the signatures were computed with.
+        Returns:
+            bytes|None: Concatenated block signatures.
+        """
+        try:
+            key = self._key(os.stat(file))
+        except OSError:
+            return None
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT signatures FROM block_signatures WHERE device=? AND inode=? AND size=? AND mtime_ns=? AND block_size=?",
+                (*key, block_size),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            with self._connection:
+                self._connection.execute(
+                    "UPDATE block_signatures SET last_used=? WHERE device=? AND inode=? AND size=? AND mtime_ns=? AND block_size=?",
+                    (time.time(), *key, block_size),
+                )
+            self.hits += 1
+            return row[0]
+
+    def put_signatures(self, file, block_size, signatures):
+        """Store block signatures for a file's current identity.
+
+        Args:
+            file (str): Path to the file.
+            block_size (int): Block size the signatures were computed with.
+            signatures (bytes): Concatenated block signatures.
+        """
+        try:
+            key = self._key(os.stat(file))
+        except OSError:
+            return
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM block_signatures WHERE path=?", (os.path.abspath(file),)
+            )
+            self._connection.execute(
+                "INSERT OR REPLACE INTO block_signatures VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (*key, block_size, os.path.abspath(file), signatures, time.time()),
+            )
+
+    def invalidate(self, file):
+        """Remove cached digests and block signatures for a file path (and its current identity)."""
+        with self._lock, self._connection:
+            for table in ("checksums", "block_signatures"):
+                self._connection.execute(
+                    f"DELETE FROM {table} WHERE path=?", (os.path.abspath(file),)
+                )
+            try:
+                key = self._key(os.stat(file))
+            except OSError:
+                return
+            for table in ("checksums", "block_signatures"):
+                self._connection.execute(
+                    f"DELETE FROM {table} WHERE device=? AND inode=? AND size=? AND mtime_ns=?",
+                    key,
+                )
+
+    def clear(self):
+        """Remove every cached entry."""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM checksums")
+            self._connection.execute("DELETE FROM block_signatures")
+        logger.info(f"Checksum cache cleared ({self.db_path})")
+
+    def evict(self):
+        """Trim the cache to max_entries, least recently used first."""
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        for table in ("checksums", "block_signatures"):
+            (count,) = self._connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+            if count <= self.max_entries:
+                continue
+            excess = count - int(self.max_entries * 0.9)  # trim below the limit to avoid evicting every put
+            with self._connection:
+                self._connection.execute(
+                    f"""DELETE FROM {table} WHERE rowid IN (
+                        SELECT rowid FROM {table} ORDER BY last_used LIMIT ?)""",
+                    (excess,),
+                )
+            logger.info(f"Evicted {excess} entries from checksum cache ({table})")
+
+    def close(self):
+        """Trim and close the database."""
+        with self._lock:
+            self._evict()
+            self._connection.close()
@@ -1,65 +1,681 @@
 """Checksum operations: generate, write, verify, and clean up MD5 checksum files.
 
 This module provides a small service class used elsewhere in the backup
-workflow to create and validate per‑file .md5 sidecar files.
+workflow to create and validate per‑file .md5 sidecar files. Additional
+hashlib digests (CHECKSUM_ALGORITHMS) are computed from the same read pass
+and written as '<file>.<algorithm>' sidecars alongside the .md5.
+
+For WAV files the MD5 of the data chunk payload alone (the audio, as in the
+bwfmetaedit MD5 chunk) can be computed from the same pass and written as a
+'<file>.audio.md5' sidecar. Header rewrites leave it valid, so a fixity audit
+can tell header drift apart from audio corruption. Its line is labelled
+'audio-md5 (data chunk of <basename>) = <digest>' so that md5sum -c and
+similar tools do not take it for a whole-file checksum.
 """
 
 import os
 import hashlib
 import glob
+import mmap
+import shutil
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dotenv import load_dotenv
 
 from logging_module import logger
+from metrics import metrics
+from riffchunks import read_wav_header, data_range
+
+load_dotenv()
+
+CHECKSUM_BLOCK_SIZE = int(os.getenv("CHECKSUM_BLOCK_SIZE") or 1024 * 1024)  # bytes per read
+CHECKSUM_STRATEGY = os.getenv("CHECKSUM_STRATEGY") or "readinto"  # readinto | mmap | read
+CHECKSUM_WORKERS = int(os.getenv("CHECKSUM_WORKERS") or os.cpu_count() or 1)
+CHECKSUM_ALGORITHMS = [  # extra digests computed alongside MD5, e.g. "sha256,blake2b"
+    algorithm.strip().lower()
+    for algorithm in (os.getenv("CHECKSUM_ALGORITHMS") or "").split(",")
+    if algorithm.strip() and algorithm.strip().lower() != "md5"
+]
+
+AUDIO_DIGEST = "audio-md5"  # digests key of the data chunk payload MD5
+AUDIO_SIDECAR_SUFFIX = ".audio.md5"
+AUDIO_SIDECAR_LABEL = "audio-md5 (data chunk of {name}) = "
+
+ChecksumResult = namedtuple(
+    "ChecksumResult",
+    ["file", "checksum", "digests", "bytes_read", "elapsed", "verified", "error"],
+)
+FixityResult = namedtuple("FixityResult", ["file", "status", "digests", "error"])
+
+
+def _new_hashers(algorithms):
+    """Return {name: hash object} for MD5 plus the given extra algorithms."""
+    return {name: hashlib.new(name) for name in ["md5", *algorithms]}
+
+
+def _hexdigests(hashers, audio_hasher=None):
+    digests = {name: hasher.hexdigest() for name, hasher in hashers.items()}
+    if audio_hasher is not None:
+        digests[AUDIO_DIGEST] = audio_hasher.hexdigest()
+    return digests
+
+
+def _update_range(hasher, view, position, size, byte_range):
+    """Feed hasher the part of a block (file bytes position to position + size) inside byte_range."""
+    start = max(byte_range[0], position)
+    end = min(byte_range[0] + byte_range[1], position + size)
+    if start < end:
+        hasher.update(view[start - position:end - position])
+
+
+def wav_audio_range(file):
+    """Return (offset, size) of a WAV file's audio payload, or None.
+
+    None for non-WAV files and WAVs whose header cannot be parsed; those
+    only get whole-file digests.
+    """
+    if not file.lower().endswith(".wav"):
+        return None
+    try:
+        return data_range(read_wav_header(file))
+    except (ValueError, OSError):
+        return None
+
+
+def hash_file(file, block_size=None, strategy=None, algorithms=(), audio_range=None):
+    """Return the MD5 (plus any extra) hex digests and byte count of a file.
+
+    All digests are updated from the same buffer, so extra algorithms add
+    CPU time but no extra reads.
+
+    Strategies:
+        readinto: reuse one preallocated buffer via readinto/memoryview (default).
+        mmap: map the file and hash the mapping without copying into Python.
+        read: legacy f.read(block_size) loop, allocating a new bytes per block.
+
+    Args:
+        file (str): Path to the file to hash.
+        block_size (int|None): Bytes per read; defaults to CHECKSUM_BLOCK_SIZE.
+        strategy (str|None): One of the above; defaults to CHECKSUM_STRATEGY.
+        algorithms (iterable[str]): Extra hashlib algorithm names to compute.
+        audio_range (tuple[int, int]|None): (offset, size) of a WAV's audio
+            payload (see wav_audio_range) whose MD5 to compute as well.
+    Returns:
+        tuple[dict[str, str], int]: ({algorithm: hex digest}, bytes read);
+            the dict always contains "md5", and AUDIO_DIGEST if audio_range is given.
+    Raises:
+        ValueError: If the strategy or an algorithm is unknown.
+        OSError: If the file cannot be read.
+    """
+    block_size = block_size or CHECKSUM_BLOCK_SIZE
+    strategy = strategy or CHECKSUM_STRATEGY
+    hashers = _new_hashers(algorithms)
+    audio_hasher = hashlib.md5() if audio_range is not None else None
+    bytes_read = 0
+    with open(file, "rb", buffering=0) as f:
+        if strategy == "readinto":
+            buffer = bytearray(block_size)
+            view = memoryview(buffer)
+            while size := f.readinto(buffer):
+                for hasher in hashers.values():
+                    hasher.update(view[:size])
+                if audio_hasher is not None:
+                    _update_range(audio_hasher, view, bytes_read, size, audio_range)
+                bytes_read += size
+        elif strategy == "mmap":
+            bytes_read = os.fstat(f.fileno()).st_size
+            if bytes_read:  # empty files cannot be mapped
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    if hasattr(mapped, "madvise"):
+                        mapped.madvise(mmap.MADV_SEQUENTIAL)
+                    for hasher in hashers.values():
+                        hasher.update(mapped)
+                    if audio_hasher is not None:
+                        with memoryview(mapped) as view:
+                            _update_range(audio_hasher, view, 0, bytes_read, audio_range)
+        elif strategy == "read":
+            while chunk := f.read(block_size):
+                for hasher in hashers.values():
+                    hasher.update(chunk)
+                if audio_hasher is not None:
+                    _update_range(audio_hasher, chunk, bytes_read, len(chunk), audio_range)
+                bytes_read += len(chunk)
+        else:
+            raise ValueError(f"Unknown checksum strategy: {strategy}")
+    return _hexdigests(hashers, audio_hasher), bytes_read
+
+
+def copy_and_hash(source, destination, algorithms=(), cache=None, temp_path=None, audio_range=None):
+    """Copy a file, hashing each block as it is written (single read pass).
+
+    File metadata is then copied as per shutil.copy2, and the digests are
+    recorded in the cache (if any) for both files. Touches no shared state,
+    so it is safe to call from worker threads.
+
+    Args:
+        source (str): Path of the file to copy.
+        destination (str): Target file path to create/overwrite.
+        algorithms (iterable[str]): Extra hashlib algorithms to compute with MD5.
+        cache (ChecksumCache|None): Digest cache to update.
+        temp_path (str|None): If given, the copy is written here and renamed
+            over destination once complete, so destination is never partial.
+        audio_range (tuple[int, int]|None): Audio payload whose MD5 to compute as well.
+    Returns:
+        dict[str, str]: {algorithm: hex digest}, always including "md5", and
+            AUDIO_DIGEST if audio_range is given.
+    Raises:
+        OSError: If the file cannot be read, written or its metadata copied.
+    """
+    source_stat = os.stat(source)
+    hashers = _new_hashers(algorithms)
+    audio_hasher = hashlib.md5() if audio_range is not None else None
+    buffer = bytearray(CHECKSUM_BLOCK_SIZE)
+    view = memoryview(buffer)
+    target = temp_path or destination
+    position = 0
+    with open(source, "rb", buffering=0) as src, open(target, "wb") as dst:
+        while size := src.readinto(buffer):
+            for hasher in hashers.values():
+                hasher.update(view[:size])
+            if audio_hasher is not None:
+                _update_range(audio_hasher, view, position, size, audio_range)
+            dst.write(view[:size])
+            position += size
+    shutil.copystat(source, target)
+    if temp_path is not None:
+        os.replace(temp_path, destination)
+    digests = _hexdigests(hashers, audio_hasher)
+    if cache is not None:
+        cache.put(source, digests, source_stat)
+        cache.put(destination, digests)
+    return digests
+
+
+def copy_patch_and_hash(source, destination, plan, algorithms=(), cache=None, audio_range=None):
+    """Copy a file while applying a HeaderRewritePlan, hashing both streams.
+
+    The source bytes are hashed as read (MD5) and the rewritten bytes as
+    written (MD5 plus extra algorithms), so the source can be checked against
+    its sidecar and the output needs no second read. File metadata is then
+    copied as per shutil.copy2.
+
+    Args:
+        source (str): Path of the file to copy.
+        destination (str): Target file path to create/overwrite.
+        plan (HeaderRewritePlan): Changes to apply (see riffchunks).
+        algorithms (iterable[str]): Extra hashlib algorithms to compute with
+            the output MD5.
+        cache (ChecksumCache|None): Digest cache to update.
+        audio_range (tuple[int, int]|None): Audio payload whose MD5 to compute
+            as well (plans never touch it, so it is the same in both files).
+    Returns:
+        tuple[str, dict[str, str]]: Source MD5 and the output digests (always
+            including "md5", and AUDIO_DIGEST if audio_range is given).
+    Raises:
+        OSError: If the file cannot be read, written or its metadata copied.
+    """
+    source_stat = os.stat(source)
+    source_hasher = hashlib.md5()
+    hashers = _new_hashers(algorithms)
+    audio_hasher = hashlib.md5() if audio_range is not None else None
+    buffer = bytearray(CHECKSUM_BLOCK_SIZE)
+    view = memoryview(buffer)
+    copy_end = plan.tail_offset if plan.tail_offset is not None else plan.file_size
+    written = 0
+    position = 0
+    with open(source, "rb", buffering=0) as src, open(destination, "wb") as dst:
+        while size := src.readinto(buffer):
+            source_hasher.update(view[:size])
+            if audio_hasher is not None:
+                _update_range(audio_hasher, view, position, size, audio_range)
+            output_size = max(0, min(size, copy_end - position))
+            if output_size:
+                for offset, data in plan.patches:
+                    start = max(offset, position)
+                    end = min(offset + len(data), position + output_size)
+                    if start < end:
+                        buffer[start - position:end - position] = data[start - offset:end - offset]
+                for hasher in hashers.values():
+                    hasher.update(view[:output_size])
+                dst.write(view[:output_size])
+                written += output_size
+            position += size
+        # zero fill a missing pad byte after odd length data, before the new tail (as
+        # seeking past the end of the file does in apply_header_rewrite)
+        tail = b"\x00" * max(0, copy_end - written) + plan.tail
+        for hasher in hashers.values():
+            hasher.update(tail)
+        dst.write(tail)
+    shutil.copystat(source, destination)
+    digests = _hexdigests(hashers, audio_hasher)
+    if cache is not None:
+        source_digests = {"md5": source_hasher.hexdigest()}
+        if audio_hasher is not None:
+            source_digests[AUDIO_DIGEST] = digests[AUDIO_DIGEST]
+        cache.put(source, source_digests, source_stat)
+        cache.put(destination, digests)
+    return source_hasher.hexdigest(), digests
+
+
+def _read_md5_sidecar(file, suffix=".md5"):
+    """Return the 32 character digest stored in the file's .md5 (or other suffix) sidecar."""
+    with open(f"{file}{suffix}", "r") as md5_file:
+        return md5_file.read(32)
+
+
+def _read_audio_sidecar(file):
+    """Return the digest stored in the file's .audio.md5 sidecar (labelled or plain md5sum format)."""
+    with open(f"{file}{AUDIO_SIDECAR_SUFFIX}", "r") as md5_file:
+        line = md5_file.readline().strip()
+    return line.rpartition(" = ")[2] if line.startswith("audio-md5 ") else line[:32]
+
+
+def _cached_hash_file(file, algorithms, cache, audio=False):
+    """hash_file, answered from the checksum cache when the file is unchanged.
+
+    With audio, the audio payload digest of a WAV is required as well.
+    Returns bytes_read of 0 for cache hits. Each read is recorded in the run
+    metrics as stage "hash", each cache hit as "hash.cached".
+    """
+    start = time.perf_counter()
+    audio_range = wav_audio_range(file) if audio else None
+    required = [*algorithms, AUDIO_DIGEST] if audio_range is not None else algorithms
+    digests = cache.get(file, required) if cache is not None else None
+    if digests is not None:
+        metrics.record("hash.cached", file, 0, time.perf_counter() - start)
+        return digests, 0
+    try:
+        stat = os.stat(file)
+        digests, bytes_read = hash_file(file, algorithms=algorithms, audio_range=audio_range)
+    except Exception as e:
+        metrics.record("hash", file, 0, time.perf_counter() - start, str(e))
+        raise
+    metrics.record("hash", file, bytes_read, time.perf_counter() - start)
+    if cache is not None:
+        cache.put(file, digests, stat)
+    return digests, bytes_read
+
+
+def _checksum_worker(file, verify, algorithms, cache, audio=False):
+    """Hash a single file for batch_checksum_generate.
+
+    Runs on a pool thread and only touches local state (the cache handles
+    its own locking); errors are returned in the result rather than raised.
+    """
+    start = time.perf_counter()
+    bytes_read = 0
+    digests = {}
+    try:
+        digests, bytes_read = _cached_hash_file(file, algorithms, cache, audio)
+        verified = digests["md5"] == _read_md5_sidecar(file) if verify else None
+    except Exception as e:
+        elapsed = time.perf_counter() - start
+        return ChecksumResult(file, digests.get("md5"), digests, bytes_read, elapsed, False, str(e))
+    elapsed = time.perf_counter() - start
+    return ChecksumResult(file, digests["md5"], digests, bytes_read, elapsed, verified, None)
+
+
+def _fixity_worker(file):
+    """Re-read a file and classify it against its stored digests for fixity_audit.
+
+    Runs on a pool thread; errors are returned in the result rather than raised.
+    """
+    digests = {}
+    try:
+        header = read_wav_header(file) if file.lower().endswith(".wav") else None
+    except (ValueError, OSError):
+        header = None  # unparsable header: whole-file check only
+    try:
+        digests, _ = hash_file(file, audio_range=data_range(header) if header is not None else None)
+        expected = _read_md5_sidecar(file) if os.path.exists(f"{file}.md5") else None
+        expected_audio = []
+        if os.path.exists(f"{file}{AUDIO_SIDECAR_SUFFIX}"):
+            expected_audio.append(_read_audio_sidecar(file))
+        if header is not None and header.audio_md5 is not None:
+            expected_audio.append(header.audio_md5)
+    except Exception as e:
+        return FixityResult(file, "error", digests, str(e))
+    if expected_audio and AUDIO_DIGEST in digests:
+        if any(digest != digests[AUDIO_DIGEST] for digest in expected_audio):
+            status = "audio corrupt"
+        elif expected is not None and expected != digests["md5"]:
+            status = "header drift"
+        else:
+            status = "ok"
+    elif expected is None:
+        status = "no checksum"
+    else:
+        status = "ok" if expected == digests["md5"] else "changed"
+    return FixityResult(file, status, digests, None)
+
+
+def _bounded_map(function, items, max_workers):
+    """Yield function(item) for each item from a thread pool, in completion order.
+
+    At most max_workers * 2 items are queued at a time, so huge iterables
+    are consumed lazily. If the caller stops early (or is interrupted),
+    queued items that have not started are cancelled.
+    """
+    items = iter(items)
+    end = object()  # items may themselves be None
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = set()
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < max_workers * 2:  # bound queued work
+                    item = next(items, end)
+                    if item is end:
+                        exhausted = True
+                    else:
+                        pending.add(pool.submit(function, item))
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        except BaseException:
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
 
 
 class ChecksumService:
     """Service for creating and verifying MD5 checksums for files.
 
+    Args:
+        algorithms (list[str]|None): Extra hashlib algorithms to compute with
+            each MD5; defaults to CHECKSUM_ALGORITHMS.
+        cache (ChecksumCache|None): Persistent digest cache consulted before
+            reading a file, and updated with every digest computed.
+
     Attributes:
         file_checksum (str|None): Most recently generated checksum hex digest.
+        file_digests (dict[str, str]): All digests (MD5 + extras) of the most recent file.
         verified_status (bool): Result of last verification attempt.
         failed_files (list[str]): Basenames of files whose checksums failed verification.
     """
-    def __init__(self):
+    def __init__(self, algorithms=None, cache=None):
+        self.algorithms = CHECKSUM_ALGORITHMS if algorithms is None else list(algorithms)
+        self.cache = cache
+        _new_hashers(self.algorithms)  # fail early on unknown algorithm names
         self.file_checksum = None
+        self.file_digests = {}
         self.verified_status = False
         self.failed_files = []
 
-    def file_checksum_generate(self, file):
+    def file_checksum_generate(self, file, use_cache=True):
         """Generate and store the MD5 checksum for the given file path.
 
         Args:
             file (str): Absolute or relative path to the file whose checksum is required.
+            use_cache (bool): Accept a cached digest if the file is unchanged;
+                pass False to force a read (e.g. fixity audits).
+        Raises:
+            ValueError: If the file cannot be read.
+        """
+        try:
+            cache = self.cache if use_cache else None
+            self.file_digests, _ = _cached_hash_file(file, self.algorithms, cache)
+            self.file_checksum = self.file_digests["md5"]
+        except Exception as e:
+            logger.critical(f"Error generating checksum for {file}. {e}")
+            raise ValueError(e)
+
+    def generate_digests(self, file, use_cache=True, audio=False):
+        """Return the MD5 (plus any extra) digests of a file.
+
+        Unlike file_checksum_generate this updates no attributes, so it can
+        be used from worker threads.
+
+        Args:
+            file (str): Path to the file.
+            use_cache (bool): Accept a cached digest if the file is unchanged.
+            audio (bool): Also return a WAV's audio payload MD5 (AUDIO_DIGEST).
+        Returns:
+            dict[str, str]: {algorithm: hex digest}, always including "md5".
         Raises:
             ValueError: If the file cannot be read.
         """
         try:
-            file_hash = hashlib.md5()
-            with open(file, "rb") as f:
-                while chunk := f.read(8192):
-                    file_hash.update(chunk)
-                self.file_checksum = file_hash.hexdigest()
+            digests, _ = _cached_hash_file(file, self.algorithms, self.cache if use_cache else None, audio)
         except Exception as e:
             logger.critical(f"Error generating checksum for {file}. {e}")
             raise ValueError(e)
+        return digests
 
-    def write_checksum_to_file(self, file, md5_file_name):
-        """Write the stored checksum to a .md5 sidecar file in standard format.
+    def file_copy_and_checksum(self, source, destination):
+        """Copy a file and generate its MD5 checksum from a single read pass.
+
+        Each block read from the source is written to the destination and fed
+        to the hash(es), so large files are only read once (see copy_and_hash).
+        The MD5 digest is stored in file_checksum and all digests in
+        file_digests, including the audio payload MD5 (AUDIO_DIGEST) of WAVs.
+        The copy is recorded in the run metrics as stage "copy".
+
+        Args:
+            source (str): Path of the file to copy.
+            destination (str): Target file path to create/overwrite.
+        Returns:
+            str: MD5 hex digest of the copied bytes.
+        Raises:
+            ValueError: If the file cannot be read, written or its metadata copied.
+        """
+        try:
+            with metrics.timer("copy", source, os.path.getsize(source)):
+                self.file_digests = copy_and_hash(
+                    source, destination, self.algorithms, self.cache, audio_range=wav_audio_range(source)
+                )
+            self.file_checksum = self.file_digests["md5"]
+        except Exception as e:
+            logger.critical(f"Error copying {source} to {destination}. {e}")
+            raise ValueError(e)
+        return self.file_checksum
+
+    def file_copy_rewrite_and_checksum(self, source, destination, plan):
+        """Copy a file applying a header rewrite plan, checksumming source and output in one pass.
+
+        See copy_patch_and_hash. The output MD5 is stored in file_checksum
+        and all output digests in file_digests, including the audio payload
+        MD5 (AUDIO_DIGEST). The copy is recorded in the run metrics as stage "copy".
+
+        Args:
+            source (str): Path of the file to copy.
+            destination (str): Target file path to create/overwrite.
+            plan (HeaderRewritePlan): Header changes to apply.
+        Returns:
+            str: MD5 hex digest of the source bytes.
+        Raises:
+            ValueError: If the file cannot be read, written or its metadata copied.
+        """
+        try:
+            with metrics.timer("copy", source, os.path.getsize(source)):
+                source_checksum, self.file_digests = copy_patch_and_hash(
+                    source, destination, plan, self.algorithms, self.cache, audio_range=wav_audio_range(source)
+                )
+            self.file_checksum = self.file_digests["md5"]
+        except Exception as e:
+            logger.critical(f"Error copying {source} to {destination}. {e}")
+            raise ValueError(e)
+        return source_checksum
+
+    def batch_checksum_generate(self, files, verify=False, max_workers=None, use_cache=True, audio=False):
+        """Generate MD5 checksums for many files on a bounded thread pool.
+
+        hashlib releases the GIL while hashing, so files are read and hashed
+        concurrently. Workers share no state: each returns a ChecksumResult,
+        yielded here as it completes (not in input order). Files that fail
+        verification or cannot be read are added to failed_files.
+
+        Args:
+            files (iterable[str]): Paths of the files to hash.
+            verify (bool): Compare each digest against the file's .md5 sidecar.
+            max_workers (int|None): Pool size; defaults to CHECKSUM_WORKERS.
+            use_cache (bool): Accept cached digests for unchanged files
+                (reported with bytes_read 0).
+            audio (bool): Also compute the audio payload MD5 of WAVs (AUDIO_DIGEST).
+        Yields:
+            ChecksumResult: file, checksum (MD5), digests (MD5 + extras),
+                bytes_read, elapsed (seconds), verified (None when verify is
+                False) and error (None on success).
+        """
+        max_workers = max_workers or CHECKSUM_WORKERS
+        cache = self.cache if use_cache else None
+
+        def worker(file):
+            return _checksum_worker(file, verify, self.algorithms, cache, audio)
+
+        for result in _bounded_map(worker, files, max_workers):
+            if result.error is not None:
+                logger.critical(f"Error generating checksum for {result.file}. {result.error}")
+            if result.verified is False:
+                self.failed_files.append(os.path.basename(result.file))
+            yield result
+
+    def fixity_audit(self, files, max_workers=None):
+        """Re-read files and check them against their stored digests.
+
+        Each file is read in full (the cache is bypassed) and its MD5 compared
+        with the .md5 sidecar. For WAVs, the audio payload MD5 is compared
+        with the .audio.md5 sidecar and any MD5 chunk embedded by bwfmetaedit,
+        so a changed header can be told apart from corrupted audio.
+
+        Args:
+            files (iterable[str]): Paths of the files to audit.
+            max_workers (int|None): Pool size; defaults to CHECKSUM_WORKERS.
+        Yields:
+            FixityResult: file, status, digests (as read) and error, in
+                completion order. status is one of:
+                "ok"; "header drift" (file MD5 differs, audio intact);
+                "audio corrupt" (audio MD5 differs); "changed" (file MD5
+                differs, no audio digest to tell why); "no checksum"; "error".
+        """
+        for result in _bounded_map(_fixity_worker, files, max_workers or CHECKSUM_WORKERS):
+            if result.status == "error":
+                logger.critical(f"Error auditing {result.file}. {result.error}")
+            elif result.status in ("audio corrupt", "changed"):
+                logger.critical(f"Fixity audit: {result.status} {result.file}")
+            elif result.status != "ok":
+                logger.warning(f"Fixity audit: {result.status} {result.file}")
+            yield result
+
+    def write_checksum_to_file(self, file, md5_file_name, checksum=None):
+        """Write a checksum to a .md5 sidecar file in standard format.
 
         Format written: '<checksum> *<basename>' matching common md5sum output.
 
         Args:
             file (str): Original file path (used for basename only).
             md5_file_name (str): Target .md5 file path to create/overwrite.
+            checksum (str|None): Digest to write; defaults to the stored file_checksum.
         Raises:
             ValueError: If the checksum file cannot be written.
         """
+        checksum = checksum or self.file_checksum
         try:
             with open(md5_file_name, "w") as md5_file:
-                md5_file.write(f"{self.file_checksum} *{os.path.basename(file)}")
+                md5_file.write(f"{checksum} *{os.path.basename(file)}")
         except Exception as e:
             logger.critical(f"Error writing checksum to file {md5_file_name}. {e}")
             raise ValueError(e)
 
+    def write_extra_checksums(self, file, digests=None):
+        """Write one '<file>.<algorithm>' sidecar per extra algorithm.
+
+        Uses the same '<digest> *<basename>' format as the .md5 sidecar
+        (matching sha256sum / b2sum output).
+
+        Args:
+            file (str): Original file path.
+            digests (dict[str, str]|None): Digests to write; defaults to file_digests.
+        Returns:
+            list[str]: Paths of the sidecars written.
+        Raises:
+            ValueError: If a sidecar cannot be written.
+        """
+        digests = digests or self.file_digests
+        written = []
+        for algorithm in self.algorithms:
+            sidecar = f"{file}.{algorithm}"
+            try:
+                with open(sidecar, "w") as sidecar_file:
+                    sidecar_file.write(f"{digests[algorithm]} *{os.path.basename(file)}")
+            except Exception as e:
+                logger.critical(f"Error writing checksum to file {sidecar}. {e}")
+                raise ValueError(e)
+            written.append(sidecar)
+        return written
+
+    def write_audio_checksum(self, file, checksum=None):
+        """Write a WAV's audio payload MD5 to its '<file>.audio.md5' sidecar.
+
+        Format written: 'audio-md5 (data chunk of <basename>) = <checksum>',
+        deliberately not md5sum's, as it is not the digest of the whole file.
+
+        Args:
+            file (str): WAV file path.
+            checksum (str|None): Digest to write; defaults to the AUDIO_DIGEST
+                of file_digests.
+        Raises:
+            ValueError: If the sidecar cannot be written.
+        """
+        checksum = checksum or self.file_digests[AUDIO_DIGEST]
+        try:
+            with open(f"{file}{AUDIO_SIDECAR_SUFFIX}", "w") as md5_file:
+                md5_file.write(f"{AUDIO_SIDECAR_LABEL.format(name=os.path.basename(file))}{checksum}\n")
+        except Exception as e:
+            logger.critical(f"Error writing checksum to file {file}{AUDIO_SIDECAR_SUFFIX}. {e}")
+            raise ValueError(e)
+
+    def audio_sidecar_matches(self, file, checksum):
+        """Compare an audio payload MD5 with the file's .audio.md5 sidecar.
+
+        Returns:
+            bool|None: Whether they match, or None if there is no sidecar.
+        Raises:
+            ValueError: If the sidecar cannot be read.
+        """
+        if not os.path.exists(f"{file}{AUDIO_SIDECAR_SUFFIX}"):
+            return None
+        try:
+            return checksum == _read_audio_sidecar(file)
+        except Exception as e:
+            logger.critical(f"Error reading checksum file {file}{AUDIO_SIDECAR_SUFFIX}. {e}")
+            raise ValueError(e)
+
+    def is_checksum_sidecar(self, file):
+        """Return True if file is named as a checksum sidecar (.md5, .audio.md5 or an extra algorithm)."""
+        return file.endswith(tuple(f".{algorithm}" for algorithm in ["md5", *self.algorithms]))
+
+    def checksum_sidecars(self, file):
+        """Return the existing checksum sidecar paths (.md5 + extras + .audio.md5) for a file."""
+        return [
+            sidecar
+            for sidecar in [
+                *(f"{file}.{algorithm}" for algorithm in ["md5", *self.algorithms]),
+                f"{file}{AUDIO_SIDECAR_SUFFIX}",
+            ]
+            if os.path.exists(sidecar)
+        ]
+
+    def sidecar_matches(self, file, checksum):
+        """Return True if checksum matches the file's .md5 sidecar.
+
+        Unlike file_checksum_verify this updates no attributes, so it can be
+        used from worker threads.
+
+        Args:
+            file (str): Path to the original file ('.md5' extension is appended).
+            checksum (str): MD5 hex digest to compare.
+        Raises:
+            ValueError: If the .md5 file cannot be read.
+        """
+        try:
+            return checksum == _read_md5_sidecar(file)
+        except Exception as e:
+            logger.critical(f"Error reading checksum file {file}.md5. {e}")
+            raise ValueError(e)
+
     def file_checksum_verify(self, file):
         """Verify the current stored checksum matches the file's .md5 sidecar.
 
@@ -83,17 +699,25 @@ class ChecksumService:
             self.verified_status = False
             self.failed_files.append(os.path.basename(file))
 
-    def delete_exisiting_checksums(self, location):  # NOTE: retained original method name (typo) for compatibility
-        """Delete all .md5 files in the provided directory.
+    def delete_exisiting_checksums(self, location, keep=()):  # NOTE: retained original method name (typo) for compatibility
+        """Delete all checksum sidecar files (.md5 + extras) in the provided directory.
+
+        Audio payload sidecars (.audio.md5) are kept: header rewrites leave them valid.
 
         Args:
-            location (str): Directory path in which to remove '*.md5' files.
+            location (str): Directory path in which to remove '*.md5' (and
+                '*.<algorithm>') files.
+            keep (collection[str]): Files whose sidecars are kept.
         Raises:
             ValueError: If deletion fails for any file.
         """
         try:
-            for file in glob.glob(location + "/*.md5"):
-                os.remove(file)
+            for algorithm in ["md5", *self.algorithms]:
+                for file in glob.glob(location + f"/*.{algorithm}"):
+                    if file.endswith(AUDIO_SIDECAR_SUFFIX):
+                        continue
+                    if file[: -len(algorithm) - 1] not in keep:
+                        os.remove(file)
         except Exception as e:
             logger.critical(f"Error deleting existing checksum files. {e}")
             raise ValueError(e)
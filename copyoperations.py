@@ -0,0 +1,136 @@
+"""Kernel copy engine for copies that do not need hashing.
+
+Copies file contents with os.copy_file_range (in-kernel, and server-side or
+reflinked on filesystems that support it) or os.sendfile, in large chunks,
+falling back to a buffered userspace pread/pwrite loop when the kernel
+refuses (old kernels, cross-filesystem copy_file_range, special files). Each
+engine continues from the offset the previous one reached (the size of the
+destination, as every engine writes it in order). File metadata is then
+copied as per shutil.copy2.
+
+Copies that are hashed as they are written (WAVs into staging or the mirror,
+see checksumoperations.copy_and_hash) have to pass through userspace and do
+not use this engine.
+
+Environment variables used:
+  * COPY_ENGINE: "auto" (default; copy_file_range, then sendfile, then
+    userspace), "copy_file_range", "sendfile" or "userspace"; each falls
+    back to the engines after it.
+  * COPY_CHUNK_SIZE: bytes per kernel call (default 64 MiB).
+"""
+import os
+import errno
+import shutil
+from dotenv import load_dotenv
+
+from logging_module import logger
+
+load_dotenv()
+
+COPY_ENGINES = ["copy_file_range", "sendfile", "userspace"]  # fallback order
+COPY_ENGINE = (os.getenv("COPY_ENGINE") or "auto").lower()
+COPY_CHUNK_SIZE = int(os.getenv("COPY_CHUNK_SIZE") or 64 * 1024 * 1024)
+USERSPACE_BUFFER_SIZE = 1024 * 1024
+FALLBACK_ERRNOS = {  # the kernel cannot copy between these files with this call
+    errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL, errno.EBADF, errno.ENOTSUP, errno.EPERM,
+}
+
+
+def _copy_file_range(src, dst, offset, chunk_size):
+    while copied := os.copy_file_range(src, dst, chunk_size, offset, offset):
+        offset += copied
+    return offset
+
+
+def _sendfile(src, dst, offset, chunk_size):
+    os.lseek(dst, offset, os.SEEK_SET)  # sendfile writes at the output file position
+    while sent := os.sendfile(dst, src, offset, chunk_size):
+        offset += sent
+    return offset
+
+
+def _userspace(src, dst, offset, chunk_size):
+    while block := os.pread(src, USERSPACE_BUFFER_SIZE, offset):
+        view = memoryview(block)
+        while view:
+            written = os.pwrite(dst, view, offset)
+            view = view[written:]
+            offset += written
+    return offset
+
+
+_ENGINE_FUNCTIONS = {
+    "copy_file_range": _copy_file_range,
+    "sendfile": _sendfile,
+    "userspace": _userspace,
+}
+_unavailable = set()  # engines the kernel has refused with ENOSYS; not retried
+
+
+def _engine_available(name):
+    # the kernel engines are named after the os function they need, which
+    # some platforms lack (sendfile on Windows, copy_file_range before 3.8)
+    return name == "userspace" or (name not in _unavailable and hasattr(os, name))
+
+
+def copy_file_contents(source, destination, engine=None, chunk_size=None):
+    """Copy the contents of source to destination (created or truncated).
+
+    Args:
+        source (str): File to copy.
+        destination (str): Target file path.
+        engine (str|None): First engine to try ("auto" or one of
+            COPY_ENGINES); defaults to COPY_ENGINE.
+        chunk_size (int|None): Bytes per kernel call; defaults to COPY_CHUNK_SIZE.
+    Returns:
+        tuple[str, int]: Engine that finished the copy and bytes copied.
+    Raises:
+        ValueError: If the engine is unknown.
+        shutil.SameFileError: If source and destination are the same file
+            (opening the destination would truncate the source).
+        OSError: If the file cannot be read or written, or no engine could
+            finish the copy.
+    """
+    if os.path.exists(destination) and os.path.samefile(source, destination):
+        raise shutil.SameFileError(f"{source!r} and {destination!r} are the same file")
+    engine = engine or COPY_ENGINE
+    if engine != "auto" and engine not in COPY_ENGINES:
+        raise ValueError(f"Unknown copy engine: {engine}")
+    engines = COPY_ENGINES if engine == "auto" else COPY_ENGINES[COPY_ENGINES.index(engine):]
+    engines = [name for name in engines if _engine_available(name)]
+    chunk_size = chunk_size or COPY_CHUNK_SIZE
+    offset = 0
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        for name in engines:
+            try:
+                offset = _ENGINE_FUNCTIONS[name](src.fileno(), dst.fileno(), offset, chunk_size)
+                return name, offset
+            except OSError as e:
+                if name == "userspace" or e.errno not in FALLBACK_ERRNOS:
+                    raise
+                if e.errno == errno.ENOSYS:
+                    _unavailable.add(name)
+                offset = os.fstat(dst.fileno()).st_size  # bytes copied before the engine failed
+                logger.debug(f"{name} not possible for {source}, continuing at byte {offset}. {e}")
+    raise OSError(errno.ENOSYS, f"No copy engine could copy {source} to {destination} (tried {engines})")
+
+
+def copy2(source, destination, engine=None):
+    """Drop-in for shutil.copy2 using the kernel copy engine.
+
+    Args:
+        source (str): File to copy.
+        destination (str): Target file path, or a directory to copy into.
+        engine (str|None): See copy_file_contents.
+    Returns:
+        str: Path of the copy.
+    Raises:
+        shutil.SameFileError: If source and destination are the same file
+            (opening the destination would truncate the source).
+        OSError: If the file cannot be copied or its metadata set.
+    """
+    if os.path.isdir(destination):
+        destination = os.path.join(destination, os.path.basename(source))
+    copy_file_contents(source, destination, engine)
+    shutil.copystat(source, destination)
+    return destination
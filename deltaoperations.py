@@ -0,0 +1,128 @@
+"""Block-level delta updates for mirrored files.
+
+A changed file is compared with its existing mirror copy in fixed-size blocks:
+each source block's signature (SHA-256, hardware accelerated on current CPUs,
+truncated to 128 bits) is compared with the signature of the block at the
+same offset in the mirror, and only blocks that differ are written. Appending audio or editing a header in place therefore
+rewrites a few blocks instead of the whole recording. The mirror's block
+signatures are kept in the checksum cache, so an unchanged mirror copy is not
+read back to find them.
+
+The whole-file digests (MD5 plus any extra algorithms) are computed from the
+same source read, so the result can be verified against the .md5 sidecar as
+with a full copy.
+
+Environment variables used:
+  * MIRROR_DELTA_TRANSFER: "true" to enable delta updates (default false).
+  * DELTA_BLOCK_SIZE: bytes per compared block (default 1 MiB).
+  * DELTA_MIN_SIZE: smaller files are copied whole (default 16 MiB).
+"""
+import os
+import hashlib
+import shutil
+from dotenv import load_dotenv
+
+from logging_module import logger
+from checksumoperations import _new_hashers, _hexdigests
+
+load_dotenv()
+
+MIRROR_DELTA_TRANSFER = os.getenv("MIRROR_DELTA_TRANSFER", "false").lower() == "true"
+DELTA_BLOCK_SIZE = int(os.getenv("DELTA_BLOCK_SIZE") or 1024 * 1024)
+DELTA_MIN_SIZE = int(os.getenv("DELTA_MIN_SIZE") or 16 * 1024 * 1024)
+SIGNATURE_SIZE = 16  # bytes per block signature
+
+
+def block_signature(block):
+    """Return the signature of one block."""
+    return hashlib.sha256(block).digest()[:SIGNATURE_SIZE]
+
+
+def _read_block(file, view):
+    """Fill view from an unbuffered file, short only at the end of the file; return the bytes read."""
+    filled = 0
+    while filled < len(view) and (size := file.readinto(view[filled:])):
+        filled += size
+    return filled
+
+
+def _pread_block(fd, size, offset):
+    """Read size bytes at offset, fewer only at the end of the file."""
+    block = os.pread(fd, size, offset)
+    while len(block) < size and (more := os.pread(fd, size - len(block), offset + len(block))):
+        block += more
+    return block
+
+
+def _pwrite_all(fd, block, offset):
+    """Write all of block at offset (os.pwrite may write less)."""
+    while block:
+        written = os.pwrite(fd, block, offset)
+        block = block[written:]
+        offset += written
+
+
+def delta_copy_and_hash(source, destination, algorithms=(), cache=None, block_size=None):
+    """Update destination in place so it matches source, writing only changed blocks.
+
+    Mirror block signatures are taken from the cache when the mirror copy is
+    unchanged since they were stored, else read from the mirror copy as the
+    comparison proceeds. Cached digests and signatures of the mirror copy are
+    invalidated before it is modified; new ones are stored once it matches
+    the source. File metadata is then copied as per shutil.copy2.
+
+    Args:
+        source (str): Path of the changed file.
+        destination (str): Existing mirror copy to update.
+        algorithms (iterable[str]): Extra hashlib algorithms to compute with MD5.
+        cache (ChecksumCache|None): Digest and signature cache.
+        block_size (int|None): Bytes per block; defaults to DELTA_BLOCK_SIZE.
+    Returns:
+        tuple[dict[str, str], int]: ({algorithm: hex digest} of source, always
+            including "md5"; bytes written to destination).
+    Raises:
+        OSError: If either file cannot be read or written.
+    """
+    block_size = block_size or DELTA_BLOCK_SIZE
+    source_stat = os.stat(source)
+    mirror_signatures = None
+    if cache is not None:
+        mirror_signatures = cache.get_signatures(destination, block_size)
+        cache.invalidate(destination)
+    hashers = _new_hashers(algorithms)
+    signatures = bytearray()
+    buffer = bytearray(block_size)
+    view = memoryview(buffer)
+    bytes_written = 0
+    offset = 0
+    with open(source, "rb", buffering=0) as src, open(destination, "r+b", buffering=0) as dst:
+        mirror_size = os.fstat(dst.fileno()).st_size
+        while size := _read_block(src, view):  # whole blocks, so block indexes stay aligned
+            block = view[:size]
+            for hasher in hashers.values():
+                hasher.update(block)
+            signature = block_signature(block)
+            signatures += signature
+            index = offset // block_size
+            if mirror_signatures is not None:
+                start = index * SIGNATURE_SIZE
+                mirror_signature = mirror_signatures[start:start + SIGNATURE_SIZE]
+            elif offset < mirror_size:
+                mirror_signature = block_signature(_pread_block(dst.fileno(), block_size, offset))
+            else:
+                mirror_signature = None
+            if signature != mirror_signature:
+                _pwrite_all(dst.fileno(), block, offset)
+                bytes_written += size
+            offset += size
+        dst.truncate(offset)
+    shutil.copystat(source, destination)
+    digests = _hexdigests(hashers)
+    if cache is not None:
+        cache.put(source, digests, source_stat)
+        cache.put(destination, digests)
+        cache.put_signatures(destination, block_size, bytes(signatures))
+    logger.info(
+        f"Delta update of {destination}: {bytes_written} of {offset} bytes written"
+    )
+    return digests, bytes_written
@@ -0,0 +1,212 @@
+"""Source / mirror tree diff.
+
+Compares two streams of ScanEntry records with a sorted merge-join: each
+side is sorted by relative path (O(n log n)) and the two sorted streams are
+walked once in step. Sorting spills to temporary files in sorted runs once a
+side exceeds DIFF_MAX_IN_MEMORY records, and the runs are merged back lazily,
+so memory stays bounded on trees with millions of entries.
+
+pair_moves then matches new entries with removed ones holding the same
+content, so files moved or renamed in the source can be renamed in the mirror
+rather than copied again.
+
+Environment variables used: DIFF_MAX_IN_MEMORY (records held in memory per
+side before spilling, default 1000000).
+"""
+import os
+import heapq
+import itertools
+import pickle
+import tempfile
+from collections import namedtuple, defaultdict
+from dotenv import load_dotenv
+
+from logging_module import logger
+
+load_dotenv()
+
+DIFF_MAX_IN_MEMORY = int(os.getenv("DIFF_MAX_IN_MEMORY") or 1_000_000)
+SPILL_BATCH_SIZE = 10_000  # records pickled per write when spilling a run
+INTERLEAVE_BATCH_SIZE = 1000  # records read from one side before switching to the other
+
+ChangedEntry = namedtuple("ChangedEntry", ["relpath", "size", "mtime_ns", "reason"])
+MovedEntry = namedtuple("MovedEntry", ["relpath", "size", "mtime_ns", "from_relpath", "digest"])
+
+
+def _spill(run):
+    """Write a sorted run to a temporary file and return it rewound."""
+    run_file = tempfile.TemporaryFile()
+    for start in range(0, len(run), SPILL_BATCH_SIZE):
+        pickle.dump(run[start:start + SPILL_BATCH_SIZE], run_file, pickle.HIGHEST_PROTOCOL)
+    run_file.seek(0)
+    return run_file
+
+
+def _read_run(run_file):
+    try:
+        while True:
+            try:
+                batch = pickle.load(run_file)
+            except EOFError:
+                return
+            yield from batch
+    finally:
+        run_file.close()
+
+
+class _SortedRuns:
+    """Collects records into sorted runs, spilling each full run to disk."""
+
+    def __init__(self, max_in_memory):
+        self.max_in_memory = max_in_memory
+        self.run = []
+        self.run_files = []
+
+    def extend(self, entries):
+        for entry in entries:
+            self.run.append(entry)
+            if len(self.run) >= self.max_in_memory:
+                self.run.sort()
+                self.run_files.append(_spill(self.run))
+                self.run = []
+
+    def merged(self):
+        """Yield every record collected, in relpath order."""
+        self.run.sort()
+        if not self.run_files:
+            yield from self.run
+            return
+        logger.info(f"Mirror diff spilled {len(self.run_files)} sorted runs to disk")
+        yield from heapq.merge(*[_read_run(run_file) for run_file in self.run_files], iter(self.run))
+
+
+def sorted_entries(entries, max_in_memory=None):
+    """Yield entries sorted by relpath, using an external sort above max_in_memory.
+
+    Args:
+        entries (iterable[ScanEntry]): Records to sort (relpaths must be unique).
+        max_in_memory (int|None): Records per in-memory run; defaults to DIFF_MAX_IN_MEMORY.
+    Yields:
+        ScanEntry: Records in relpath order.
+    """
+    runs = _SortedRuns(max_in_memory or DIFF_MAX_IN_MEMORY)
+    runs.extend(entries)
+    yield from runs.merged()
+
+
+def sorted_together(*sides, max_in_memory=None):
+    """Sort several record streams, reading them in turn.
+
+    INTERLEAVE_BATCH_SIZE records are taken from each unfinished stream in
+    turn, so streams fed by concurrent scans are all read while they run
+    (see scanoperations.scan_trees_concurrently) rather than one scan
+    waiting until the other has been read to the end.
+
+    Args:
+        *sides (iterable[ScanEntry]): Record streams (relpaths unique within each).
+        max_in_memory (int|None): See sorted_entries.
+    Returns:
+        list[iterator[ScanEntry]]: Each side's records in relpath order.
+    """
+    iterators = [iter(side) for side in sides]
+    runs = [_SortedRuns(max_in_memory or DIFF_MAX_IN_MEMORY) for _ in sides]
+    unfinished = list(range(len(sides)))
+    while unfinished:
+        for index in list(unfinished):
+            batch = list(itertools.islice(iterators[index], INTERLEAVE_BATCH_SIZE))
+            runs[index].extend(batch)
+            if len(batch) < INTERLEAVE_BATCH_SIZE:
+                unfinished.remove(index)
+    return [side_runs.merged() for side_runs in runs]
+
+
+def size_changed(source_entry, mirror_entry):
+    """Default change test: report "size" when the sizes differ, else None."""
+    return "size" if source_entry.size != mirror_entry.size else None
+
+
+def diff_trees(source_entries, mirror_entries, compare=None, max_in_memory=None):
+    """Merge-join two trees and yield their differences.
+
+    Both sides are read in turn before the join (see sorted_together).
+
+    Args:
+        source_entries (iterable[ScanEntry]): Records from the source tree.
+        mirror_entries (iterable[ScanEntry]): Records from the mirror tree.
+        compare (callable|None): compare(source_entry, mirror_entry) returning a
+            reason string when a file present on both sides has changed, or
+            None when it has not; defaults to size_changed.
+        max_in_memory (int|None): See sorted_entries.
+    Yields:
+        tuple[str, ScanEntry|None, ScanEntry|None, str|None]:
+            (kind, source_entry, mirror_entry, reason) where kind is "new",
+            "changed" or "removed" and reason is set for changed entries.
+    """
+    compare = compare or size_changed
+    source, mirror = sorted_together(source_entries, mirror_entries, max_in_memory=max_in_memory)
+    source_entry = next(source, None)
+    mirror_entry = next(mirror, None)
+    while source_entry is not None or mirror_entry is not None:
+        if mirror_entry is None or (
+            source_entry is not None and source_entry.relpath < mirror_entry.relpath
+        ):
+            yield "new", source_entry, None, None
+            source_entry = next(source, None)
+        elif source_entry is None or mirror_entry.relpath < source_entry.relpath:
+            yield "removed", None, mirror_entry, None
+            mirror_entry = next(mirror, None)
+        else:
+            reason = compare(source_entry, mirror_entry)
+            if reason is not None:
+                yield "changed", source_entry, mirror_entry, reason
+            source_entry = next(source, None)
+            mirror_entry = next(mirror, None)
+
+
+def pair_moves(new_entries, removed_entries, source_digest, mirror_digest):
+    """Pair new and removed entries with the same size and digest as moves.
+
+    Digests are only requested for entries whose size matches an entry on
+    the other side, and each at most once. Among matching candidates one with
+    the same file name is preferred.
+
+    Args:
+        new_entries (list[ScanEntry]): Files only in the source.
+        removed_entries (list[ScanEntry]): Files only in the mirror.
+        source_digest (callable): source_digest(entry) returning the MD5 of a
+            new file, or None if it is not known (and the file is not paired).
+        mirror_digest (callable): As source_digest, for a removed mirror file.
+    Returns:
+        tuple[list[MovedEntry], list[ScanEntry], list[ScanEntry]]: Moves, and
+            the new and removed entries left unpaired.
+    """
+    removed_by_size = defaultdict(list)
+    for entry in removed_entries:
+        removed_by_size[entry.size].append(entry)
+    mirror_digests = {}
+    paired = set()
+    moved = []
+    new = []
+    for entry in new_entries:
+        candidates = [
+            candidate for candidate in removed_by_size.get(entry.size, ())
+            if candidate.relpath not in paired
+        ]
+        digest = source_digest(entry) if candidates else None
+        match = None
+        if digest is not None:
+            name = os.path.basename(entry.relpath)
+            candidates.sort(key=lambda candidate: os.path.basename(candidate.relpath) != name)
+            for candidate in candidates:
+                if candidate.relpath not in mirror_digests:
+                    mirror_digests[candidate.relpath] = mirror_digest(candidate)
+                if mirror_digests[candidate.relpath] == digest:
+                    match = candidate
+                    break
+        if match is None:
+            new.append(entry)
+        else:
+            paired.add(match.relpath)
+            moved.append(MovedEntry(entry.relpath, entry.size, entry.mtime_ns, match.relpath, digest))
+    removed = [entry for entry in removed_entries if entry.relpath not in paired]
+    return moved, new, removed
@@ -3,11 +3,16 @@
 Determines differences between a source engineer drive and its mirror, then
 applies incremental updates (new / changed / removed files) while optionally
 validating associated checksum sidecar files (.md5) when present.
+
+The mirror side of the comparison is read from the mirror manifest (see
+mirrormanifest) once one exists; MIRROR_FULL_RESCAN=true walks the mirror
+instead as a consistency check and rebuilds the manifest.
 """
 
 import os
-import glob
 import shutil
+import threading
+from contextlib import ExitStack
 from dotenv import load_dotenv
 from rich import print
 from rich.prompt import Prompt
@@ -15,50 +20,99 @@ import sys
 import time
 
 from logging_module import logger
-from checksumoperations import ChecksumService
+from metrics import metrics
+from checksumoperations import ChecksumService, copy_and_hash, _bounded_map
+from copyoperations import copy2
+from checksumcache import default_checksum_cache
+from scanoperations import scan_trees_concurrently, ScanEntry
+from diffoperations import diff_trees, pair_moves, ChangedEntry
+from mirrorjournal import MirrorJournal, partial_path
+from mirrormanifest import MirrorManifest
+from deltaoperations import delta_copy_and_hash, MIRROR_DELTA_TRANSFER, DELTA_MIN_SIZE
 from progressbar import progress_bar
 from messageoperations import MessagingService
 
 
 load_dotenv()
 
+DETECTION_TIERS = ("fast", "strict")
+MTIME_TOLERANCE_NS = 2 * 10**9  # FAT/exFAT drives store mtimes at 2 second resolution
+MIRROR_SOURCE_WORKERS = int(os.getenv("MIRROR_SOURCE_WORKERS") or 2)  # concurrent reads per source device
+MIRROR_DESTINATION_WORKERS = int(os.getenv("MIRROR_DESTINATION_WORKERS") or 4)  # concurrent writes per mirror device
+MIRROR_MOVE_HASH_MAX_SIZE = int(os.getenv("MIRROR_MOVE_HASH_MAX_SIZE") or 1024 * 1024)  # hash files this small to pair moves
+
 
 class DriveMirror:
     """Incrementally mirror a source drive into a destination engineer folder.
 
+    New and removed files with the same size and MD5 digest are treated as
+    moves and renamed within the mirror instead of being copied again.
+
+    Change detection tiers:
+        fast: a file has changed if its size or mtime differs from the mirror.
+        strict: as fast, then files that still match are compared by MD5
+            digest. The source file is always read (a same size edit with
+            its mtime restored would still hit the checksum cache); the
+            mirror digest comes from the manifest, checksum cache or an up
+            to date .md5 sidecar where possible rather than re-reading it.
+            Copied files with a .md5 sidecar are read back from the mirror
+            and verified (see call_checksum_operations).
+
     Attributes:
         source_drive (str): Root path of the engineer's source drive.
         DRIVE_MIRROR (str): Root path where engineer mirrors are stored.
         engineer_name (str): Engineer folder name under DRIVE_MIRROR.
-        mirrored_file (str|None): Path of the most recently copied file.
-        source_file_paths (list[tuple[str,int]]): Relative paths + sizes in source.
-        mirror_file_paths (list[tuple[str,int]]): Relative paths + sizes in mirror.
-        new_files_in_source (list[tuple[str,int]]): Files present only in source.
-        changed_files_in_source (list[tuple[str,int]]): Same path but different size.
-        removed_files_in_source (list[tuple[str,int]]): Files no longer in source.
+        detection_tier (str): "fast" or "strict" change detection.
+        full_rescan (bool): Walk the mirror rather than reading its manifest.
+        delta_transfer (bool): Update large changed files block by block.
+        manifest (MirrorManifest): Persistent record of the mirror's files.
+        new_files_in_source (list[ScanEntry]): Files present only in source.
+        changed_files_in_source (list[ChangedEntry]): Same path but changed; reason
+            records the check that flagged it ("size", "mtime" or "content").
+        moved_files_in_source (list[MovedEntry]): Files moved or renamed in source;
+            from_relpath is their current path in the mirror.
+        removed_files_in_source (list[ScanEntry]): Files no longer in source.
         cs (ChecksumService): Checksum service instance for validation.
         ms (MessagingService): Messaging/UX helper for prompts.
         progress_bar (callable): Progress bar function for CLI feedback.
     """
 
-    def __init__(self, source_drive, drive_mirror, engineer_name):
+    def __init__(
+        self, source_drive, drive_mirror, engineer_name, detection_tier=None, full_rescan=None, delta_transfer=None
+    ):
         """Initialize a new DriveMirror instance.
 
         Args:
             source_drive (str): Source drive root path.
             drive_mirror (str): Destination root path for mirrors.
             engineer_name (str): Engineer identifier / folder name.
+            detection_tier (str|None): "fast" or "strict"; defaults to the
+                MIRROR_DETECTION_TIER environment variable, else "fast".
+            full_rescan (bool|None): Consistency check mode; defaults to the
+                MIRROR_FULL_RESCAN environment variable, else False.
+            delta_transfer (bool|None): Write only the changed blocks of
+                changed files of at least DELTA_MIN_SIZE bytes; defaults to
+                the MIRROR_DELTA_TRANSFER environment variable, else False.
+        Raises:
+            ValueError: If the detection tier is not recognised.
         """
         self.source_drive = source_drive
         self.DRIVE_MIRROR = drive_mirror
         self.engineer_name = engineer_name
-        self.mirrored_file = None
-        self.source_file_paths = []
-        self.mirror_file_paths = []
+        self.detection_tier = detection_tier or os.getenv("MIRROR_DETECTION_TIER") or "fast"
+        if self.detection_tier not in DETECTION_TIERS:
+            raise ValueError(f"Unknown mirror detection tier: {self.detection_tier}")
+        if full_rescan is None:
+            full_rescan = os.getenv("MIRROR_FULL_RESCAN", "false").lower() == "true"
+        self.full_rescan = full_rescan
+        self.delta_transfer = MIRROR_DELTA_TRANSFER if delta_transfer is None else delta_transfer
+        self.manifest = MirrorManifest(os.path.join(drive_mirror, engineer_name))
         self.new_files_in_source = []
         self.changed_files_in_source = []
+        self.moved_files_in_source = []
         self.removed_files_in_source = []
-        self.cs = ChecksumService()
+        self.mirror_digests = {}
+        self.cs = ChecksumService(cache=default_checksum_cache())
         self.ms = MessagingService()
         self.progress_bar = progress_bar
 
@@ -72,75 +126,158 @@ class DriveMirror:
             return True
 
     def mirror_change_breakdown(self):
-        """Print a summary of new, changed, and removed files pending commit."""
+        """Print a summary of new, changed, moved and removed files pending commit."""
         print(f"\n[bold]New Files: {len(self.new_files_in_source)}[/bold]")
         for new_file in self.new_files_in_source:
             print(f" * {new_file[0]}")
 
         print(f"\n[bold]Changed Files: {len(self.changed_files_in_source)}[/bold]")
         for changed_file in self.changed_files_in_source:
-            print(f" * {changed_file[0]}")
+            print(f" * {changed_file[0]} ({changed_file.reason})")
+
+        print(f"\n[bold]Moved Files: {len(self.moved_files_in_source)}[/bold]")
+        for moved_file in self.moved_files_in_source:
+            print(f" * {moved_file.from_relpath} -> {moved_file[0]}")
 
         print(f"\n[bold]Removed Files: {len(self.removed_files_in_source)}[/bold]")
         for removed_file in self.removed_files_in_source:
             print(f" * {removed_file[0]}")
 
-    def check_source_mirror_changes(self):
-        """Populate diff lists (new/changed/removed) between source and mirror.
+    def stored_digest(self, file):
+        """Return a file's MD5 without reading it, or None if none is stored.
 
-        Returns:
-            bool: True if any differences are detected, False otherwise.
+        Looks in the checksum cache, then the .md5 sidecar (only trusted if
+        written no earlier than the file's last modification).
         """
-        full_source_list = glob.glob(
-            os.path.join(self.source_drive, "**/*.*"),
-            recursive=True,
-        )
-
-        full_destination_list = glob.glob(
-            os.path.join(self.DRIVE_MIRROR, self.engineer_name, "**/*.*"),
-            recursive=True,
+        if self.cs.cache is not None:
+            digests = self.cs.cache.get(file)
+            if digests is not None:
+                return digests["md5"]
+        try:
+            if os.path.getmtime(f"{file}.md5") >= os.path.getmtime(file):
+                with open(f"{file}.md5", "r") as md5_file:
+                    return md5_file.read(32)
+        except OSError:
+            pass
+        return None
+
+    def content_digest(self, file):
+        """Return a file's MD5, reading (and caching) it only if none is stored."""
+        digest = self.stored_digest(file)
+        if digest is None:
+            self.cs.file_checksum_generate(file)
+            digest = self.cs.file_checksum
+        return digest
+
+    def source_digest(self, file):
+        """Return a source file's MD5 read from its contents (the checksum cache is bypassed)."""
+        return self.cs.generate_digests(file, use_cache=False)["md5"]
+
+    def move_digest(self, file, size):
+        """Return a file's MD5 for move pairing: stored, or read if at most MIRROR_MOVE_HASH_MAX_SIZE bytes."""
+        if size <= MIRROR_MOVE_HASH_MAX_SIZE:
+            return self.content_digest(file)
+        return self.stored_digest(file)
+
+    def detect_moves(self):
+        """Move new/removed pairs holding the same content into moved_files_in_source.
+
+        Pairs are matched by size, then MD5 digest: from the mirror manifest,
+        checksum cache or .md5 sidecar, or read for small files. A .md5
+        sidecar is only paired if its file is not being copied, as copying a
+        file also copies its sidecar.
+        """
+        mirror_root = os.path.join(self.DRIVE_MIRROR, self.engineer_name)
+        moved, new, removed = pair_moves(
+            self.new_files_in_source,
+            self.removed_files_in_source,
+            lambda entry: self.move_digest(os.path.join(self.source_drive, entry.relpath), entry.size),
+            lambda entry: self.mirror_digests.get(entry.relpath)
+            or self.move_digest(os.path.join(mirror_root, entry.relpath), entry.size),
         )
+        copied_paths = {entry.relpath for entry in new}
+        for entry in moved:
+            if entry.relpath.endswith(".md5") and entry.relpath[:-4] in copied_paths:
+                new.append(ScanEntry(entry.relpath, entry.size, entry.mtime_ns))
+                removed.append(ScanEntry(entry.from_relpath, entry.size, entry.mtime_ns))
+            else:
+                self.moved_files_in_source.append(entry)
+        self.new_files_in_source = new
+        self.removed_files_in_source = removed
+
+    def compare_entries(self, source_entry, mirror_entry):
+        """Return the tier check that flags a file as changed, or None if unchanged."""
+        if source_entry.size != mirror_entry.size:
+            return "size"
+        if abs(source_entry.mtime_ns - mirror_entry.mtime_ns) > MTIME_TOLERANCE_NS:
+            return "mtime"
+        if self.detection_tier == "strict":
+            source_file = os.path.join(self.source_drive, source_entry.relpath)
+            mirror_file = os.path.join(self.DRIVE_MIRROR, self.engineer_name, mirror_entry.relpath)
+            mirror_digest = getattr(mirror_entry, "digest", None) or self.content_digest(mirror_file)
+            if self.source_digest(source_file) != mirror_digest:
+                return "content"
+        return None
+
+    @metrics.stage("mirror.diff")
+    def check_source_mirror_changes(self):
+        """Populate diff lists (new/changed/moved/removed) between source and mirror.
 
-        for source_file in full_source_list:
-            source_file_size = os.path.getsize(source_file)
-            relative_source_path = os.path.relpath(
-                source_file, os.path.join(self.source_drive)
-            )
-            self.source_file_paths.append((relative_source_path, source_file_size))
+        The source tree is scanned and streamed into a sorted merge-join
+        (see diffoperations) against the mirror manifest, which spills to disk
+        on very large trees. Without a manifest, or in full rescan mode, the
+        mirror is walked concurrently with the source and the manifest rebuilt.
+        Files on both sides are compared according to detection_tier, then
+        moves are paired from the new and removed files (see detect_moves).
 
-        for destination_file in full_destination_list:
-            mirror_file_size = os.path.getsize(destination_file)
-            relative_mirror_path = os.path.relpath(
-                destination_file, os.path.join(self.DRIVE_MIRROR, self.engineer_name)
+        Returns:
+            bool: True if any differences are detected, False otherwise.
+        """
+        mirror_root = os.path.join(self.DRIVE_MIRROR, self.engineer_name)
+        rescan = self.full_rescan or not self.manifest.exists()
+        if not rescan:
+            logger.info("Reading mirror state from manifest")
+            (source_scan,) = scan_trees_concurrently(self.source_drive)
+            mirror_entries = self.manifest.entries()
+        else:
+            logger.info("Scanning mirror tree (full rescan)")
+            source_scan, mirror_scan = scan_trees_concurrently(  # both trees walked at once
+                self.source_drive, mirror_root
             )
-            self.mirror_file_paths.append((relative_mirror_path, mirror_file_size))
-
-        self.new_files_in_source = [
-            key
-            for key in self.source_file_paths
-            if key[0] not in [source_key[0] for source_key in self.mirror_file_paths]
-        ]
-
-        self.changed_files_in_source = [
-            source_key
-            for source_key in self.source_file_paths
-            for mirror_key in self.mirror_file_paths
-            if source_key[0] == mirror_key[0] and source_key[1] != mirror_key[1]
-        ]
-
-        self.removed_files_in_source = [
-            key
-            for key in self.mirror_file_paths
-            if key[0] not in [mirror_key[0] for mirror_key in self.source_file_paths]
-        ]
+            mirror_entries = self.manifest.rescan(mirror_scan)
 
+        for kind, source_entry, mirror_entry, reason in diff_trees(
+            source_scan, mirror_entries, compare=self.compare_entries
+        ):
+            if kind == "new":
+                self.new_files_in_source.append(source_entry)
+            elif kind == "changed":
+                self.changed_files_in_source.append(ChangedEntry(*source_entry, reason))
+            else:
+                self.removed_files_in_source.append(ScanEntry(*mirror_entry[:3]))
+                if getattr(mirror_entry, "digest", None) is not None:
+                    self.mirror_digests[mirror_entry.relpath] = mirror_entry.digest
+
+        if rescan:
+            self.manifest.finish_rescan()
+            if os.path.isdir(mirror_root):
+                self.manifest.save()  # the rescan reflects the mirror as it is now
+
+        if self.new_files_in_source != [] and self.removed_files_in_source != []:
+            self.detect_moves()
+
+        change_reasons = {
+            reason: sum(1 for changed in self.changed_files_in_source if changed.reason == reason)
+            for reason in ("size", "mtime", "content")
+        }
         logger.info(
-            f"{len(self.new_files_in_source)} new files, {len(self.changed_files_in_source)} changed files, {len(self.removed_files_in_source)} removed files"
+            f"{len(self.new_files_in_source)} new files, {len(self.changed_files_in_source)} changed files {change_reasons}, {len(self.moved_files_in_source)} moved files, {len(self.removed_files_in_source)} removed files ({self.detection_tier} detection)"
         )
 
         if (
             self.new_files_in_source != []
             or self.changed_files_in_source != []
+            or self.moved_files_in_source != []
             or self.removed_files_in_source != []
         ):
             return True
@@ -148,7 +285,11 @@ class DriveMirror:
             return False
 
     def new_file_operations(self, new_file):
-        """Mirror a new file (create directories, copy, track last copied)."""
+        """Mirror a new file (create directories, copy + checksum, copy checksum if present).
+
+        Returns:
+            tuple[str, str]: Mirrored file path and the MD5 of the copied bytes.
+        """
         source_file = os.path.join(self.source_drive, new_file[0])
         destination_file = os.path.join(
             self.DRIVE_MIRROR, self.engineer_name, new_file[0]
@@ -156,76 +297,271 @@ class DriveMirror:
 
         os.makedirs(os.path.dirname(destination_file), exist_ok=True)
 
-        shutil.copy2(source_file, destination_file)
-
-        self.mirrored_file = destination_file
+        return self.copy_into_mirror(source_file, destination_file)
 
     def changed_file_operations(self, changed_file):
-        """Copy an updated file overwriting mirror copy and preserve checksum if present."""
+        """Copy an updated file overwriting mirror copy and preserve checksum if present.
+
+        With delta_transfer, files of at least DELTA_MIN_SIZE bytes are
+        updated in place, rewriting only the blocks that differ.
+
+        Returns:
+            tuple[str, str]: Mirrored file path and the MD5 of the copied bytes.
+        """
         source_file = os.path.join(self.source_drive, changed_file[0])
         destination_file = os.path.join(
             self.DRIVE_MIRROR, self.engineer_name, changed_file[0]
         )
-        shutil.copy2(source_file, destination_file)
+        delta = (
+            self.delta_transfer
+            and changed_file.size >= DELTA_MIN_SIZE
+            and os.path.exists(destination_file)
+        )
+        return self.copy_into_mirror(source_file, destination_file, delta)
+
+    def copy_into_mirror(self, source_file, destination_file, delta=False):
+        """Copy + checksum a file (and its .md5 sidecar if present) into the mirror.
+
+        Each copy is written to a hidden partial file and renamed into place,
+        so an interrupted run never leaves a half-written file under its real
+        name. A delta update is made in place; if interrupted, the journal
+        re-runs it on resume.
 
-        self.mirrored_file = destination_file
+        Args:
+            source_file (str): File in the source drive.
+            destination_file (str): Its path in the mirror.
+            delta (bool): Update the existing mirror copy block by block.
+        Returns:
+            tuple[str, str]: Mirrored file path and the MD5 of the copied bytes.
+        """
+        if delta:
+            digests, _ = delta_copy_and_hash(
+                source_file, destination_file, self.cs.algorithms, self.cs.cache
+            )
+        else:
+            digests = copy_and_hash(
+                source_file,
+                destination_file,
+                self.cs.algorithms,
+                self.cs.cache,
+                temp_path=partial_path(destination_file),
+            )
 
         if os.path.exists(f"{source_file}.md5"):
-            shutil.copy2(f"{source_file}.md5", f"{destination_file}.md5")
+            copy2(f"{source_file}.md5", partial_path(f"{destination_file}.md5"))
+            os.replace(partial_path(f"{destination_file}.md5"), f"{destination_file}.md5")
+
+        return destination_file, digests["md5"]
+
+    def moved_file_operations(self, moved_file):
+        """Rename a moved file within the mirror and take the source file's metadata.
+
+        A file already at its new path (e.g. moved before an interrupted run
+        could journal it) is left as it is.
+
+        Returns:
+            str: Mirrored file path.
+        """
+        source_file = os.path.join(self.source_drive, moved_file[0])
+        mirror_root = os.path.join(self.DRIVE_MIRROR, self.engineer_name)
+        destination_file = os.path.join(mirror_root, moved_file[0])
+
+        if not os.path.exists(destination_file):
+            os.makedirs(os.path.dirname(destination_file), exist_ok=True)
+            os.rename(os.path.join(mirror_root, moved_file.from_relpath), destination_file)
+        shutil.copystat(source_file, destination_file)
+        return destination_file
 
     def removed_file_operations(self, removed_file):
-        """Remove a file from the mirror that no longer exists in the source."""
+        """Remove a file from the mirror that no longer exists in the source.
+
+        A file that is already gone (e.g. removed before an interrupted run
+        could journal it) is ignored.
+        """
         destination_file = os.path.join(
             self.DRIVE_MIRROR, self.engineer_name, removed_file[0]
         )
-        os.remove(destination_file)
+        if os.path.exists(destination_file):
+            os.remove(destination_file)
 
-    def call_checksum_operations(self):
-        """Generate + verify checksum for the last mirrored file; delete if invalid."""
-        self.cs.file_checksum_generate(self.mirrored_file)
-        self.cs.file_checksum_verify(self.mirrored_file)
+    def call_checksum_operations(self, mirrored_file, checksum):
+        """Verify a mirrored file against its .md5 sidecar; delete if invalid.
 
-        if not self.cs.verified_status:
-            os.remove(self.mirrored_file)
-            os.remove(f"{self.mirrored_file}.md5")
-        else:
-            pass
+        The checksum captured while copying covers the bytes read from the
+        source. In the strict tier the mirrored file is also read back (the
+        cache bypassed) and its MD5 checked, so the bytes written to the mirror
+        are verified too; the fast tier does not re-read them.
 
-    def commit_file_changes(self):
-        """Apply pending new/changed/removed file operations with progress + validation."""
-        if self.new_files_in_source != []:
-            print("\n[bold magenta]Mirroring new files...[/bold magenta]")
-            for index, new_file in enumerate(self.new_files_in_source):
-                self.progress_bar(index, len(self.new_files_in_source))
-                self.new_file_operations(new_file)
+        Returns:
+            bool: True if the checksum (and, in the strict tier, the mirrored
+                file's MD5) matches the mirrored .md5 sidecar.
+        """
+        verified = self.cs.sidecar_matches(mirrored_file, checksum)
+        if verified and self.detection_tier == "strict":
+            written = self.cs.generate_digests(mirrored_file, use_cache=False)["md5"]
+            verified = self.cs.sidecar_matches(mirrored_file, written)
+            if not verified:
+                logger.critical(f"Mirrored file {mirrored_file} does not match the bytes copied from the source")
 
-                logger.info(f"New file {new_file[0]} mirrored")
+        if not verified:
+            os.remove(mirrored_file)
+            os.remove(f"{mirrored_file}.md5")
 
-                if os.path.exists(f"{self.mirrored_file}.md5"):
-                    self.call_checksum_operations()
-                else:
-                    pass
+        return verified
 
-        if self.changed_files_in_source != []:
-            print("\n[bold magenta]Updating changed files...[/bold magenta]")
-            for index, changed_file in enumerate(self.changed_files_in_source):
-                self.progress_bar(index, len(self.changed_files_in_source))
-                self.changed_file_operations(changed_file)
+    def device_slots(self, mirror_root):
+        """Return semaphores bounding concurrent copy and removal jobs per device.
 
-                logger.info(f"Changed file {changed_file[0]} mirrored")
+        Copies hold a slot on both the source and mirror devices, moves and
+        removals on the mirror device only. If both trees share a device the lower limit applies.
 
-                if os.path.exists(f"{self.mirrored_file}.md5"):
-                    self.call_checksum_operations()
-                else:
-                    pass
+        Returns:
+            tuple[list, list]: (copy slots, move and removal slots).
+        """
+        source_device = os.stat(self.source_drive).st_dev
+        mirror_device = os.stat(mirror_root).st_dev
+        if source_device == mirror_device:
+            slot = threading.BoundedSemaphore(min(MIRROR_SOURCE_WORKERS, MIRROR_DESTINATION_WORKERS))
+            return [slot], [slot]
+        source_slot = threading.BoundedSemaphore(MIRROR_SOURCE_WORKERS)
+        mirror_slot = threading.BoundedSemaphore(MIRROR_DESTINATION_WORKERS)
+        return [source_slot, mirror_slot], [mirror_slot]
+
+    def manifest_record(self, relpath, digest=None):
+        """Return the manifest record [relpath, size, mtime_ns, digest] of a mirrored file."""
+        stat = os.stat(os.path.join(self.DRIVE_MIRROR, self.engineer_name, relpath))
+        return [relpath, stat.st_size, stat.st_mtime_ns, digest]
+
+    def mirror_job(self, kind, entry, slots):
+        """Run one new/changed/moved/removed operation on a worker thread.
+
+        The operation (not the wait for a device slot) is recorded in the run
+        metrics as stage "mirror.<kind>".
 
-        if self.removed_files_in_source != []:
-            print("\n[bold magenta]Removing deleted files...[/bold magenta]")
-            for index, removed_file in enumerate(self.removed_files_in_source):
-                self.progress_bar(index, len(self.removed_files_in_source))
-                self.removed_file_operations(removed_file)
+        Returns:
+            tuple[bool|None, list[list]]: Checksum verification result (None
+                if the file has no .md5 sidecar, or was moved or removed) and
+                the manifest records the operation changed.
+        """
+        with ExitStack() as stack:
+            for slot in slots:
+                stack.enter_context(slot)
+            stack.enter_context(
+                metrics.timer(f"mirror.{kind}", entry[0], entry[1] if kind in ("new", "changed") else 0)
+            )
+            if kind == "removed":
+                self.removed_file_operations(entry)
+                return None, [[entry[0], None, None, None]]
+            if kind == "moved":
+                self.moved_file_operations(entry)
+                return None, [
+                    [entry.from_relpath, None, None, None],
+                    self.manifest_record(entry[0], entry.digest),
+                ]
+            if kind == "new":
+                mirrored_file, checksum = self.new_file_operations(entry)
+            else:
+                mirrored_file, checksum = self.changed_file_operations(entry)
+            if not os.path.exists(f"{mirrored_file}.md5"):
+                return None, [self.manifest_record(entry[0], checksum)]
+            sidecar = f"{entry[0]}.md5"
+            updates = [self.manifest_record(entry[0], checksum), self.manifest_record(sidecar)]
+            verified = self.call_checksum_operations(mirrored_file, checksum)
+            if not verified:
+                updates = [[entry[0], None, None, None], [sidecar, None, None, None]]
+            return verified, updates
+
+    def plan_operations(self):
+        """Return the (kind, entry) operations needed to apply the pending changes.
+
+        A .md5 sidecar is copied with its file, so its own entry is dropped
+        when its file is being copied.
+        """
+        copied_paths = {
+            entry[0] for entry in self.new_files_in_source + self.changed_files_in_source
+        }
+        operations = [
+            (kind, entry)
+            for kind, entries in (
+                ("new", self.new_files_in_source),
+                ("changed", self.changed_files_in_source),
+            )
+            for entry in entries
+            if not (entry[0].endswith(".md5") and entry[0][:-4] in copied_paths)
+        ]
+        operations += [("moved", entry) for entry in self.moved_files_in_source]
+        operations += [("removed", entry) for entry in self.removed_files_in_source]
+        return operations
+
+    @metrics.stage("mirror.commit")
+    def commit_file_changes(self, operations=None):
+        """Apply pending new/changed/moved/removed file operations with progress + validation.
+
+        Copies (with verification), moves and removals run together on a worker
+        pool, bounded per source and mirror device by MIRROR_SOURCE_WORKERS
+        and MIRROR_DESTINATION_WORKERS; operations are submitted a few at a
+        time as earlier ones complete, so a first mirror of a large drive
+        does not hold a future per file. The plan and each completed operation
+        are recorded in the mirror journal so an interrupted run can resume.
+        Completed changes are applied to the mirror manifest in memory and
+        the manifest is written once, after all operations have finished; if
+        the run is interrupted before then, the journal holds the changes and
+        resume_interrupted_commit applies them.
 
-                logger.info(f"Removed file {removed_file[0]}")
+        Args:
+            operations (list|None): Outstanding operations from an interrupted
+                run's journal; planned from the pending changes when None.
+        Raises:
+            ValueError: If any operation failed (after all others have completed).
+        """
+        mirror_root = os.path.join(self.DRIVE_MIRROR, self.engineer_name)
+        os.makedirs(mirror_root, exist_ok=True)
+        copy_slots, removal_slots = self.device_slots(mirror_root)
+        journal = MirrorJournal(mirror_root)
+
+        if operations is None:
+            operations = self.plan_operations()
+            if operations != []:
+                journal.begin(operations)
+        else:
+            journal.resume()
+
+        def worker(operation):
+            kind, entry = operation
+            slots = removal_slots if kind in ("moved", "removed") else copy_slots
+            try:
+                return kind, entry, *self.mirror_job(kind, entry, slots), None
+            except Exception as e:
+                return kind, entry, None, None, e
+
+        failed_operations = []
+        if operations != []:
+            print("\n[bold magenta]Mirroring changes...[/bold magenta]")
+            results = _bounded_map(worker, operations, MIRROR_SOURCE_WORKERS + MIRROR_DESTINATION_WORKERS)
+            try:
+                for index, (kind, entry, verified, manifest_updates, error) in enumerate(results):
+                    self.progress_bar(index, len(operations))
+                    if error is not None:
+                        logger.critical(f"Error mirroring {kind} file {entry[0]}. {error}")
+                        failed_operations.append(entry[0])
+                        continue
+
+                    journal.record_done(kind, entry[0], manifest_updates)
+                    self.manifest.apply(manifest_updates)
+                    if kind == "removed":
+                        logger.info(f"Removed file {entry[0]}")
+                    elif kind == "moved":
+                        logger.info(f"Moved file {entry.from_relpath} to {entry[0]}")
+                    else:
+                        logger.info(f"{kind.capitalize()} file {entry[0]} mirrored")
+                    if verified is False:
+                        self.cs.failed_files.append(os.path.basename(entry[0]))
+            except BaseException:  # e.g. Ctrl-C: queued work is cancelled, the journal kept for resume
+                logger.warning("Mirror commit interrupted; journal kept for resume")
+                results.close()
+                raise
+            self.manifest.save()
+            journal.complete()
 
         if self.cs.failed_files != []:
 
@@ -244,10 +580,41 @@ class DriveMirror:
                 "\n[bold green]New and/or updated files with checksums have all validated![/bold green]"
             )
 
+        if failed_operations != []:
+            print(f"\n[bold red]{len(failed_operations)} files could not be mirrored[/bold red] (see log):")
+            for failed_operation in failed_operations:
+                print(f" * {failed_operation}")
+            raise ValueError(f"{len(failed_operations)} files could not be mirrored")
+
+    def resume_interrupted_commit(self):
+        """Resume an interrupted commit recorded in the mirror journal.
+
+        Returns:
+            bool: True if an interrupted run was found and resumed.
+        """
+        mirror_root = os.path.join(self.DRIVE_MIRROR, self.engineer_name)
+        journal = MirrorJournal(mirror_root)
+        operations = journal.pending()
+        if operations is None:
+            return False
+        self.manifest.apply(journal.completed_updates)
+
+        logger.info(f"Resuming interrupted mirror commit ({len(operations)} operations)")
+        print(self.ms.mirror_resume)
+        self.new_files_in_source = [entry for kind, entry in operations if kind == "new"]
+        self.changed_files_in_source = [entry for kind, entry in operations if kind == "changed"]
+        self.moved_files_in_source = [entry for kind, entry in operations if kind == "moved"]
+        self.removed_files_in_source = [entry for kind, entry in operations if kind == "removed"]
+        self.commit_file_changes(operations)
+        return True
+
     def run_drive_mirror_operations(self):
         """Main orchestration method to detect, review, and apply mirror changes."""
         logger.info("Drive mirror operations initiated")
 
+        if self.resume_interrupted_commit():
+            return
+
         if self.check_mirror_location():
             if self.check_source_mirror_changes():
                 print(self.ms.drive_mirror_message(self.engineer_name))
@@ -0,0 +1,52 @@
+"""Fixity audit of backed up files.
+
+Re-reads every file under a directory (ROOT_BACKUP by default) and checks it
+against its .md5 sidecar and, for WAVs, the .audio.md5 sidecar / embedded
+MD5 chunk (see ChecksumService.fixity_audit), reporting header drift
+separately from audio corruption.
+
+Usage:
+    python fixityaudit.py [directory ...]
+"""
+import os
+import argparse
+from collections import Counter
+from dotenv import load_dotenv
+from rich import print
+
+from checksumoperations import ChecksumService
+from logging_module import logger
+
+load_dotenv()
+
+
+def audit_files(directory, cs):
+    """Yield the files to audit under directory (checksum sidecars and hidden files skipped)."""
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames[:] = [name for name in dirnames if not name.startswith(".")]
+        for name in filenames:
+            file = os.path.join(dirpath, name)
+            if not name.startswith(".") and not cs.is_checksum_sidecar(file):
+                yield file
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs="*", help="directories to audit (default: ROOT_BACKUP)")
+    args = parser.parse_args()
+
+    cs = ChecksumService()
+    for directory in args.directory or [os.getenv("ROOT_BACKUP")]:
+        logger.info(f"Fixity audit started for {directory}")
+        statuses = Counter()
+        for result in cs.fixity_audit(audit_files(directory, cs)):
+            statuses[result.status] += 1
+            if result.status != "ok":
+                print(f"[bold red]{result.status}[/bold red]: {result.file}")
+        summary = ", ".join(f"{count} {status}" for status, count in sorted(statuses.items()))
+        logger.info(f"Fixity audit of {directory}: {summary}")
+        print(f"{directory}: {summary or 'no files'}")
+
+
+if __name__ == "__main__":
+    main()
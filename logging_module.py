@@ -1,12 +1,34 @@
 """Central logging configuration.
 
-Loads environment variables (via .env) to locate ROOT_LOCATION and configures a
-module-level logger that writes INFO+ messages to a timestamped log file named
-YYYYMMDD_HH.MM_log.log inside ROOT_LOCATION. Import `logger` from this module
-where logging is required.
+Loads environment variables (via .env) and configures a module-level logger.
+Import `logger` from this module where logging is required.
+
+Records are put on an in-memory queue (QueueHandler) and written by a
+background QueueListener thread, so the copy and hash loops never wait on
+the log volume (ROOT_LOCATION may be slow or networked). Records below
+LOG_LEVEL are dropped by the logger before any formatting, so per-file
+DEBUG detail costs a level check when it is off.
+
+Configuration is lazy and import-safe: the listener is started, and the log
+file YYYYMMDD_HH.MM_log.log inside ROOT_LOCATION opened, when the first
+record is logged. If ROOT_LOCATION is unset or the file cannot be created,
+records go to stderr instead. The file holds one JSON object per line
+(time, level, module, thread, message); LOG_FORMAT=text keeps the original
+"asctime:module:levelname:message" lines.
+
+Environment variables used:
+  * ROOT_LOCATION: directory of the log file.
+  * LOG_LEVEL: DEBUG, INFO (default), WARNING, ERROR or CRITICAL.
+  * LOG_FORMAT: "json" (default) or "text".
 """
 
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import sys
+import threading
 from datetime import datetime
 import os
 from dotenv import load_dotenv
@@ -14,13 +36,88 @@ from dotenv import load_dotenv
 load_dotenv()
 
 logTS = datetime.now().strftime("%Y%m%d_%H.%M_log.log")
-ROOT_LOCATION = os.getenv("ROOT_LOCATION")
-log = os.path.join(ROOT_LOCATION, logTS)
+LOG_LEVEL = (os.getenv("LOG_LEVEL") or "INFO").upper()
+LOG_FORMAT = (os.getenv("LOG_FORMAT") or "json").lower()
 
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-formatter = logging.Formatter("%(asctime)s:%(module)s:%(levelname)s:%(message)s")
-file_handler = logging.FileHandler(log)
 
-file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
+class JsonLinesFormatter(logging.Formatter):
+    """Format each record as a single line JSON object."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "module": record.module,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that starts the listener on the first record.
+
+    After shutdown (at interpreter exit) records are written directly, so
+    anything logged by later exit handlers is not lost.
+    """
+
+    def __init__(self):
+        super().__init__(queue.SimpleQueue())
+        self.listener = None
+        self.stopped = False
+        self._lock = threading.Lock()
+
+    def prepare(self, record):
+        # the message is merged with its arguments here, on the calling thread
+        # (they may change once it returns); formatting is left to the listener
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def emit(self, record):
+        if self.listener is None:
+            self.start()
+        if self.stopped:
+            for handler in self.listener.handlers:
+                handler.handle(record)
+            return
+        super().emit(record)
+
+    def start(self):
+        with self._lock:
+            if self.listener is not None:
+                return
+            target = _target_handler()
+            target.setFormatter(
+                JsonLinesFormatter()
+                if LOG_FORMAT == "json"
+                else logging.Formatter("%(asctime)s:%(module)s:%(levelname)s:%(message)s")
+            )
+            self.listener = logging.handlers.QueueListener(self.queue, target)
+            self.listener.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        """Write out the queued records and stop the listener thread."""
+        if self.listener is not None and not self.stopped:
+            self.stopped = True  # records logged from now on are written directly
+            self.listener.stop()
+
+
+def _target_handler():
+    """Return the handler the listener writes to: the log file, else stderr."""
+    root_location = os.getenv("ROOT_LOCATION")
+    if root_location:
+        try:
+            return logging.FileHandler(os.path.join(root_location, logTS))
+        except OSError as e:
+            print(f"Cannot open log file in {root_location}, logging to stderr. {e}", file=sys.stderr)
+    return logging.StreamHandler(sys.stderr)
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+queue_handler = _LazyQueueHandler()
+logger.addHandler(queue_handler)
@@ -91,4 +91,6 @@ Hello [bold magenta]{engineer}![/bold magenta]. Your drive will be mirrored in t
 This may take some time, the service will inform you when it completes and it is safe to remove the drive.
 """
 
+    mirror_resume = "[bold yellow]An interrupted mirror run was found[/bold yellow]. Resuming the outstanding changes..."
+
     view_or_run = 'To view the list of files, press [bold yellow]"v"[/bold yellow] or press [bold magenta]any other key[/bold magenta] to start the mirror service'
@@ -1,16 +1,38 @@
 """Metadata operations for WAV files.
 
 Provides functionality to extract selected BEXT / container metadata from WAV
-files using ffprobe and inject curated values back into the file header using
-bwfmetaedit. Intended for use in the backup pipeline to normalise key fields.
+files and inject curated values back into the file header, both natively
+on the RIFF chunks (see riffchunks), falling back to ffprobe / bwfmetaedit
+for files the native code does not handle (e.g. RF64). Intended for use in
+the backup pipeline to normalise key fields.
 
 External dependencies:
-  * ffprobe (part of FFmpeg) must be on PATH
-  * bwfmetaedit must be installed and on PATH
+  * ffprobe (part of FFmpeg) on PATH, for files the native reader cannot parse
+  * bwfmetaedit on PATH, for files the native writer cannot update
+
+Environment variables used: WAV_HEADER_WRITER ("native", the default, or
+"bwfmetaedit" to always use the external tool).
 """
+import os
 import subprocess
+from dotenv import load_dotenv
 
 from logging_module import logger
+from metrics import metrics
+from riffchunks import read_wav_header, plan_header_rewrite, apply_header_rewrite, verify_header_rewrite
+
+load_dotenv()
+
+WAV_HEADER_WRITER = os.getenv("WAV_HEADER_WRITER") or "native"
+BLANKED_BEXT_FIELDS = ("originator", "origination_date", "origination_time")
+
+# results key: source tags in order of preference (bext field, then LIST/INFO
+# entry as reported by ffprobe)
+FFPROBE_TAGS = {
+    "encoded_by": ["originator", "encoded_by"],
+    "date": ["origination_date", "date"],
+    "creation_time": ["origination_time", "creation_time"],
+}
 
 class WavHeaderRewrite:
     """Extract and rewrite selected WAV header (BEXT) metadata.
@@ -19,12 +41,41 @@ class WavHeaderRewrite:
         1. Call file_bext_export() to parse ffprobe output and cache values.
         2. Call file_info_import() to write normalised fields back into the file.
 
+    Each call is recorded in the run metrics (stages "header.read" and "header.write").
+
     Attributes:
         results (dict): Populated after file_bext_export with keys:
             encoded_by, date, creation_time.
     """
 
+    @metrics.file_stage("header.read")
     def file_bext_export(self, wav_file):
+        """Capture the metadata fields of a WAV file into self.results.
+
+        The RIFF chunks are read natively (see riffchunks): encoded_by is the
+        bext originator (else the LIST/INFO ITCH entry), date the bext
+        origination date (else ICRD) and creation_time the bext origination
+        time. Files the native reader cannot parse are passed to ffprobe.
+
+        Args:
+            wav_file (str): Path to the WAV file.
+        Raises:
+            ValueError: If ffprobe invocation or output reading fails.
+        """
+        try:
+            header = read_wav_header(wav_file)
+        except (ValueError, OSError) as e:
+            logger.warning(f"Native header read failed for {wav_file}, using ffprobe. {e}")
+            self.ffprobe_bext_export(wav_file)
+            return
+
+        self.results = {
+            "encoded_by": header.bext.get("originator") or header.info.get("ITCH", ""),
+            "date": header.bext.get("origination_date") or header.info.get("ICRD", ""),
+            "creation_time": header.bext.get("origination_time", ""),
+        }
+
+    def ffprobe_bext_export(self, wav_file):
         """Run ffprobe to capture metadata lines for a WAV file.
 
         Parses ffprobe stdout and stores mapped fields in self.results.
@@ -44,46 +95,73 @@ class WavHeaderRewrite:
             logger.critical(f"Error exporting BEXT data for {wav_file}. {e}")
             raise ValueError(e)
 
-        data_map = {
-            "encoded_by": "encoded_by",
-            "date": "date",
-            "creation_time": "creation_time",
-        }
-        self.results = {
-            "encoded_by": "",
-            "date": "",
-            "creation_time": "",
-        }
-
+        tags = {}
         try:
             for data in bext_data.stdout.readlines():
                 data = data.decode(encoding="utf-8").strip()
+                if ":" in data:
+                    key, value = data.split(":", 1)  # values such as times contain ':'
+                    tags.setdefault(key.strip(), value.strip())
         except Exception as e:
             logger.critical(f"Error reading BEXT data for {wav_file}. {e}")
             raise ValueError(e)
 
-        for key, value in data_map.items():
-            if key in data:
-                self.results[value] = data.split(":")[1].strip()
+        self.results = {
+            result: next((tags[tag] for tag in tag_names if tags.get(tag)), "")
+            for result, tag_names in FFPROBE_TAGS.items()
+        }
+
+    def info_updates(self, engineer_name):
+        """Return the LIST/INFO entries to write for the exported results.
+
+        Returns:
+            dict[str, str]|None: IARL, ICRD, IENG and ISFT values, or None if
+                a required result field is empty (the file is left as it is).
+        """
+        if (
+            self.results["encoded_by"] == ""
+            or self.results["date"] == ""
+            or self.results["creation_time"] == ""
+        ):
+            return None
+        icrd = f"{self.results['date']}T{self.results['creation_time'].replace('-', ':')}Z"
+        return {"IARL": "GB, BL", "ICRD": icrd, "IENG": engineer_name, "ISFT": self.results["encoded_by"]}
 
-    def file_info_import(self, wav_file, engineer_name):
-        """Inject selected metadata into the WAV file using bwfmetaedit.
+    @metrics.file_stage("header.write")
+    def file_info_import(self, wav_file, engineer_name, dry_run=False):
+        """Inject selected metadata into the WAV file.
 
-        Only proceeds if results dict contains non-empty required fields.
+        Blanks the bext originator, origination date and origination time and
+        sets the LIST/INFO IARL, ICRD, IENG and ISFT entries, natively in place
+        (verified by reading the header back), or with bwfmetaedit if the file
+        cannot be updated natively. Only proceeds if results dict contains
+        non-empty required fields.
 
         Args:
             wav_file (str): Path to the WAV file being modified.
             engineer_name (str): Originator/engineer value to embed (ISFT/IENG).
+            dry_run (bool): Log the native changes without writing them.
+        Returns:
+            HeaderRewritePlan|None: The native changes made (or that would be
+                made), or None if nothing was written natively.
         Raises:
-            ValueError: If bwfmetaedit invocation fails.
+            ValueError: If bwfmetaedit invocation fails, or a native rewrite
+                does not verify.
         """
-        if not (
-            self.results["encoded_by"] == ""\
-            or self.results["date"] == ""\
-            or self.results["creation_time"] == ""
-        ):
-            isft = self.results["encoded_by"]
-            icrd = f"{self.results['date']}T{self.results['creation_time'].replace('-', ':')}Z"
+        info_updates = self.info_updates(engineer_name)
+        if info_updates is not None:
+            isft = info_updates["ISFT"]
+            icrd = info_updates["ICRD"]
+
+            if WAV_HEADER_WRITER == "native":
+                try:
+                    plan = plan_header_rewrite(wav_file, info_updates, BLANKED_BEXT_FIELDS)
+                except (ValueError, OSError) as e:
+                    logger.warning(f"Native header rewrite not possible for {wav_file}, using bwfmetaedit. {e}")
+                else:
+                    return self.native_info_import(wav_file, info_updates, plan, dry_run)
+            if dry_run:
+                return None
 
             try:
                 subprocess.run(
@@ -106,3 +184,35 @@ class WavHeaderRewrite:
                 raise ValueError(e)
         else:
             pass
+
+    def native_info_import(self, wav_file, info_updates, plan, dry_run=False):
+        """Apply a planned header rewrite in place and verify it by reading the header back.
+
+        Args:
+            wav_file (str): Path to the WAV file being modified.
+            info_updates (dict[str, str]): LIST/INFO entries being set.
+            plan (HeaderRewritePlan): From plan_header_rewrite.
+            dry_run (bool): Log the planned changes without writing them.
+        Returns:
+            HeaderRewritePlan: plan.
+        Raises:
+            ValueError: If the file cannot be written or the rewrite does not verify.
+        """
+        if dry_run:
+            logger.info(
+                f"Dry run: {wav_file} would get {len(plan.patches)} patches at {[offset for offset, _ in plan.patches]}"
+                f" and a {len(plan.tail)} byte tail (file size {plan.file_size})"
+            )
+            return plan
+
+        try:
+            data_chunk = next(chunk for chunk in read_wav_header(wav_file).chunks if chunk.id == b"data")
+            apply_header_rewrite(wav_file, plan)
+            problems = verify_header_rewrite(wav_file, info_updates, BLANKED_BEXT_FIELDS, data_chunk)
+        except Exception as e:
+            logger.critical(f"Error rewriting header of {wav_file}. {e}")
+            raise ValueError(e)
+        if problems != []:
+            logger.critical(f"Header rewrite verification failed for {wav_file}. {problems}")
+            raise ValueError(f"Header rewrite verification failed for {wav_file}. {problems}")
+        return plan
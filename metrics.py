@@ -0,0 +1,216 @@
+"""Run metrics: per-file and per-stage timings, bytes and throughput.
+
+The services record each file they process (stage, bytes, seconds, error)
+in the process-wide `metrics` object, and the backup steps record their wall
+time. At the end of a run the totals are written as:
+  * a JSON summary, <METRICS_LOCATION>/<YYYYMMDD_HH.MM>_metrics.json, with
+    per-stage totals and the per-file records;
+  * a Prometheus textfile-collector file (replaced atomically), so
+    throughput can be charted across runs and a degrading drive spotted.
+
+Stage totals: files, bytes, errors, busy seconds (summed over files, so
+concurrent work can exceed the wall time), wall seconds (for stages timed
+as a whole) and MB/s (bytes over wall time when known, else busy time).
+
+Environment variables used:
+  * METRICS_LOCATION: directory for the JSON summary (default ROOT_LOCATION;
+    "off" to write nothing).
+  * METRICS_TEXTFILE: Prometheus textfile path (default
+    <METRICS_LOCATION>/backup_service.prom).
+  * METRICS_FILE_RECORDS: per-file records kept in the summary (default
+    100000; stage totals always include every file).
+"""
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from dotenv import load_dotenv
+
+from logging_module import logger
+
+load_dotenv()
+
+METRICS_FILE_RECORDS = int(os.getenv("METRICS_FILE_RECORDS") or 100000)
+PROMETHEUS_PREFIX = "backup_service"
+
+
+def _new_stage():
+    return {"files": 0, "bytes": 0, "errors": 0, "busy_seconds": 0.0, "wall_seconds": None}
+
+
+class RunMetrics:
+    """Thread-safe collector of the metrics of one run.
+
+    Attributes:
+        labels (dict[str, str]): Run-level labels (e.g. engineer, mode)
+            written with the summary and as Prometheus labels.
+        started (float): Run start (epoch seconds).
+    """
+
+    def __init__(self):
+        self.labels = {}
+        self.started = time.time()
+        self._stages = {}
+        self._files = []
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    def record(self, stage, file=None, size=0, seconds=0.0, error=None):
+        """Record one file (or unit of work) processed by a stage.
+
+        Args:
+            stage (str): Stage name, e.g. "hash", "encode", "mirror.new".
+            file (str|None): File processed.
+            size (int): Bytes read or written for it.
+            seconds (float): Time spent on it.
+            error (str|None): Error message if it failed.
+        """
+        with self._lock:
+            totals = self._stages.setdefault(stage, _new_stage())
+            totals["files"] += 1
+            totals["bytes"] += size or 0
+            totals["busy_seconds"] += seconds
+            if error is not None:
+                totals["errors"] += 1
+            if len(self._files) < METRICS_FILE_RECORDS:
+                self._files.append(
+                    {"stage": stage, "file": file, "bytes": size or 0, "seconds": round(seconds, 6), "error": error}
+                )
+            else:
+                self._dropped += 1
+
+    @contextmanager
+    def timer(self, stage, file=None, size=0):
+        """Time a block of work on one file and record it (with the error, if it raises)."""
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = str(e) or type(e).__name__
+            raise
+        finally:
+            self.record(stage, file, size, time.perf_counter() - start, error)
+
+    def record_wall(self, stage, seconds):
+        """Add to a stage's wall time (the stage timed as a whole)."""
+        with self._lock:
+            totals = self._stages.setdefault(stage, _new_stage())
+            totals["wall_seconds"] = (totals["wall_seconds"] or 0.0) + seconds
+
+    def stage(self, name):
+        """Decorator recording the wall time of a method or function as stage `name`."""
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.record_wall(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def file_stage(self, name):
+        """Decorator recording each call of a method taking a file as its first argument as stage `name`."""
+        def decorator(method):
+            @functools.wraps(method)
+            def wrapper(instance, file, *args, **kwargs):
+                with self.timer(name, file):
+                    return method(instance, file, *args, **kwargs)
+            return wrapper
+        return decorator
+
+    def summary(self):
+        """Return the run summary as a JSON-serialisable dict."""
+        with self._lock:
+            stages = {}
+            for name, totals in sorted(self._stages.items()):
+                seconds = totals["wall_seconds"] or totals["busy_seconds"]
+                stages[name] = {
+                    **totals,
+                    "mb_per_s": round(totals["bytes"] / 1e6 / seconds, 3) if seconds and totals["bytes"] else None,
+                }
+            return {
+                "started": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+                "duration_seconds": round(time.time() - self.started, 3),
+                "labels": dict(self.labels),
+                "stages": stages,
+                "files": list(self._files),
+                "files_not_recorded": self._dropped,
+            }
+
+    def prometheus(self, summary=None):
+        """Return the stage totals in the Prometheus text exposition format."""
+        summary = summary or self.summary()
+        labels = "".join(f',{key}="{_escape(value)}"' for key, value in sorted(summary["labels"].items()))
+        metrics = [
+            ("stage_files", "Files processed by each stage in the last run.", "files"),
+            ("stage_bytes", "Bytes processed by each stage in the last run.", "bytes"),
+            ("stage_errors", "Files that failed in each stage in the last run.", "errors"),
+            ("stage_busy_seconds", "Time spent on files in each stage in the last run (summed over workers).", "busy_seconds"),
+            ("stage_wall_seconds", "Wall time of each stage in the last run.", "wall_seconds"),
+            ("stage_throughput_megabytes_per_second", "Throughput of each stage in the last run.", "mb_per_s"),
+        ]
+        lines = []
+        for metric, description, key in metrics:
+            lines.append(f"# HELP {PROMETHEUS_PREFIX}_{metric} {description}")
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{metric} gauge")
+            for stage, totals in summary["stages"].items():
+                if totals[key] is not None:
+                    lines.append(f'{PROMETHEUS_PREFIX}_{metric}{{stage="{_escape(stage)}"{labels}}} {totals[key]}')
+        run_labels = "{" + labels[1:] + "}" if labels else ""
+        lines.append(f"# HELP {PROMETHEUS_PREFIX}_last_run_timestamp_seconds Start of the last run.")
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_last_run_timestamp_seconds gauge")
+        lines.append(f"{PROMETHEUS_PREFIX}_last_run_timestamp_seconds{run_labels} {self.started:.0f}")
+        lines.append(f"# HELP {PROMETHEUS_PREFIX}_last_run_duration_seconds Duration of the last run.")
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_last_run_duration_seconds gauge")
+        lines.append(f"{PROMETHEUS_PREFIX}_last_run_duration_seconds{run_labels} {summary['duration_seconds']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory=None, textfile=None):
+        """Write the JSON summary and the Prometheus textfile.
+
+        Errors are logged, not raised, so a metrics problem never fails a backup.
+
+        Args:
+            directory (str|None): Defaults to METRICS_LOCATION, else ROOT_LOCATION.
+            textfile (str|None): Defaults to METRICS_TEXTFILE, else
+                <directory>/backup_service.prom.
+        Returns:
+            list[str]: Paths written.
+        """
+        directory = directory or os.getenv("METRICS_LOCATION") or os.getenv("ROOT_LOCATION")
+        if directory is None or directory.lower() == "off":
+            return []
+        textfile = textfile or os.getenv("METRICS_TEXTFILE") or os.path.join(directory, f"{PROMETHEUS_PREFIX}.prom")
+        written = []
+        try:
+            summary = self.summary()
+            os.makedirs(directory, exist_ok=True)
+            json_path = os.path.join(
+                directory, datetime.fromtimestamp(self.started).strftime("%Y%m%d_%H.%M_metrics.json")
+            )
+            with open(json_path, "w") as f:
+                json.dump(summary, f, indent=1)
+            written.append(json_path)
+            temp_path = f"{textfile}.tmp"  # the collector must never read a partial file
+            with open(temp_path, "w") as f:
+                f.write(self.prometheus(summary))
+            os.replace(temp_path, textfile)
+            written.append(textfile)
+        except Exception as e:
+            logger.warning(f"Error writing run metrics. {e}")
+            return written
+        logger.info(f"Run metrics written to {written}")
+        return written
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = RunMetrics()
@@ -0,0 +1,129 @@
+"""Write-ahead journal for drive mirror commits.
+
+Before DriveMirror applies any change it records the full plan of
+new / changed / moved / removed operations in a hidden JSON-lines file in the mirror
+root, then appends a record as each operation completes. If the run is
+interrupted (cable pulled, machine sleeps, Ctrl-C) the next run finds the
+journal and resumes the outstanding operations without re-scanning either
+tree. The journal is removed once every operation has been attempted.
+
+Records (one JSON object per line):
+    {"type": "plan", "operations": [[kind, *entry fields], ...]}
+    {"type": "done", "kind": kind, "relpath": relpath, "manifest": [[relpath, size, mtime_ns, digest], ...]}
+
+The manifest updates of completed operations are replayed on resume, so the
+mirror manifest stays accurate across an interruption.
+"""
+import os
+import json
+import threading
+
+from logging_module import logger
+from scanoperations import ScanEntry
+from diffoperations import ChangedEntry, MovedEntry
+
+JOURNAL_NAME = ".mirror_journal.jsonl"
+PARTIAL_SUFFIX = ".mirror-partial"
+ENTRY_TYPES = {"changed": ChangedEntry, "moved": MovedEntry}  # others are ScanEntry
+
+
+def partial_path(destination_file):
+    """Return the hidden temporary path a copy is written to before being renamed into place."""
+    directory, name = os.path.split(destination_file)
+    return os.path.join(directory, f".{name}{PARTIAL_SUFFIX}")
+
+
+class MirrorJournal:
+    """Journal of planned and completed operations for one mirror root.
+
+    Args:
+        mirror_root (str): Engineer mirror directory (DRIVE_MIRROR/<engineer_name>).
+
+    Attributes:
+        completed_updates (list[list]): Manifest updates of the operations an
+            interrupted run completed, populated by pending().
+    """
+
+    def __init__(self, mirror_root):
+        self.path = os.path.join(mirror_root, JOURNAL_NAME)
+        self.completed_updates = []
+        self._file = None
+        self._lock = threading.Lock()
+
+    def pending(self):
+        """Return the operations left over from an interrupted run.
+
+        A partially written final line (crash mid-append) is ignored.
+
+        Returns:
+            list[tuple[str, ScanEntry|ChangedEntry|MovedEntry]]|None: Outstanding
+                (kind, entry) operations in plan order, or None if there is
+                no interrupted run to resume.
+        """
+        if not os.path.exists(self.path):
+            return None
+        plan = None
+        done = set()
+        with open(self.path, "r") as journal:
+            for line in journal:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Ignoring incomplete record in {self.path}")
+                    continue
+                if record["type"] == "plan":
+                    plan = record["operations"]
+                elif record["type"] == "done":
+                    done.add((record["kind"], record["relpath"]))
+                    self.completed_updates.extend(record.get("manifest", []))
+        if plan is None:
+            return None
+        operations = []
+        for kind, *fields in plan:
+            if (kind, fields[0]) in done:
+                continue
+            entry_type = ENTRY_TYPES.get(kind, ScanEntry)
+            operations.append((kind, entry_type(*fields[:len(entry_type._fields)])))
+        logger.info(f"Mirror journal found: {len(done)} operations done, {len(operations)} outstanding")
+        return operations
+
+    def _append(self, record):
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def begin(self, operations):
+        """Start a new journal with the full plan, durably, before any change is made.
+
+        Args:
+            operations (list[tuple[str, ScanEntry|ChangedEntry|MovedEntry]]): (kind, entry) pairs.
+        """
+        with self._lock:
+            self._file = open(self.path, "w")
+            self._append(
+                {
+                    "type": "plan",
+                    "operations": [[kind, *entry] for kind, entry in operations],
+                }
+            )
+
+    def resume(self):
+        """Reopen an existing journal to record the remaining completions."""
+        with self._lock:
+            self._file = open(self.path, "a")
+
+    def record_done(self, kind, relpath, manifest_updates=()):
+        """Durably record that an operation has completed, with its manifest updates."""
+        with self._lock:
+            self._append(
+                {"type": "done", "kind": kind, "relpath": relpath, "manifest": list(manifest_updates)}
+            )
+
+    def complete(self):
+        """Close and remove the journal once every operation has been attempted."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if os.path.exists(self.path):
+                os.remove(self.path)
@@ -0,0 +1,185 @@
+"""Persistent manifest of a drive mirror.
+
+DriveMirror makes every change in the mirror tree itself, so rather than
+walking and stat-ing the whole mirror on each run it keeps a compact manifest
+in the mirror root: one gzip-compressed JSON line per file holding
+[relpath, size, mtime_ns, md5], sorted by relpath. Committed changes are
+recorded with apply() and written out by save() at the end of a commit, and
+the manifest is read back in place of a mirror scan.
+
+A full rescan (consistency check) walks the mirror instead, reports any drift
+from the stored manifest and rebuilds it, keeping known digests for files
+whose size and mtime are unchanged.
+"""
+import os
+import gzip
+import json
+import tempfile
+import threading
+from collections import namedtuple
+
+from logging_module import logger
+from diffoperations import sorted_entries
+
+MANIFEST_NAME = ".mirror_manifest.jsonl.gz"
+
+ManifestEntry = namedtuple("ManifestEntry", ["relpath", "size", "mtime_ns", "digest"])
+
+
+def _read_entries(path):
+    with gzip.open(path, "rt") as manifest:
+        for line in manifest:
+            yield ManifestEntry(*json.loads(line))
+
+
+def _write_entries(path, entries):
+    with gzip.open(path, "wt", compresslevel=1) as manifest:
+        for entry in entries:
+            manifest.write(json.dumps(list(entry)) + "\n")
+
+
+class MirrorManifest:
+    """Manifest of the files in one mirror root.
+
+    Args:
+        mirror_root (str): Engineer mirror directory (DRIVE_MIRROR/<engineer_name>).
+
+    Attributes:
+        rescanned (bool): True once a full rescan has rebuilt the manifest base.
+    """
+
+    def __init__(self, mirror_root):
+        self.path = os.path.join(mirror_root, MANIFEST_NAME)
+        self.rescanned = False
+        self._rebuilt = None
+        self._scanned = None
+        self._changes = {}
+        self._lock = threading.Lock()
+
+    def exists(self):
+        """Return True if a manifest has been written for this mirror."""
+        return os.path.exists(self.path)
+
+    def entries(self):
+        """Yield ManifestEntry records in relpath order.
+
+        Reads the rebuilt base after a rescan, else the stored manifest.
+        Changes recorded since are not included until save().
+        """
+        if self._rebuilt is not None:
+            yield from _read_entries(self._rebuilt)
+        elif self.exists():
+            yield from _read_entries(self.path)
+
+    def rescan(self, scan):
+        """Pass a mirror scan through while capturing it as the new manifest base.
+
+        Call finish_rescan() once the returned iterator has been consumed.
+
+        Args:
+            scan (iterable[ScanEntry]): Records from walking the mirror.
+        Yields:
+            ScanEntry: The records of scan, unchanged.
+        """
+        handle, self._scanned = tempfile.mkstemp(suffix=".jsonl.gz")
+        os.close(handle)
+        with gzip.open(self._scanned, "wt", compresslevel=1) as scanned:
+            for entry in scan:
+                scanned.write(json.dumps([entry.relpath, entry.size, entry.mtime_ns, None]) + "\n")
+                yield entry
+
+    def finish_rescan(self):
+        """Build the manifest base from the captured scan and log drift from the stored manifest.
+
+        Returns:
+            int: Number of files whose stored manifest record was missing,
+                stale or no longer present in the mirror.
+        """
+        handle, self._rebuilt = tempfile.mkstemp(suffix=".jsonl.gz")
+        os.close(handle)
+        scanned = sorted_entries(_read_entries(self._scanned))
+        stored = _read_entries(self.path) if self.exists() else iter(())
+
+        drift = 0
+
+        def rebuilt_entries():
+            nonlocal drift
+            stored_entry = next(stored, None)
+            for entry in scanned:
+                while stored_entry is not None and stored_entry.relpath < entry.relpath:
+                    drift += 1  # in manifest, not in mirror
+                    stored_entry = next(stored, None)
+                if (
+                    stored_entry is not None
+                    and stored_entry.relpath == entry.relpath
+                    and stored_entry.size == entry.size
+                    and stored_entry.mtime_ns == entry.mtime_ns
+                ):
+                    entry = entry._replace(digest=stored_entry.digest)
+                else:
+                    drift += 1  # missing from or stale in manifest
+                if stored_entry is not None and stored_entry.relpath == entry.relpath:
+                    stored_entry = next(stored, None)
+                yield entry
+            while stored_entry is not None:
+                drift += 1
+                stored_entry = next(stored, None)
+
+        _write_entries(self._rebuilt, rebuilt_entries())
+        os.remove(self._scanned)
+        self._scanned = None
+        self.rescanned = True
+        logger.info(f"Mirror manifest rebuilt from full rescan; {drift} records differed from {self.path}")
+        return drift
+
+    def apply(self, updates):
+        """Record manifest changes.
+
+        Args:
+            updates (iterable[list]): [relpath, size, mtime_ns, digest] records;
+                a size of None removes relpath.
+        """
+        with self._lock:
+            for relpath, size, mtime_ns, digest in updates:
+                self._changes[relpath] = (
+                    None if size is None else ManifestEntry(relpath, size, mtime_ns, digest)
+                )
+
+    def save(self):
+        """Write the base entries with recorded changes applied, atomically.
+
+        Skipped (with a log message) if there is neither a stored manifest nor
+        a rescan to base it on, since a partial manifest would hide files.
+        """
+        if not (self.exists() or self.rescanned):
+            logger.info("No mirror manifest to update; the next run will rebuild it")
+            return
+        with self._lock:
+            changes = sorted(self._changes.items())
+            self._changes = {}
+
+        def merged_entries():
+            change_index = 0
+            for entry in self.entries():
+                while change_index < len(changes) and changes[change_index][0] < entry.relpath:
+                    if changes[change_index][1] is not None:
+                        yield changes[change_index][1]
+                    change_index += 1
+                if change_index < len(changes) and changes[change_index][0] == entry.relpath:
+                    if changes[change_index][1] is not None:
+                        yield changes[change_index][1]
+                    change_index += 1
+                else:
+                    yield entry
+            for _, change in changes[change_index:]:
+                if change is not None:
+                    yield change
+
+        temp_path = f"{self.path}.tmp"
+        _write_entries(temp_path, merged_entries())
+        os.replace(temp_path, self.path)
+        if self._rebuilt is not None:
+            os.remove(self._rebuilt)
+            self._rebuilt = None
+        self.rescanned = False
+        logger.info(f"Mirror manifest saved with {len(changes)} changes")
@@ -0,0 +1,134 @@
+"""Streaming per-file pipeline for the backup stages.
+
+Each staged WAV flows through a chain of stages (header rewrite, re-hash,
+access file encode, move to backup) as soon as the previous stage has
+finished with it, instead of every file completing one stage before the next
+begins. Stages run on their own worker threads, connected by bounded queues
+so a fast stage cannot run far ahead of a slow one; batch wall time therefore
+approaches that of the slowest stage rather than the sum of all of them.
+
+Environment variables used:
+  * BACKUP_PIPELINE: "true" to stream files through the stages (default
+    false: the stages run one after another).
+  * PIPELINE_QUEUE_SIZE: files waiting between two stages (default 2).
+  * PIPELINE_REWRITE_WORKERS, PIPELINE_HASH_WORKERS, PIPELINE_MOVE_WORKERS:
+    workers per stage (defaults 2, 2, 1). The encode stage uses
+    ACCESS_ENCODE_WORKERS (see postoperations).
+"""
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+from dotenv import load_dotenv
+
+from logging_module import logger
+
+load_dotenv()
+
+BACKUP_PIPELINE = os.getenv("BACKUP_PIPELINE", "false").lower() == "true"
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE") or 2)
+PIPELINE_WORKERS = {
+    "rewrite": int(os.getenv("PIPELINE_REWRITE_WORKERS") or 2),
+    "hash": int(os.getenv("PIPELINE_HASH_WORKERS") or 2),
+    "move": int(os.getenv("PIPELINE_MOVE_WORKERS") or 1),
+}
+
+Stage = namedtuple("Stage", ["name", "function", "workers", "required"])
+PipelineResult = namedtuple("PipelineResult", ["item", "completed", "errors"])
+
+_STAGE_COMPLETE = object()
+
+
+def run_pipeline(items, stages, queue_size=None):
+    """Stream items through stages and yield each one as it leaves the pipeline.
+
+    Results are yielded on the calling thread, in completion order.
+
+    Args:
+        items (iterable): Items to process.
+        stages (list[Stage]): Stages, in order. Each stage's function(item)
+            runs on the stage's worker threads; if it raises, the error is recorded
+            and the item leaves the pipeline when the stage is required, or
+            continues to the next stage when it is not.
+        queue_size (int|None): Items held between two stages; defaults to
+            PIPELINE_QUEUE_SIZE.
+    Returns:
+        iterator[PipelineResult]: item, completed (False if a required stage
+            failed) and errors ([(stage name, error)] for each failed stage).
+    Raises:
+        ValueError: If there are no stages, or a stage has fewer than one
+            worker or the queue size is below one (the queues would never
+            drain). Checked when called, before any item is processed.
+    """
+    queue_size = PIPELINE_QUEUE_SIZE if queue_size is None else queue_size
+    if not stages:
+        raise ValueError("A pipeline needs at least one stage")
+    if queue_size < 1:
+        raise ValueError(f"Pipeline queue size must be at least 1, not {queue_size}")
+    for stage in stages:
+        if stage.workers < 1:
+            raise ValueError(f"Pipeline stage {stage.name} needs at least 1 worker, not {stage.workers}")
+    return _stream(items, stages, queue_size)
+
+
+def _stream(items, stages, queue_size):
+    """Run the pipeline threads and yield the results (see run_pipeline)."""
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    results = queue.Queue()
+    busy = {stage.name: 0.0 for stage in stages}
+    remaining = [stage.workers for stage in stages]
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def feed():
+        for item in items:
+            queues[0].put((item, []))
+        for _ in range(stages[0].workers):
+            queues[0].put(_STAGE_COMPLETE)
+
+    def work(index):
+        stage = stages[index]
+        while (job := queues[index].get()) is not _STAGE_COMPLETE:
+            item, errors = job
+            stage_start = time.perf_counter()
+            try:
+                stage.function(item)
+                failed = False
+            except Exception as e:
+                logger.critical(f"Pipeline {stage.name} failed for {item}. {e}")
+                errors.append((stage.name, str(e)))
+                failed = stage.required
+            with lock:
+                busy[stage.name] += time.perf_counter() - stage_start
+            if failed:
+                results.put(PipelineResult(item, False, errors))
+            elif index + 1 < len(stages):
+                queues[index + 1].put((item, errors))
+            else:
+                results.put(PipelineResult(item, True, errors))
+        with lock:
+            remaining[index] -= 1
+            last_worker = remaining[index] == 0
+        if last_worker:  # pass the end of input on once every worker has finished
+            if index + 1 < len(stages):
+                for _ in range(stages[index + 1].workers):
+                    queues[index + 1].put(_STAGE_COMPLETE)
+            else:
+                results.put(_STAGE_COMPLETE)
+
+    threading.Thread(target=feed, name="pipeline:feed", daemon=True).start()
+    for index, stage in enumerate(stages):
+        for worker in range(stage.workers):
+            threading.Thread(
+                target=work, args=(index,), name=f"pipeline:{stage.name}:{worker}", daemon=True
+            ).start()
+
+    while (result := results.get()) is not _STAGE_COMPLETE:
+        yield result
+
+    elapsed = time.perf_counter() - start
+    stage_times = ", ".join(
+        f"{stage.name} {busy[stage.name]:.1f}s/{stage.workers} workers" for stage in stages
+    )
+    logger.info(f"Pipeline finished in {elapsed:.1f}s (busy time: {stage_times})")
@@ -2,21 +2,32 @@
 
 This module handles:
   * Deriving collection (shelfmark) identifiers from WAV filenames.
-  * Generating compressed AAC (.m4a) access copies using ffmpeg.
-  * Moving / updating access copies into the MSO store organised by collection.
+  * Generating compressed AAC (.m4a) access copies using ffmpeg, one at a
+    time or as a batch of concurrent ffmpeg processes (longest WAV first).
+  * Moving / updating access copies into the MSO store organised by collection
+    (see transferoperations: rename, clone or verified copy per TRANSFER_MODE).
 
 External tools assumed on PATH: ffmpeg.
-Environment variables used: MSO_STORE (destination root for access copies).
+Environment variables used: MSO_STORE (destination root for access copies),
+ACCESS_ENCODE_WORKERS (concurrent ffmpeg encodes in a batch, default CPU count).
 """
 import os
 import subprocess
-import shutil
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
 from logging_module import logger
+from metrics import metrics
+from transferoperations import transfer_file
 
 load_dotenv()
 
+ACCESS_ENCODE_WORKERS = int(os.getenv("ACCESS_ENCODE_WORKERS") or os.cpu_count() or 1)
+
+EncodeResult = namedtuple("EncodeResult", ["wav_file", "error"])
+
 
 class PostBackupOperations:
     """Operations executed after primary file backup.
@@ -26,18 +37,16 @@ class PostBackupOperations:
 
     Attributes:
         MSO_STORE (str): Root directory for access (m4a) files, from env.
-        collection_no (str|None): Parsed collection identifier from current WAV.
         STAGING_LOCATION (str): Provided staging path.
         m4a_file (str|None): Placeholder for last generated access file path.
     """
     def __init__(self, staging_location):
         self.MSO_STORE = os.getenv("MSO_STORE")
-        self.collection_no = None
         self.STAGING_LOCATION = staging_location
         self.m4a_file = None
 
     def get_shelfmark(self, wav_file):
-        """Parse WAV filename to set collection_no attribute.
+        """Parse a WAV filename for its collection identifier.
 
         Expected filename pattern segments separated by underscores. Logic:
           * If second token starts with 1/2/9 -> first three characters.
@@ -46,63 +55,78 @@ class PostBackupOperations:
 
         Args:
             wav_file (str): Path to the WAV file.
+        Returns:
+            str: The collection identifier. No attributes are set, so
+                concurrent encodes can share one instance.
         Raises:
             ValueError: On parsing errors.
         """
         try:
-            self.wav_file_name = os.path.basename(wav_file.split(".")[0])
-            parsed_name = self.wav_file_name.split("_")
+            wav_file_name = os.path.splitext(os.path.basename(wav_file))[0]
+            parsed_name = wav_file_name.split("_")
             if parsed_name[1].startswith(("1", "2", "9")):
-                self.collection_no = parsed_name[1][0:3]
+                collection_no = parsed_name[1][0:3]
             elif parsed_name[1].startswith("C"):
-                self.collection_no = parsed_name[1].split("-")[0]
+                collection_no = parsed_name[1].split("-")[0]
             else:
-                self.collection_no = parsed_name[1]
+                collection_no = parsed_name[1]
         except Exception as e:
             logger.warning(f"Error parsing shelfmark for {wav_file}. {e}")
             raise ValueError(e)
+        return collection_no
 
-    def move_to_mso_store(self, m4a_file):
+    def move_to_mso_store(self, m4a_file, collection_no):
         """Move (or replace) an access .m4a file into its collection directory.
 
         Creates the collection directory if needed. If a file with the same name
-        already exists it is replaced.
+        already exists it is replaced. The file is renamed, cloned or copied
+        as per TRANSFER_MODE (see transferoperations.transfer_file), and the
+        transfer recorded in the run metrics as stage "mso_move".
 
         Args:
             m4a_file (str): Path to the generated access file.
+            collection_no (str): Collection directory (see get_shelfmark).
         Raises:
             ValueError: If move or removal operations fail.
         """
-        collection_directory = os.path.join(self.MSO_STORE, self.collection_no)
+        collection_directory = os.path.join(self.MSO_STORE, collection_no)
         try:
             if not os.path.exists(collection_directory):
-                os.mkdir(collection_directory)
-                shutil.move(m4a_file, collection_directory)
+                os.makedirs(collection_directory, exist_ok=True)
             elif os.path.exists(os.path.join(collection_directory, os.path.basename(m4a_file))):
                 os.remove(os.path.join(collection_directory, os.path.basename(m4a_file)))
-                shutil.move(m4a_file, collection_directory)
-            else:
-                shutil.move(m4a_file, collection_directory)
         except Exception as e:
             logger.critical(f"Error moving {m4a_file} to MSO store. {e}")
             raise ValueError(e)
+        result = transfer_file(m4a_file, collection_directory)
+        metrics.record("mso_move", m4a_file, result.bytes, result.elapsed, result.error)
+        if result.error is not None:
+            raise ValueError(result.error)
 
-    def access_file_generate(self, wav_file):
+    def access_file_generate(self, wav_file, collection_no=None):
         """Generate an AAC (.m4a) access copy for a WAV file and move it to MSO.
 
         Uses ffmpeg with fixed parameters (AAC 256k, audio only). On success the
         file is moved into the MSO_STORE collection directory derived via
-        get_shelfmark().
+        get_shelfmark(). A non-zero ffmpeg exit status is an error, and any
+        partial output is removed. The encode is recorded in the run metrics
+        as stage "encode" (bytes: the WAV size).
 
         Args:
             wav_file (str): Path to source WAV.
+            collection_no (str|None): Collection directory; parsed from the
+                file name with get_shelfmark() if not given.
         Raises:
-            ValueError: If ffmpeg invocation fails.
+            ValueError: If the file name cannot be parsed, or ffmpeg
+                invocation fails or exits with an error.
         """
-        wav_file_name = os.path.basename(wav_file.split(".")[0])
+        if collection_no is None:
+            collection_no = self.get_shelfmark(wav_file)
+        wav_file_name = os.path.splitext(os.path.basename(wav_file))[0]
         m4a_file = os.path.join(self.STAGING_LOCATION, f"{wav_file_name}.m4a")
+        start = time.perf_counter()
         try:
-            subprocess.call(
+            return_code = subprocess.call(
                 [
                     "ffmpeg",
                     "-hide_banner",
@@ -122,6 +146,42 @@ class PostBackupOperations:
                 ],
             )
         except Exception as e:
+            metrics.record("encode", wav_file, 0, time.perf_counter() - start, str(e))
             logger.critical(f"Error generating access file for {wav_file}. {e}")
             raise ValueError(e)
-        self.move_to_mso_store(m4a_file)
+        metrics.record(
+            "encode", wav_file, os.path.getsize(wav_file), time.perf_counter() - start,
+            f"ffmpeg exited with code {return_code}" if return_code != 0 else None,
+        )
+        if return_code != 0:
+            if os.path.exists(m4a_file):
+                os.remove(m4a_file)
+            logger.critical(f"Error generating access file for {wav_file}. ffmpeg exited with code {return_code}")
+            raise ValueError(f"ffmpeg exited with code {return_code}")
+        self.move_to_mso_store(m4a_file, collection_no)
+
+    def batch_access_file_generate(self, wav_files, max_workers=None):
+        """Generate access copies for many WAVs with concurrent ffmpeg processes.
+
+        Each encode runs in its own ffmpeg process, so a thread per running
+        encode is enough to keep max_workers cores busy. Jobs are started
+        longest first (by WAV size) so a long recording does not start last
+        and leave the batch waiting on it. A failed file does not stop the others.
+
+        Args:
+            wav_files (iterable[str]): Paths to source WAVs.
+            max_workers (int|None): Concurrent encodes; defaults to ACCESS_ENCODE_WORKERS.
+        Yields:
+            EncodeResult: wav_file and error (None on success), as each encode completes.
+        """
+        wav_files = sorted(wav_files, key=os.path.getsize, reverse=True)
+        with ThreadPoolExecutor(max_workers=max_workers or ACCESS_ENCODE_WORKERS) as pool:
+            # each worker parses its own collection number (get_shelfmark keeps no state)
+            futures = {pool.submit(self.access_file_generate, wav_file): wav_file for wav_file in wav_files}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    yield EncodeResult(futures[future], str(e))
+                else:
+                    yield EncodeResult(futures[future], None)
@@ -0,0 +1,318 @@
+"""Native RIFF / Broadcast WAV header reader and writer.
+
+Walks the chunk headers of a WAV file by seeking from one chunk to the next,
+reading only the chunks of interest (fmt, bext, LIST/INFO, MD5) and never the
+audio data. RF64 / BW64 files are supported through their ds64 chunk.
+
+The "MD5 " chunk (as written by bwfmetaedit --MD5-Embed) holds the MD5 of the
+data chunk payload: the audio alone, unaffected by header edits.
+
+The writer updates bext fields and the LIST/INFO chunk of a RIFF file in
+place without touching the audio payload. Changes are first computed as a
+HeaderRewritePlan (byte patches plus an optional new file tail), so they can
+be inspected (dry run) before being applied and verified by reading back:
+  * an INFO chunk that is the last chunk is rewritten at the end of the file;
+  * one that still fits its space is overwritten, the remainder becoming a
+    JUNK chunk;
+  * otherwise it is renamed to JUNK and the new chunk appended to the file.
+The RIFF size field is updated to match.
+
+Chunk layout reference: EBU Tech 3285 (bext) and EBU Tech 3306 (RF64).
+"""
+import os
+import struct
+from collections import namedtuple
+
+RIFF_FORMS = (b"RIFF", b"RF64", b"BW64")
+RF64_PLACEHOLDER = 0xFFFFFFFF  # 32 bit size field deferring to the ds64 chunk
+
+# bext fields preceding the time reference: (name, length in bytes)
+BEXT_FIELDS = [
+    ("description", 256),
+    ("originator", 32),
+    ("originator_reference", 32),
+    ("origination_date", 10),
+    ("origination_time", 8),
+]
+BEXT_STRINGS_SIZE = sum(length for _, length in BEXT_FIELDS)
+
+Chunk = namedtuple("Chunk", ["id", "offset", "size", "list_type"])
+WavHeader = namedtuple("WavHeader", ["form", "chunks", "fmt", "bext", "info", "audio_md5"])
+HeaderRewritePlan = namedtuple("HeaderRewritePlan", ["patches", "tail_offset", "tail", "file_size"])
+
+
+def _decode(raw):
+    """Decode a fixed-length or NUL-terminated header string."""
+    return raw.split(b"\x00", 1)[0].decode("latin-1").strip()
+
+
+def walk_chunks(f):
+    """Yield the chunks of an open RIFF/RF64 file in file order.
+
+    Only chunk headers are read (plus the list type of LIST chunks and the
+    ds64 sizes of RF64 files). A truncated final chunk is yielded with the
+    size its header declares.
+
+    Args:
+        f (file): File opened in binary mode.
+    Yields:
+        Chunk: id (bytes), offset of the chunk header, data size (bytes,
+            excluding the pad byte) and list_type (bytes, LIST chunks only).
+    Raises:
+        ValueError: If the file is not a RIFF WAVE file.
+    """
+    f.seek(0)
+    header = f.read(12)
+    if len(header) < 12 or header[:4] not in RIFF_FORMS or header[8:12] != b"WAVE":
+        raise ValueError("Not a RIFF WAVE file")
+    ds64_sizes = {}
+    offset = 12
+    while True:
+        f.seek(offset)
+        chunk_header = f.read(8)
+        if len(chunk_header) < 8:
+            return
+        chunk_id, size = struct.unpack("<4sI", chunk_header)
+        if chunk_id == b"ds64":
+            _, data_size = struct.unpack("<QQ", f.read(16))  # RIFF size, data size
+            ds64_sizes[b"data"] = data_size
+        elif size == RF64_PLACEHOLDER and chunk_id in ds64_sizes:
+            size = ds64_sizes[chunk_id]
+        list_type = f.read(4) if chunk_id == b"LIST" else None
+        yield Chunk(chunk_id, offset, size, list_type)
+        offset += 8 + size + (size & 1)
+
+
+def read_fmt(f, chunk):
+    """Return the fields of a fmt chunk as a dict."""
+    f.seek(chunk.offset + 8)
+    audio_format, channels, sample_rate, byte_rate, block_align, bits_per_sample = struct.unpack(
+        "<HHIIHH", f.read(16)
+    )
+    return {
+        "audio_format": audio_format,
+        "channels": channels,
+        "sample_rate": sample_rate,
+        "byte_rate": byte_rate,
+        "block_align": block_align,
+        "bits_per_sample": bits_per_sample,
+    }
+
+
+def read_bext(f, chunk):
+    """Return the text fields of a bext chunk (description to origination_time) as a dict."""
+    f.seek(chunk.offset + 8)
+    raw = f.read(min(chunk.size, BEXT_STRINGS_SIZE)).ljust(BEXT_STRINGS_SIZE, b"\x00")
+    fields = {}
+    position = 0
+    for name, length in BEXT_FIELDS:
+        fields[name] = _decode(raw[position:position + length])
+        position += length
+    return fields
+
+
+def read_info(f, chunk):
+    """Return the text entries of a LIST/INFO chunk as {four character id: value}."""
+    f.seek(chunk.offset + 12)
+    data = f.read(chunk.size - 4)
+    info = {}
+    position = 0
+    while position + 8 <= len(data):
+        entry_id, size = struct.unpack("<4sI", data[position:position + 8])
+        info[entry_id.decode("latin-1")] = _decode(data[position + 8:position + 8 + size])
+        position += 8 + size + (size & 1)
+    return info
+
+
+def read_md5(f, chunk):
+    """Return the audio MD5 stored in an "MD5 " chunk as a hex digest."""
+    f.seek(chunk.offset + 8)
+    raw = f.read(16)
+    if len(raw) < 16:
+        raise struct.error("MD5 chunk shorter than 16 bytes")
+    return raw.hex()
+
+
+def data_range(header):
+    """Return (offset, size) of the audio payload (first data chunk), or None if there is none."""
+    for chunk in header.chunks:
+        if chunk.id == b"data":
+            return chunk.offset + 8, chunk.size
+    return None
+
+
+def read_wav_header(file):
+    """Read the chunk list, fmt, bext, LIST/INFO and MD5 metadata of a WAV file.
+
+    Args:
+        file (str): Path to the WAV file.
+    Returns:
+        WavHeader: form (b"RIFF", b"RF64" or b"BW64"), chunks (list[Chunk]),
+            fmt, bext and info dicts (empty if the chunk is absent) and
+            audio_md5 (hex digest from the MD5 chunk, or None).
+    Raises:
+        ValueError: If the file is not a RIFF WAVE file or a chunk is truncated.
+        OSError: If the file cannot be read.
+    """
+    with open(file, "rb") as f:
+        form = f.read(4)
+        fmt, bext, info = {}, {}, {}
+        audio_md5 = None
+        try:
+            chunks = list(walk_chunks(f))
+            for chunk in chunks:
+                if chunk.id == b"fmt " and not fmt:
+                    fmt = read_fmt(f, chunk)
+                elif chunk.id == b"bext" and not bext:
+                    bext = read_bext(f, chunk)
+                elif chunk.id == b"LIST" and chunk.list_type == b"INFO":
+                    info.update(read_info(f, chunk))
+                elif chunk.id == b"MD5 " and audio_md5 is None:
+                    audio_md5 = read_md5(f, chunk)
+        except struct.error as e:
+            raise ValueError(f"Truncated chunk in {file}. {e}")
+    return WavHeader(form, chunks, fmt, bext, info, audio_md5)
+
+
+def _chunk_end(chunk):
+    return chunk.offset + 8 + chunk.size + (chunk.size & 1)
+
+
+def build_info_chunk(info):
+    """Return the bytes of a LIST/INFO chunk holding the given entries.
+
+    Args:
+        info (dict[str, str]): {four character id: value}; values are stored
+            NUL-terminated and padded to an even length.
+    Returns:
+        bytes: The complete chunk, header included (always of even length).
+    """
+    body = b"INFO"
+    for entry_id, value in info.items():
+        data = value.encode("latin-1") + b"\x00"
+        body += struct.pack("<4sI", entry_id.encode("latin-1"), len(data)) + data + b"\x00" * (len(data) & 1)
+    return struct.pack("<4sI", b"LIST", len(body)) + body
+
+
+def plan_header_rewrite(file, info_updates, blank_bext_fields=()):
+    """Work out the in-place changes that apply metadata updates to a WAV file.
+
+    Nothing is written (see apply_header_rewrite).
+
+    Args:
+        file (str): Path to a RIFF WAV file.
+        info_updates (dict[str, str]): LIST/INFO entries to set; other
+            existing entries are kept.
+        blank_bext_fields (iterable[str]): bext text fields (see BEXT_FIELDS)
+            to clear. Ignored if the file has no bext chunk.
+    Returns:
+        HeaderRewritePlan: patches ([(offset, bytes)]), tail_offset (int|None;
+            the file is cut here and tail written in its place), tail (bytes)
+            and the resulting file_size. Stray bytes after the last chunk
+            (too few to hold a chunk header) are dropped, so the RIFF size
+            always ends at a chunk boundary.
+    Raises:
+        ValueError: If the file is not a RIFF (non RF64) WAV, is truncated,
+            has no data chunk, or has a bext chunk too short to hold the
+            fields to blank.
+    """
+    header = read_wav_header(file)
+    if header.form != b"RIFF":
+        raise ValueError(f"{header.form.decode('latin-1')} files are not supported by the native writer")
+    data_chunks = [chunk for chunk in header.chunks if chunk.id == b"data"]
+    if not data_chunks:
+        raise ValueError(f"No data chunk in {file}")
+    file_size = os.path.getsize(file)
+    end_of_chunks = _chunk_end(header.chunks[-1])
+    if header.chunks[-1].offset + 8 + header.chunks[-1].size > file_size:
+        raise ValueError(f"Truncated chunk in {file}")
+
+    patches = []
+    bext_chunks = [chunk for chunk in header.chunks if chunk.id == b"bext"]
+    if bext_chunks and blank_bext_fields:
+        if bext_chunks[0].size < BEXT_STRINGS_SIZE:
+            raise ValueError(
+                f"bext chunk of {file} is {bext_chunks[0].size} bytes, too short to blank {list(blank_bext_fields)}"
+            )
+        position = bext_chunks[0].offset + 8
+        for name, length in BEXT_FIELDS:
+            if name in blank_bext_fields:
+                patches.append((position, b"\x00" * length))
+            position += length
+
+    info_chunks = [chunk for chunk in header.chunks if chunk.id == b"LIST" and chunk.list_type == b"INFO"]
+    new_chunk = build_info_chunk({**header.info, **info_updates})
+    tail_offset = None
+    tail = b""
+    reused = None
+    if info_chunks and info_chunks[-1] == header.chunks[-1]:
+        reused = info_chunks[-1]
+        tail_offset = reused.offset
+        tail = new_chunk
+    else:
+        for chunk in info_chunks:
+            space = _chunk_end(chunk) - chunk.offset
+            if space == len(new_chunk) or space - len(new_chunk) >= 8:
+                reused = chunk
+                filler = b""
+                if space > len(new_chunk):
+                    filler = struct.pack("<4sI", b"JUNK", space - len(new_chunk) - 8)
+                    filler += b"\x00" * (space - len(new_chunk) - 8)
+                patches.append((chunk.offset, new_chunk + filler))
+                break
+        if reused is None:
+            tail_offset = end_of_chunks
+            tail = new_chunk
+    for chunk in info_chunks:
+        if chunk != reused:
+            patches.append((chunk.offset, b"JUNK"))
+
+    new_size = tail_offset + len(tail) if tail_offset is not None else end_of_chunks
+    patches.append((4, struct.pack("<I", new_size - 8)))
+
+    for offset, data in patches:  # the audio payload must never be touched
+        for chunk in data_chunks:
+            if offset < _chunk_end(chunk) and offset + len(data) > chunk.offset:
+                raise ValueError(f"Header rewrite would overlap the data chunk of {file}")
+    return HeaderRewritePlan(patches, tail_offset, tail, new_size)
+
+
+def apply_header_rewrite(file, plan):
+    """Write a HeaderRewritePlan to the file in place."""
+    with open(file, "r+b") as f:
+        for offset, data in plan.patches:
+            f.seek(offset)
+            f.write(data)
+        if plan.tail_offset is not None:
+            f.seek(plan.tail_offset)
+            f.write(plan.tail)
+        f.truncate(plan.file_size)
+
+
+def verify_header_rewrite(file, info_updates, blank_bext_fields=(), data_chunk=None):
+    """Read a rewritten file back and check the updates took effect.
+
+    Args:
+        file (str): Path to the rewritten WAV file.
+        info_updates (dict[str, str]): LIST/INFO entries that should be set.
+        blank_bext_fields (iterable[str]): bext fields that should be empty.
+        data_chunk (Chunk|None): The data chunk before the rewrite; if given,
+            it must be unchanged.
+    Returns:
+        list[str]: Problems found (empty if the rewrite verified).
+    """
+    header = read_wav_header(file)
+    problems = []
+    with open(file, "rb") as f:
+        (riff_size,) = struct.unpack("<I", f.read(8)[4:])
+    if os.path.getsize(file) - 8 != riff_size:
+        problems.append("RIFF size does not match the file size")
+    for entry_id, value in info_updates.items():
+        if header.info.get(entry_id) != value:
+            problems.append(f"INFO {entry_id} is {header.info.get(entry_id)!r}, expected {value!r}")
+    for name in blank_bext_fields:
+        if header.bext.get(name):
+            problems.append(f"bext {name} is not blank")
+    if data_chunk is not None and data_chunk not in header.chunks:
+        problems.append("data chunk moved or resized")
+    return problems
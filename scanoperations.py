@@ -0,0 +1,184 @@
+"""Directory tree scanning for drive mirror operations.
+
+Walks a tree with os.scandir, reusing each DirEntry's cached stat result
+rather than issuing a separate stat per file. Subdirectories are listed on a
+thread pool and file records are yielded as soon as their directory has been
+read, so callers can start consuming before the walk finishes.
+
+Hidden entries (names starting with '.') are skipped, as the previous glob
+based scan did, and directory symlinks are not followed to avoid cycles.
+
+Environment variables used: SCAN_WORKERS (threads per scanned tree, default 8).
+"""
+import os
+import queue
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dotenv import load_dotenv
+
+from logging_module import logger
+
+load_dotenv()
+
+SCAN_WORKERS = int(os.getenv("SCAN_WORKERS") or 8)
+SCAN_BATCH_SIZE = 1000  # records handed over per queue item
+SCAN_QUEUE_SIZE = 64  # batches buffered per tree before its scan waits for the consumer
+SCAN_STOP_POLL = 0.1  # seconds a waiting scan sleeps between checks that its stream is still read
+
+ScanEntry = namedtuple("ScanEntry", ["relpath", "size", "mtime_ns"])
+
+_SCAN_COMPLETE = object()
+
+
+def _scan_directory(directory, root_prefix):
+    """List a single directory.
+
+    Returns:
+        tuple[list[ScanEntry], list[str]]: File records and subdirectory paths.
+    """
+    files = []
+    subdirectories = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+                    elif entry.is_file():
+                        stat = entry.stat()
+                        files.append(
+                            ScanEntry(entry.path[len(root_prefix):], stat.st_size, stat.st_mtime_ns)
+                        )
+                except OSError as e:
+                    logger.warning(f"Unable to read {entry.path}, skipped. {e}")
+    except OSError as e:
+        logger.warning(f"Unable to scan directory {directory}, skipped. {e}")
+    return files, subdirectories
+
+
+def scan_tree(root, max_workers=None):
+    """Yield a ScanEntry for every file below root.
+
+    Order is not defined. A missing root yields nothing.
+
+    Args:
+        root (str): Directory to walk.
+        max_workers (int|None): Directory listing threads; defaults to SCAN_WORKERS.
+    Yields:
+        ScanEntry: relpath (relative to root), size (bytes), mtime_ns.
+    """
+    if not os.path.isdir(root):
+        return
+    root_prefix = os.path.join(root, "")
+    with ThreadPoolExecutor(max_workers=max_workers or SCAN_WORKERS) as pool:
+        pending = {pool.submit(_scan_directory, root, root_prefix)}
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, subdirectories = future.result()
+                    for subdirectory in subdirectories:
+                        pending.add(pool.submit(_scan_directory, subdirectory, root_prefix))
+                    yield from files
+        except BaseException:  # e.g. the caller stopped reading: do not list the rest of the tree
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+
+
+class ScanStream:
+    """Iterator over the records of one background tree scan.
+
+    Closing the stream (or dropping it) stops its scan, so a consumer that
+    stops early does not leave the scan thread waiting on a full queue.
+
+    Attributes:
+        queue (queue.Queue): Batches handed over by the scan thread.
+    """
+
+    def __init__(self, queue_, error, stop):
+        self.queue = queue_
+        self._error = error
+        self._stop = stop
+        self._batch = iter(())
+        self._complete = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while not self._complete:
+            entry = next(self._batch, None)
+            if entry is not None:
+                return entry
+            batch = self.queue.get()
+            if batch is _SCAN_COMPLETE:
+                self._complete = True
+            else:
+                self._batch = iter(batch)
+        if self._error:
+            raise self._error[0]
+        raise StopIteration
+
+    def close(self):
+        """Stop the scan; the stream yields nothing more."""
+        self._stop.set()
+        self._complete = True
+
+    def __del__(self):
+        self._stop.set()
+
+
+def scan_trees_concurrently(*roots, max_workers=None):
+    """Scan several trees at the same time.
+
+    Each tree is walked by its own background thread (and listing pool);
+    records are handed over through a bounded queue, so a scan runs ahead of
+    its consumer by at most SCAN_QUEUE_SIZE batches. For the scans to run
+    side by side the streams must be read together (as diff_trees does);
+    a stream that is not being read pauses its scan once its queue is full.
+    A scan stops when its stream is closed or dropped.
+
+    Args:
+        *roots (str): Directories to walk.
+        max_workers (int|None): Listing threads per tree; defaults to SCAN_WORKERS.
+    Returns:
+        list[ScanStream]: One record stream per root, in argument order.
+    """
+    streams = []
+    for root in roots:
+        queue_ = queue.Queue(maxsize=SCAN_QUEUE_SIZE)
+        error = []
+        stop = threading.Event()
+
+        def put(item, queue_=queue_, stop=stop):
+            while not stop.is_set():
+                try:
+                    queue_.put(item, timeout=SCAN_STOP_POLL)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def produce(root=root, error=error, put=put):
+            batch = []
+            scan = scan_tree(root, max_workers)
+            try:
+                for entry in scan:
+                    batch.append(entry)
+                    if len(batch) >= SCAN_BATCH_SIZE:
+                        if not put(batch):
+                            return
+                        batch = []
+                put(batch)
+            except Exception as e:
+                error.append(e)
+            finally:
+                scan.close()
+                put(_SCAN_COMPLETE)
+
+        threading.Thread(target=produce, name=f"scan:{root}", daemon=True).start()
+        streams.append(ScanStream(queue_, error, stop))
+    return streams
@@ -0,0 +1,41 @@
+"""Synthetic RIFF WAV files built chunk by chunk for the header writer tests."""
+import struct
+
+AUDIO = bytes(range(256)) * 40  # 10240 bytes, recognisable in a hex dump
+
+
+def chunk(chunk_id, data, pad=True):
+    """Return a chunk, with its pad byte after odd length data unless pad is False."""
+    return struct.pack("<4sI", chunk_id, len(data)) + data + b"\x00" * (len(data) & 1 and pad)
+
+
+def fmt_chunk():
+    return chunk(b"fmt ", struct.pack("<HHIIHH", 1, 2, 96000, 96000 * 6, 6, 24))
+
+
+def bext_chunk(originator="Synthetic Recorder", date="2024-01-01", time="10-00-00"):
+    strings = (
+        b"Synthetic recording".ljust(256, b"\x00")
+        + originator.encode().ljust(32, b"\x00")
+        + b"SYNTH".ljust(32, b"\x00")
+        + date.encode().ljust(10, b"\x00")
+        + time.encode().ljust(8, b"\x00")
+    )
+    return chunk(b"bext", strings + struct.pack("<QH", 0, 1) + b"\x00" * 254)
+
+
+def info_chunk(entries):
+    body = b"INFO" + b"".join(chunk(key.encode(), value.encode() + b"\x00") for key, value in entries.items())
+    return chunk(b"LIST", body)
+
+
+def data_chunk(audio=AUDIO, pad=True):
+    return chunk(b"data", audio, pad)
+
+
+def write_wav(path, chunks):
+    """Write a RIFF WAVE file of the given chunks, with a correct RIFF size field."""
+    body = b"WAVE" + b"".join(chunks)
+    with open(path, "wb") as f:
+        f.write(b"RIFF" + struct.pack("<I", len(body)) + body)
+    return str(path)
@@ -0,0 +1,47 @@
+import hashlib
+import subprocess
+import shutil
+
+import pytest
+
+from checksumoperations import ChecksumService, AUDIO_DIGEST
+from synthetic_wav import AUDIO, write_wav, fmt_chunk, bext_chunk, data_chunk
+
+
+@pytest.fixture
+def wav_file(tmp_path):
+    return write_wav(tmp_path / "C1234_C1234-0001_0001.wav", [bext_chunk(), fmt_chunk(), data_chunk()])
+
+
+def test_audio_sidecar_round_trip(wav_file):
+    cs = ChecksumService()
+    digests = cs.generate_digests(wav_file, use_cache=False, audio=True)
+    assert digests[AUDIO_DIGEST] == hashlib.md5(AUDIO).hexdigest()
+
+    cs.write_audio_checksum(wav_file, digests[AUDIO_DIGEST])
+
+    assert open(f"{wav_file}.audio.md5").read() == (
+        f"audio-md5 (data chunk of C1234_C1234-0001_0001.wav) = {digests[AUDIO_DIGEST]}\n"
+    )
+    assert cs.audio_sidecar_matches(wav_file, digests[AUDIO_DIGEST]) is True
+    assert cs.audio_sidecar_matches(wav_file, digests["md5"]) is False
+
+
+def test_plain_audio_sidecar_is_still_read(wav_file):
+    with open(f"{wav_file}.audio.md5", "w") as f:
+        f.write(f"{hashlib.md5(AUDIO).hexdigest()} *C1234_C1234-0001_0001.wav")
+
+    assert ChecksumService().audio_sidecar_matches(wav_file, hashlib.md5(AUDIO).hexdigest()) is True
+
+
+@pytest.mark.skipif(shutil.which("md5sum") is None, reason="md5sum not installed")
+def test_md5sum_does_not_check_the_audio_sidecar(wav_file, tmp_path):
+    cs = ChecksumService()
+    cs.write_audio_checksum(wav_file, cs.generate_digests(wav_file, use_cache=False, audio=True)[AUDIO_DIGEST])
+
+    result = subprocess.run(
+        ["md5sum", "-c", f"{wav_file}.audio.md5"], cwd=tmp_path, capture_output=True, text=True
+    )
+
+    assert "FAILED" not in result.stdout
+    assert "no properly formatted" in result.stderr
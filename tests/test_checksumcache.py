@@ -0,0 +1,97 @@
+import hashlib
+import os
+
+import pytest
+
+from checksumcache import ChecksumCache
+from checksumoperations import ChecksumService
+
+MTIME_NS = 1_700_000_000 * 10**9
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ChecksumCache(str(tmp_path / "cache.sqlite"))
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def take(tmp_path):
+    file = tmp_path / "take.wav"
+    file.write_bytes(b"original audio")
+    os.utime(file, ns=(MTIME_NS, MTIME_NS))
+    return str(file)
+
+
+def test_unchanged_file_is_a_hit(cache, take):
+    assert cache.get(take) is None
+    cache.put(take, {"md5": "a" * 32})
+
+    assert cache.get(take) == {"md5": "a" * 32}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_missing_algorithm_is_a_miss(cache, take):
+    cache.put(take, {"md5": "a" * 32})
+
+    assert cache.get(take, ["sha256"]) is None
+    cache.put(take, {"sha256": "b" * 64})
+    assert cache.get(take, ["sha256"]) == {"md5": "a" * 32, "sha256": "b" * 64}
+
+
+def test_changed_file_is_a_miss(cache, take):
+    cache.put(take, {"md5": "a" * 32})
+
+    with open(take, "wb") as f:
+        f.write(b"edited audio, longer")
+    os.utime(take, ns=(MTIME_NS, MTIME_NS))  # size alone must be enough
+
+    assert cache.get(take) is None
+
+
+def test_file_modified_while_hashed_is_not_stored(cache, take):
+    stat = os.stat(take)
+    os.utime(take, ns=(MTIME_NS + 1, MTIME_NS + 1))
+
+    cache.put(take, {"md5": "a" * 32}, stat)
+
+    assert cache.get(take) is None
+
+
+def test_invalidate_removes_digests_and_signatures(cache, take):
+    cache.put(take, {"md5": "a" * 32})
+    cache.put_signatures(take, 4096, b"\x01" * 16)
+
+    cache.invalidate(take)
+
+    assert cache.get(take) is None
+    assert cache.get_signatures(take, 4096) is None
+
+
+def test_eviction_keeps_the_most_recently_used(tmp_path):
+    cache = ChecksumCache(str(tmp_path / "cache.sqlite"), max_entries=10)
+    files = []
+    for index in range(20):
+        file = tmp_path / f"take{index:02}.wav"
+        file.write_bytes(b"x" * index)
+        cache.put(str(file), {"md5": str(index)})
+        files.append(str(file))
+    cache.get(files[0])  # recently used
+
+    cache.evict()
+
+    assert cache.get(files[0]) is not None
+    assert sum(cache.get(file) is not None for file in files) <= 10
+    cache.close()
+
+
+def test_service_reads_a_cached_file_once(cache, take):
+    cs = ChecksumService(algorithms=[], cache=cache)
+
+    first = cs.generate_digests(take)
+    cached = cs.generate_digests(take)
+    uncached = cs.generate_digests(take, use_cache=False)
+
+    assert first == cached == uncached == {"md5": hashlib.md5(b"original audio").hexdigest()}
+    assert cache.hits == 1
@@ -0,0 +1,144 @@
+import hashlib
+import os
+
+import pytest
+
+from checksumoperations import ChecksumService, copy_and_hash, hash_file, _bounded_map
+
+DATA = os.urandom(3 * 1024 * 1024 + 11)  # not a whole number of blocks
+
+
+def test_single_pass_copy_digest_equals_hash_file(tmp_path):
+    source = tmp_path / "source.wav"
+    source.write_bytes(DATA)
+    destination = tmp_path / "copy.wav"
+
+    digests = copy_and_hash(str(source), str(destination))
+
+    assert destination.read_bytes() == DATA
+    assert digests == hash_file(str(destination))[0] == {"md5": hashlib.md5(DATA).hexdigest()}
+
+
+def test_single_pass_copy_through_a_temporary_path(tmp_path):
+    source = tmp_path / "source.wav"
+    source.write_bytes(DATA)
+    os.utime(source, ns=(1_600_000_000 * 10**9, 1_600_000_000 * 10**9))
+    destination = tmp_path / "copy.wav"
+
+    digests = copy_and_hash(str(source), str(destination), temp_path=str(tmp_path / ".copy.partial"))
+
+    assert digests["md5"] == hashlib.md5(DATA).hexdigest()
+    assert not (tmp_path / ".copy.partial").exists()
+    assert os.stat(destination).st_mtime_ns == os.stat(source).st_mtime_ns
+
+
+def test_file_copy_and_checksum_sets_the_checksum_of_the_copy(tmp_path):
+    source = tmp_path / "source.wav"
+    source.write_bytes(DATA)
+    cs = ChecksumService(algorithms=[])
+
+    checksum = cs.file_copy_and_checksum(str(source), str(tmp_path / "copy.wav"))
+
+    assert checksum == cs.file_checksum == hash_file(str(tmp_path / "copy.wav"))[0]["md5"]
+
+
+def test_bounded_map_yields_every_result_and_consumes_lazily():
+    consumed = []
+
+    def items():
+        for item in [*range(20), None, 20]:
+            consumed.append(item)
+            yield item
+
+    results = _bounded_map(lambda item: item, items(), max_workers=2)
+    first = next(results)
+
+    assert len(consumed) <= 2 * 2 + 1  # a window of queued work, not the whole input
+    assert sorted([first, *results], key=str) == sorted([*range(21), None], key=str)
+
+
+def test_bounded_map_raises_a_worker_error():
+    def worker(item):
+        if item == 5:
+            raise OSError("unreadable")
+        return item
+
+    with pytest.raises(OSError, match="unreadable"):
+        list(_bounded_map(worker, range(10), max_workers=3))
+
+
+def test_batch_checksum_generate_verifies_and_reports_failures(tmp_path):
+    files = []
+    for index in range(6):
+        data = os.urandom(1000 + index)
+        file = tmp_path / f"take{index}.wav"
+        file.write_bytes(data)
+        checksum = hashlib.md5(data).hexdigest() if index != 2 else "0" * 32
+        (tmp_path / f"take{index}.wav.md5").write_text(f"{checksum} *take{index}.wav")
+        files.append(str(file))
+    files.append(str(tmp_path / "missing.wav"))
+    cs = ChecksumService(algorithms=["sha256"])
+
+    results = {result.file: result for result in cs.batch_checksum_generate(files, verify=True, max_workers=3)}
+
+    assert set(results) == set(files)
+    for file in files[:6]:
+        assert results[file].digests == hash_file(file, algorithms=["sha256"])[0]
+    assert [file for file in files if results[file].verified is False] == [files[2], files[6]]
+    assert results[files[6]].error is not None
+    assert sorted(cs.failed_files) == ["missing.wav", "take2.wav"]
+
+
+@pytest.mark.parametrize("strategy", ["readinto", "mmap", "read"])
+@pytest.mark.parametrize("block_size", [4096, 1024 * 1024, 5 * 1024 * 1024])
+def test_hash_strategies_and_block_sizes_agree(tmp_path, strategy, block_size):
+    file = tmp_path / "take.wav"
+    file.write_bytes(DATA)
+
+    digests, bytes_read = hash_file(str(file), block_size, strategy)
+
+    assert digests == {"md5": hashlib.md5(DATA).hexdigest()}
+    assert bytes_read == len(DATA)
+
+
+@pytest.mark.parametrize("strategy", ["readinto", "mmap", "read"])
+def test_empty_file_hashes_with_every_strategy(tmp_path, strategy):
+    file = tmp_path / "empty.wav"
+    file.write_bytes(b"")
+
+    assert hash_file(str(file), strategy=strategy) == ({"md5": hashlib.md5(b"").hexdigest()}, 0)
+
+
+def test_unknown_strategy_is_refused(tmp_path):
+    file = tmp_path / "take.wav"
+    file.write_bytes(DATA)
+
+    with pytest.raises(ValueError):
+        hash_file(str(file), strategy="bogus")
+
+
+@pytest.mark.parametrize("strategy", ["readinto", "mmap", "read"])
+def test_extra_digests_come_from_the_same_read(tmp_path, strategy):
+    file = tmp_path / "take.wav"
+    file.write_bytes(DATA)
+
+    digests, bytes_read = hash_file(str(file), strategy=strategy, algorithms=["sha256", "blake2b"])
+
+    assert digests == {
+        "md5": hashlib.md5(DATA).hexdigest(),
+        "sha256": hashlib.sha256(DATA).hexdigest(),
+        "blake2b": hashlib.blake2b(DATA).hexdigest(),
+    }
+    assert bytes_read == len(DATA)
+
+
+def test_extra_digests_are_written_as_sidecars(tmp_path):
+    source = tmp_path / "take.wav"
+    source.write_bytes(DATA)
+    cs = ChecksumService(algorithms=["sha256"])
+    cs.file_copy_and_checksum(str(source), str(tmp_path / "copy.wav"))
+
+    written = cs.write_extra_checksums(str(tmp_path / "copy.wav"))
+
+    assert written == [str(tmp_path / "copy.wav.sha256")]
+    assert (tmp_path / "copy.wav.sha256").read_text().split() == [hashlib.sha256(DATA).hexdigest(), "*copy.wav"]
@@ -0,0 +1,40 @@
+import hashlib
+import shutil
+
+import pytest
+
+from checksumoperations import copy_patch_and_hash, wav_audio_range, AUDIO_DIGEST
+from metadataoperations import BLANKED_BEXT_FIELDS
+from riffchunks import plan_header_rewrite, apply_header_rewrite, verify_header_rewrite
+from synthetic_wav import AUDIO, write_wav, fmt_chunk, bext_chunk, info_chunk, data_chunk
+
+UPDATES = {"IARL": "GB, BL", "ICRD": "2024-01-01T10:00:00Z", "IENG": "Test Engineer", "ISFT": "Synthetic Recorder"}
+
+LAYOUTS = {
+    "even data": [bext_chunk(), fmt_chunk(), data_chunk()],
+    "odd data with pad": [bext_chunk(), fmt_chunk(), data_chunk(AUDIO[:-1])],
+    "odd data without pad": [bext_chunk(), fmt_chunk(), data_chunk(AUDIO[:-1], pad=False)],
+    "info after odd data": [bext_chunk(), fmt_chunk(), data_chunk(AUDIO[:-1]), info_chunk({"ICMT": "note"})],
+    "info before data": [bext_chunk(), fmt_chunk(), info_chunk({"IENG": "x" * 200}), data_chunk()],
+}
+
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+def test_staged_copy_matches_in_place_rewrite(tmp_path, layout):
+    source = write_wav(tmp_path / "source.wav", LAYOUTS[layout])
+    original = open(source, "rb").read()
+    plan = plan_header_rewrite(source, UPDATES, BLANKED_BEXT_FIELDS)
+    in_place = str(tmp_path / "in_place.wav")
+    shutil.copyfile(source, in_place)
+    apply_header_rewrite(in_place, plan)
+    staged = str(tmp_path / "staged.wav")
+
+    source_md5, digests = copy_patch_and_hash(source, staged, plan, audio_range=wav_audio_range(source))
+
+    output = open(staged, "rb").read()
+    assert output == open(in_place, "rb").read()
+    assert verify_header_rewrite(staged, UPDATES, BLANKED_BEXT_FIELDS) == []
+    assert source_md5 == hashlib.md5(original).hexdigest()
+    assert digests["md5"] == hashlib.md5(output).hexdigest()
+    assert digests[AUDIO_DIGEST] == hashlib.md5(AUDIO[:len(AUDIO) - ("odd" in layout)]).hexdigest()
+    assert open(source, "rb").read() == original
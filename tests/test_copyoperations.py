@@ -0,0 +1,84 @@
+import errno
+import os
+import shutil
+
+import pytest
+
+import copyoperations
+from copyoperations import copy2, copy_file_contents
+
+DATA = os.urandom(3 * 1024 * 1024 + 7)
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "source.wav"
+    path.write_bytes(DATA)
+    return str(path)
+
+
+@pytest.mark.parametrize("engine", copyoperations.COPY_ENGINES)
+def test_each_engine_copies_contents_and_metadata(tmp_path, source, engine):
+    os.utime(source, ns=(1_600_000_000 * 10**9, 1_600_000_000 * 10**9))
+
+    destination = copy2(source, str(tmp_path / "copy.wav"), engine)
+
+    assert open(destination, "rb").read() == DATA
+    assert os.stat(destination).st_mtime_ns == os.stat(source).st_mtime_ns
+
+
+@pytest.mark.parametrize("destination", ["source.wav", "."])
+def test_same_file_is_refused_without_truncating_the_source(tmp_path, source, destination):
+    with pytest.raises(shutil.SameFileError):
+        copy2(source, str(tmp_path / destination))
+
+    assert open(source, "rb").read() == DATA
+
+
+def test_missing_kernel_call_falls_back_to_userspace(tmp_path, source, monkeypatch):
+    monkeypatch.delattr(os, "copy_file_range")
+    monkeypatch.delattr(os, "sendfile")
+
+    engine, copied = copy_file_contents(source, str(tmp_path / "copy.wav"))
+
+    assert (engine, copied) == ("userspace", len(DATA))
+    assert open(tmp_path / "copy.wav", "rb").read() == DATA
+
+
+def test_errors_inside_userspace_engine_are_not_hidden(tmp_path, source, monkeypatch):
+    def broken_userspace(src, dst, offset, chunk_size):
+        raise AttributeError("bug")
+
+    monkeypatch.setitem(copyoperations._ENGINE_FUNCTIONS, "userspace", broken_userspace)
+
+    with pytest.raises(AttributeError):
+        copy2(source, str(tmp_path / "copy.wav"), "userspace")
+
+
+def test_copy_fails_when_no_engine_can_run(tmp_path, source, monkeypatch):
+    monkeypatch.setattr(copyoperations, "_engine_available", lambda name: False)
+
+    with pytest.raises(OSError):
+        copy2(source, str(tmp_path / "copy.wav"))
+
+
+def test_fallback_continues_from_the_offset_reached(tmp_path, source, monkeypatch):
+    def failing_copy_file_range(src, dst, offset, chunk_size):
+        os.copy_file_range(src, dst, 1024 * 1024, offset, offset)  # partial progress, then a refusal
+        raise OSError(errno.EXDEV, "cross-device")
+
+    offsets = []
+    sendfile = copyoperations._sendfile
+
+    def recording_sendfile(src, dst, offset, chunk_size):
+        offsets.append(offset)
+        return sendfile(src, dst, offset, chunk_size)
+
+    monkeypatch.setitem(copyoperations._ENGINE_FUNCTIONS, "copy_file_range", failing_copy_file_range)
+    monkeypatch.setitem(copyoperations._ENGINE_FUNCTIONS, "sendfile", recording_sendfile)
+
+    engine, copied = copy_file_contents(source, str(tmp_path / "copy.wav"), "copy_file_range")
+
+    assert (engine, copied) == ("sendfile", len(DATA))
+    assert offsets == [1024 * 1024]
+    assert open(tmp_path / "copy.wav", "rb").read() == DATA
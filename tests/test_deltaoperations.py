@@ -0,0 +1,69 @@
+import hashlib
+import os
+
+import deltaoperations
+from deltaoperations import delta_copy_and_hash
+
+BLOCK_SIZE = 4096
+
+
+class ShortReads:
+    """Unbuffered file whose reads return at most a few hundred bytes."""
+
+    def __init__(self, file):
+        self.file = file
+
+    def readinto(self, buffer):
+        return self.file.readinto(memoryview(buffer)[:300])
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.file.close()
+
+
+def write_pair(tmp_path, source_data, mirror_data):
+    source = tmp_path / "source.wav"
+    mirror = tmp_path / "mirror.wav"
+    source.write_bytes(source_data)
+    mirror.write_bytes(mirror_data)
+    return str(source), str(mirror)
+
+
+def test_only_changed_blocks_are_written(tmp_path):
+    mirror_data = os.urandom(10 * BLOCK_SIZE)
+    source_data = bytearray(mirror_data)
+    source_data[3 * BLOCK_SIZE + 5] ^= 0xFF
+    source_data += os.urandom(100)  # appended audio
+    source, mirror = write_pair(tmp_path, bytes(source_data), mirror_data)
+
+    digests, written = delta_copy_and_hash(source, mirror, block_size=BLOCK_SIZE)
+
+    assert open(mirror, "rb").read() == source_data
+    assert digests["md5"] == hashlib.md5(source_data).hexdigest()
+    assert written == BLOCK_SIZE + 100
+
+
+def test_short_reads_and_writes_keep_blocks_aligned(tmp_path, monkeypatch):
+    mirror_data = os.urandom(10 * BLOCK_SIZE)
+    source_data = bytearray(mirror_data)
+    source_data[7 * BLOCK_SIZE] ^= 0xFF
+    source, mirror = write_pair(tmp_path, bytes(source_data), mirror_data)
+
+    def short_open(file, mode="r", *args, **kwargs):
+        opened = open(file, mode, *args, **kwargs)
+        return ShortReads(opened) if mode == "rb" else opened
+
+    pwrite = os.pwrite
+    monkeypatch.setattr(deltaoperations, "open", short_open, raising=False)
+    monkeypatch.setattr(deltaoperations.os, "pwrite", lambda fd, data, offset: pwrite(fd, data[:500], offset))
+
+    digests, written = delta_copy_and_hash(source, mirror, block_size=BLOCK_SIZE)
+
+    assert open(mirror, "rb").read() == source_data
+    assert digests["md5"] == hashlib.md5(source_data).hexdigest()
+    assert written == BLOCK_SIZE
@@ -0,0 +1,82 @@
+import random
+
+from diffoperations import diff_trees, pair_moves, sorted_entries
+from scanoperations import ScanEntry
+
+
+def entries(*specs):
+    return [ScanEntry(relpath, size, 0) for relpath, size in specs]
+
+
+def test_diff_reports_new_changed_and_removed():
+    source = entries(("a.wav", 1), ("b.wav", 2), ("d.wav", 4))
+    mirror = entries(("b.wav", 3), ("c.wav", 3), ("d.wav", 4))
+
+    diff = [
+        (kind, (source_entry or mirror_entry).relpath, reason)
+        for kind, source_entry, mirror_entry, reason in diff_trees(source, mirror)
+    ]
+
+    assert diff == [("new", "a.wav", None), ("changed", "b.wav", "size"), ("removed", "c.wav", None)]
+
+
+def test_diff_uses_the_compare_callback():
+    source = entries(("a.wav", 1))
+    mirror = entries(("a.wav", 1))
+
+    diff = list(diff_trees(source, mirror, compare=lambda source_entry, mirror_entry: "content"))
+
+    assert [(kind, reason) for kind, _, _, reason in diff] == [("changed", "content")]
+
+
+def test_spilled_sort_matches_in_memory_sort():
+    records = entries(*((f"dir{index % 7}/take{index:04}.wav", index) for index in range(1000)))
+    random.Random(1).shuffle(records)
+
+    assert list(sorted_entries(records, max_in_memory=64)) == sorted(records)
+
+
+def test_spilled_diff_matches_in_memory_diff():
+    source = entries(*((f"take{index:04}.wav", index) for index in range(0, 600, 2)))
+    mirror = entries(*((f"take{index:04}.wav", index + (index % 10 == 0)) for index in range(0, 600, 3)))
+
+    assert list(diff_trees(source, mirror, max_in_memory=50)) == list(diff_trees(source, mirror))
+
+
+def test_pair_moves_pairs_same_size_and_digest():
+    new = entries(("renamed.wav", 5), ("fresh.wav", 5), ("other.wav", 9))
+    removed = entries(("take.wav", 5), ("gone.wav", 7))
+    digests = {"renamed.wav": "aaa", "fresh.wav": "bbb", "take.wav": "aaa"}
+    asked = []
+
+    def digest(entry):
+        asked.append(entry.relpath)
+        return digests.get(entry.relpath)
+
+    moved, unpaired_new, unpaired_removed = pair_moves(new, removed, digest, digest)
+
+    assert [(entry.relpath, entry.from_relpath, entry.digest) for entry in moved] == [
+        ("renamed.wav", "take.wav", "aaa")
+    ]
+    assert [entry.relpath for entry in unpaired_new] == ["fresh.wav", "other.wav"]
+    assert [entry.relpath for entry in unpaired_removed] == ["gone.wav"]
+    assert sorted(asked) == ["renamed.wav", "take.wav"]  # no size match, no digest; paired files not re-read
+
+
+def test_pair_moves_prefers_the_same_file_name():
+    new = entries(("b/take.wav", 5))
+    removed = entries(("a/other.wav", 5), ("a/take.wav", 5))
+
+    moved, _, unpaired_removed = pair_moves(new, removed, lambda entry: "aaa", lambda entry: "aaa")
+
+    assert [entry.from_relpath for entry in moved] == ["a/take.wav"]
+    assert [entry.relpath for entry in unpaired_removed] == ["a/other.wav"]
+
+
+def test_pair_moves_skips_unknown_digests():
+    new = entries(("b/take.wav", 5))
+    removed = entries(("a/take.wav", 5))
+
+    moved, unpaired_new, unpaired_removed = pair_moves(new, removed, lambda entry: None, lambda entry: None)
+
+    assert (moved, unpaired_new, unpaired_removed) == ([], new, removed)
@@ -0,0 +1,83 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import drivemirroroperations
+from drivemirroroperations import DriveMirror
+from mirrorjournal import MirrorJournal
+
+ENGINEER = "Test Engineer"
+
+
+def test_commit_submits_operations_through_a_bounded_window(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHECKSUM_CACHE", str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(drivemirroroperations, "MIRROR_SOURCE_WORKERS", 1)
+    monkeypatch.setattr(drivemirroroperations, "MIRROR_DESTINATION_WORKERS", 1)
+    source = tmp_path / "source" / ENGINEER
+    source.mkdir(parents=True)
+    for index in range(60):
+        (source / f"take{index:02}.wav").write_bytes(os.urandom(64))
+    (tmp_path / "mirror").mkdir()
+
+    submitted = []
+    recorded = []
+    queued = []
+    lock = threading.Lock()
+    submit = ThreadPoolExecutor.submit
+    record_done = MirrorJournal.record_done
+
+    def counting_submit(self, function, *args, **kwargs):
+        with lock:
+            submitted.append(function)
+            queued.append(len(submitted) - len(recorded))
+        return submit(self, function, *args, **kwargs)
+
+    def counting_record_done(self, kind, relpath, updates):
+        with lock:
+            recorded.append(relpath)
+        return record_done(self, kind, relpath, updates)
+
+    monkeypatch.setattr(MirrorJournal, "record_done", counting_record_done)
+
+    dmo = DriveMirror(str(source), str(tmp_path / "mirror"), ENGINEER, full_rescan=True)
+    dmo.progress_bar = lambda index, total: None
+    assert dmo.check_source_mirror_changes() is True
+    monkeypatch.setattr(ThreadPoolExecutor, "submit", counting_submit)
+    dmo.commit_file_changes()
+
+    assert sorted(recorded) == sorted(os.listdir(source))
+    mirrored = [name for name in os.listdir(tmp_path / "mirror" / ENGINEER) if not name.startswith(".")]
+    assert sorted(mirrored) == sorted(os.listdir(source))
+    assert max(queued) <= 2 * 2  # window of twice the pool size, not one future per file
+
+
+def test_moved_source_file_is_renamed_in_the_mirror(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHECKSUM_CACHE", str(tmp_path / "cache.sqlite"))
+    source = tmp_path / "source" / ENGINEER
+    mirror = tmp_path / "mirror"
+    mirror.mkdir()
+    audio = os.urandom(4096)
+    (source / "day1").mkdir(parents=True)
+    (source / "day1" / "take.wav").write_bytes(audio)
+
+    dmo = DriveMirror(str(source), str(mirror), ENGINEER, full_rescan=True)
+    dmo.progress_bar = lambda index, total: None
+    assert dmo.check_source_mirror_changes() is True
+    dmo.commit_file_changes()
+    mirrored_inode = os.stat(mirror / ENGINEER / "day1" / "take.wav").st_ino
+
+    (source / "day2").mkdir()
+    os.rename(source / "day1" / "take.wav", source / "day2" / "renamed.wav")
+    dmo = DriveMirror(str(source), str(mirror), ENGINEER, full_rescan=True)
+    dmo.progress_bar = lambda index, total: None
+    assert dmo.check_source_mirror_changes() is True
+    assert [(entry.relpath, entry.from_relpath) for entry in dmo.moved_files_in_source] == [
+        (os.path.join("day2", "renamed.wav"), os.path.join("day1", "take.wav"))
+    ]
+    assert dmo.new_files_in_source == [] and dmo.removed_files_in_source == []
+    dmo.commit_file_changes()
+
+    moved = mirror / ENGINEER / "day2" / "renamed.wav"
+    assert moved.read_bytes() == audio
+    assert os.stat(moved).st_ino == mirrored_inode  # renamed, not copied again
+    assert not (mirror / ENGINEER / "day1" / "take.wav").exists()
@@ -0,0 +1,61 @@
+import hashlib
+import os
+
+import pytest
+
+import drivemirroroperations
+from checksumoperations import copy_and_hash
+from drivemirroroperations import DriveMirror
+
+ENGINEER = "Test Engineer"
+
+
+def write(path, data, mtime_ns=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_strict_tier_reads_source_despite_cached_digest(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHECKSUM_CACHE", str(tmp_path / "cache.sqlite"))
+    source = tmp_path / "source" / ENGINEER
+    mirror = tmp_path / "mirror"
+    mtime_ns = 1_700_000_000 * 10**9
+    write(str(source / "take.wav"), b"original audio", mtime_ns)
+    write(str(mirror / ENGINEER / "take.wav"), b"original audio", mtime_ns)
+
+    dmo = DriveMirror(str(source), str(mirror), ENGINEER, detection_tier="strict", full_rescan=True)
+    assert dmo.check_source_mirror_changes() is False  # digests now cached for both files
+
+    write(str(source / "take.wav"), b"edited   audio", mtime_ns)  # same size, mtime restored
+    dmo = DriveMirror(str(source), str(mirror), ENGINEER, detection_tier="strict", full_rescan=True)
+    assert dmo.check_source_mirror_changes() is True
+    assert [(entry.relpath, entry.reason) for entry in dmo.changed_files_in_source] == [("take.wav", "content")]
+
+
+@pytest.mark.parametrize("tier, caught", [("strict", True), ("fast", False)])
+def test_strict_tier_reads_back_the_mirror_copy(tmp_path, monkeypatch, tier, caught):
+    monkeypatch.setenv("CHECKSUM_CACHE", str(tmp_path / "cache.sqlite"))
+    source = tmp_path / "source" / ENGINEER
+    mirror = tmp_path / "mirror"
+    mirror.mkdir()
+    audio = os.urandom(4096)
+    write(str(source / "take.wav"), audio)
+    (source / "take.wav.md5").write_text(f"{hashlib.md5(audio).hexdigest()} *take.wav")
+
+    def corrupting_copy_and_hash(source_file, destination_file, *args, **kwargs):
+        digests = copy_and_hash(source_file, destination_file, *args, **kwargs)
+        with open(destination_file, "r+b") as f:
+            f.write(bytes([audio[0] ^ 0xFF]))  # the write went bad after the source was read
+        return digests
+
+    monkeypatch.setattr(drivemirroroperations, "copy_and_hash", corrupting_copy_and_hash)
+    dmo = DriveMirror(str(source), str(mirror), ENGINEER, detection_tier=tier, full_rescan=True)
+    dmo.progress_bar = lambda index, total: None
+    assert dmo.check_source_mirror_changes() is True
+    dmo.commit_file_changes()
+
+    assert (dmo.cs.failed_files == ["take.wav"]) is caught
+    assert os.path.exists(mirror / ENGINEER / "take.wav") is not caught
@@ -0,0 +1,65 @@
+import importlib.util
+import json
+import logging
+import sys
+
+import logging_module
+from logging_module import JsonLinesFormatter
+
+
+def load_logging_module(name, monkeypatch, **environment):
+    """Import a fresh copy of logging_module (with its own logger) under the given environment."""
+    for key, value in environment.items():
+        monkeypatch.setenv(key, value)
+    spec = importlib.util.spec_from_file_location(name, logging_module.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_json_lines_formatter_writes_one_object_per_record():
+    record = logging.LogRecord(
+        "backup", logging.WARNING, "copyoperations.py", 1, "copied %s\nto %s", ("a.wav", "b"), None
+    )
+
+    line = JsonLinesFormatter().format(record)
+
+    assert "\n" not in line
+    entry = json.loads(line)
+    assert (entry["level"], entry["module"], entry["message"]) == ("WARNING", "copyoperations", "copied a.wav\nto b")
+    assert set(entry) == {"time", "level", "module", "thread", "message"}
+
+
+def test_json_lines_formatter_includes_the_exception():
+    try:
+        raise ValueError("bad header")
+    except ValueError:
+        record = logging.LogRecord("backup", logging.ERROR, "riffchunks.py", 1, "failed", None, sys.exc_info())
+
+    entry = json.loads(JsonLinesFormatter().format(record))
+
+    assert "ValueError: bad header" in entry["exception"]
+
+
+def test_records_reach_the_log_file_as_json_lines(tmp_path, monkeypatch):
+    module = load_logging_module("logging_module_json", monkeypatch, ROOT_LOCATION=str(tmp_path), LOG_LEVEL="INFO")
+    files = ["a.wav"]
+
+    module.logger.info("Copied %s", files)
+    files.append("b.wav")  # changed after logging: the message keeps the value at the call
+    module.logger.debug("per-file detail")
+    module.queue_handler.stop()
+
+    lines = (tmp_path / module.logTS).read_text().splitlines()
+    assert [json.loads(line)["message"] for line in lines] == ["Copied ['a.wav']"]
+
+
+def test_log_level_drops_records_before_they_are_queued(tmp_path, monkeypatch):
+    module = load_logging_module(
+        "logging_module_warning", monkeypatch, ROOT_LOCATION=str(tmp_path), LOG_LEVEL="warning"
+    )
+
+    module.logger.info("not written")
+
+    assert module.logger.level == logging.WARNING
+    assert module.queue_handler.listener is None  # nothing was emitted, so nothing started
@@ -0,0 +1,79 @@
+import json
+import os
+
+import pytest
+
+import metrics as metrics_module
+from metrics import RunMetrics
+
+
+def test_summary_totals_stages_and_throughput():
+    run = RunMetrics()
+    run.record("hash", "a.wav", 2_000_000, 1.0)
+    run.record("hash", "b.wav", 2_000_000, 1.0, error="unreadable")
+    run.record_wall("hash", 0.5)
+    run.record("encode", "a.wav", 1_000_000, 2.0)
+
+    stages = run.summary()["stages"]
+
+    assert stages["hash"] == {
+        "files": 2, "bytes": 4_000_000, "errors": 1, "busy_seconds": 2.0, "wall_seconds": 0.5, "mb_per_s": 8.0,
+    }
+    assert stages["encode"]["mb_per_s"] == 0.5  # no wall time: bytes over busy time
+    assert [record["file"] for record in run.summary()["files"]] == ["a.wav", "b.wav", "a.wav"]
+
+
+def test_timer_records_the_error_and_reraises():
+    run = RunMetrics()
+
+    with pytest.raises(OSError):
+        with run.timer("copy", "a.wav", 10):
+            raise OSError("disk full")
+
+    assert run.summary()["files"][0]["error"] == "disk full"
+    assert run.summary()["stages"]["copy"]["errors"] == 1
+
+
+def test_file_records_are_capped_but_totals_are_not(monkeypatch):
+    monkeypatch.setattr(metrics_module, "METRICS_FILE_RECORDS", 2)
+    run = RunMetrics()
+    for index in range(5):
+        run.record("hash", f"{index}.wav", 1, 0.1)
+
+    summary = run.summary()
+
+    assert (len(summary["files"]), summary["files_not_recorded"]) == (2, 3)
+    assert summary["stages"]["hash"]["files"] == 5
+
+
+def test_prometheus_text_has_a_sample_per_stage_with_run_labels():
+    run = RunMetrics()
+    run.labels = {"engineer": 'A "quoted" name'}
+    run.record("mirror.new", "a.wav", 100, 1.0)
+
+    lines = run.prometheus().splitlines()
+
+    assert "# TYPE backup_service_stage_bytes gauge" in lines
+    assert 'backup_service_stage_bytes{stage="mirror.new",engineer="A \\"quoted\\" name"} 100' in lines
+    assert not any(line.startswith("backup_service_stage_wall_seconds{") for line in lines)  # never timed as a whole
+    assert any(line.startswith('backup_service_last_run_timestamp_seconds{engineer=') for line in lines)
+
+
+def test_write_produces_the_json_summary_and_textfile(tmp_path):
+    run = RunMetrics()
+    run.record("hash", "a.wav", 100, 1.0)
+
+    written = run.write(str(tmp_path / "metrics"))
+
+    json_path, textfile = written
+    assert json_path.endswith("_metrics.json")
+    assert json.load(open(json_path))["stages"]["hash"]["bytes"] == 100
+    assert textfile == str(tmp_path / "metrics" / "backup_service.prom")
+    assert open(textfile).read() == run.prometheus(json.load(open(json_path)))
+    assert sorted(os.listdir(tmp_path / "metrics")) == sorted(os.path.basename(path) for path in written)
+
+
+def test_write_is_off_when_asked(tmp_path, monkeypatch):
+    monkeypatch.setenv("METRICS_LOCATION", "off")
+
+    assert RunMetrics().write() == []
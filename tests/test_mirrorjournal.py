@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+from diffoperations import ChangedEntry, MovedEntry
+from drivemirroroperations import DriveMirror
+from mirrorjournal import MirrorJournal, JOURNAL_NAME
+from scanoperations import ScanEntry
+
+ENGINEER = "Test Engineer"
+
+
+def test_pending_returns_the_outstanding_operations(tmp_path):
+    operations = [
+        ("new", ScanEntry("a.wav", 1, 10)),
+        ("changed", ChangedEntry("b.wav", 2, 20, "size")),
+        ("moved", MovedEntry("c.wav", 3, 30, "old/c.wav", "d" * 32)),
+        ("removed", ScanEntry("e.wav", 4, 40)),
+    ]
+    journal = MirrorJournal(str(tmp_path))
+    journal.begin(operations)
+    journal.record_done("new", "a.wav", [["a.wav", 1, 10, "a" * 32]])
+    journal.record_done("moved", "c.wav", [["old/c.wav", None, None, None]])
+    with open(tmp_path / JOURNAL_NAME, "a") as f:
+        f.write('{"type": "done", "kind": "chan')  # crash mid-append
+
+    resumed = MirrorJournal(str(tmp_path))
+
+    assert resumed.pending() == [operations[1], operations[3]]
+    assert resumed.completed_updates == [["a.wav", 1, 10, "a" * 32], ["old/c.wav", None, None, None]]
+
+
+def test_no_journal_means_nothing_to_resume(tmp_path):
+    assert MirrorJournal(str(tmp_path)).pending() is None
+
+
+def test_interrupted_commit_resumes_the_remaining_operations(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHECKSUM_CACHE", "off")
+    source = tmp_path / "source" / ENGINEER
+    source.mkdir(parents=True)
+    for index in range(10):
+        (source / f"take{index}.wav").write_bytes(os.urandom(100))
+    mirror_root = tmp_path / "mirror" / ENGINEER
+    mirror_root.mkdir(parents=True)  # the rescan then stores an (empty) manifest to update
+
+    mirror_job = DriveMirror.mirror_job
+    calls = []
+
+    def interrupted_mirror_job(self, kind, entry, slots):
+        calls.append(entry[0])
+        if len(calls) == 4:
+            raise KeyboardInterrupt
+        return mirror_job(self, kind, entry, slots)
+
+    monkeypatch.setattr(DriveMirror, "mirror_job", interrupted_mirror_job)
+    dmo = DriveMirror(str(source), str(tmp_path / "mirror"), ENGINEER, full_rescan=True)
+    dmo.progress_bar = lambda index, total: None
+    dmo.check_source_mirror_changes()
+    with pytest.raises(KeyboardInterrupt):
+        dmo.commit_file_changes()
+    assert (mirror_root / JOURNAL_NAME).exists()
+
+    monkeypatch.setattr(DriveMirror, "mirror_job", mirror_job)
+    dmo = DriveMirror(str(source), str(tmp_path / "mirror"), ENGINEER)
+    dmo.progress_bar = lambda index, total: None
+    assert dmo.resume_interrupted_commit() is True
+
+    mirrored = sorted(name for name in os.listdir(mirror_root) if not name.startswith("."))
+    assert mirrored == sorted(os.listdir(source))
+    assert not (mirror_root / JOURNAL_NAME).exists()
+    assert sorted(entry.relpath for entry in dmo.manifest.entries()) == mirrored
+    assert DriveMirror(str(source), str(tmp_path / "mirror"), ENGINEER).resume_interrupted_commit() is False
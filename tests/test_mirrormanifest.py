@@ -0,0 +1,53 @@
+from mirrormanifest import MirrorManifest, ManifestEntry
+from scanoperations import ScanEntry
+
+
+def rebuild(mirror_root, scan):
+    manifest = MirrorManifest(str(mirror_root))
+    assert list(manifest.rescan(scan)) == scan
+    drift = manifest.finish_rescan()
+    manifest.save()
+    return manifest, drift
+
+
+def test_changes_round_trip_through_save(tmp_path):
+    manifest, _ = rebuild(tmp_path, [ScanEntry("b.wav", 2, 20), ScanEntry("a.wav", 1, 10), ScanEntry("c.wav", 3, 30)])
+
+    manifest.apply([
+        ["a.wav", 11, 110, "a" * 32],  # replaced
+        ["b.wav", None, None, None],  # removed
+        ["d/e.wav", 5, 50, "e" * 32],  # added
+    ])
+    assert [entry.relpath for entry in manifest.entries()] == ["a.wav", "b.wav", "c.wav"]  # not until saved
+    manifest.save()
+
+    assert list(MirrorManifest(str(tmp_path)).entries()) == [
+        ManifestEntry("a.wav", 11, 110, "a" * 32),
+        ManifestEntry("c.wav", 3, 30, None),
+        ManifestEntry("d/e.wav", 5, 50, "e" * 32),
+    ]
+
+
+def test_rescan_keeps_digests_of_unchanged_files_and_counts_drift(tmp_path):
+    manifest, _ = rebuild(tmp_path, [ScanEntry("a.wav", 1, 10), ScanEntry("b.wav", 2, 20), ScanEntry("c.wav", 3, 30)])
+    manifest.apply([["a.wav", 1, 10, "a" * 32], ["b.wav", 2, 20, "b" * 32]])
+    manifest.save()
+
+    # b.wav changed behind the manifest's back, c.wav deleted, d.wav added
+    manifest, drift = rebuild(tmp_path, [ScanEntry("a.wav", 1, 10), ScanEntry("b.wav", 2, 21), ScanEntry("d.wav", 4, 40)])
+
+    assert drift == 3
+    assert list(manifest.entries()) == [
+        ManifestEntry("a.wav", 1, 10, "a" * 32),
+        ManifestEntry("b.wav", 2, 21, None),
+        ManifestEntry("d.wav", 4, 40, None),
+    ]
+
+
+def test_save_without_a_base_writes_nothing(tmp_path):
+    manifest = MirrorManifest(str(tmp_path))
+    manifest.apply([["a.wav", 1, 10, None]])
+
+    manifest.save()
+
+    assert not manifest.exists()
@@ -0,0 +1,47 @@
+import threading
+
+import pytest
+
+from pipeline import run_pipeline, Stage
+
+
+def test_items_flow_through_every_stage():
+    seen = []
+    lock = threading.Lock()
+
+    def record(name):
+        def function(item):
+            with lock:
+                seen.append((name, item))
+        return function
+
+    stages = [Stage("a", record("a"), 2, True), Stage("b", record("b"), 1, True)]
+
+    results = list(run_pipeline(range(10), stages, queue_size=1))
+
+    assert sorted(result.item for result in results if result.completed) == list(range(10))
+    assert len(seen) == 20
+
+
+def test_required_stage_failure_stops_the_item_optional_does_not():
+    def fail_odd(item):
+        if item % 2:
+            raise ValueError("odd")
+
+    stages = [Stage("optional", fail_odd, 1, False), Stage("required", fail_odd, 1, True)]
+
+    results = {result.item: result for result in run_pipeline(range(4), stages)}
+
+    assert [results[item].completed for item in range(4)] == [True, False, True, False]
+    assert results[1].errors == [("optional", "odd"), ("required", "odd")]
+
+
+@pytest.mark.parametrize("workers, queue_size", [(0, 2), (1, 0)])
+def test_settings_that_would_deadlock_are_refused_before_running(workers, queue_size):
+    called = []
+    stages = [Stage("a", called.append, workers, True)]
+
+    with pytest.raises(ValueError):
+        run_pipeline([1, 2], stages, queue_size=queue_size)
+
+    assert called == []
@@ -0,0 +1,56 @@
+import os
+
+from postoperations import PostBackupOperations
+
+FFMPEG_STUB = '#!/bin/sh\nsleep 0.05\nfor arg; do last="$arg"; done\nprintf "m4a" > "$last"\n'
+
+
+def test_concurrent_encodes_file_each_access_copy_under_its_own_collection(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "ffmpeg").write_text(FFMPEG_STUB)
+    os.chmod(bin_dir / "ffmpeg", 0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("MSO_STORE", str(tmp_path / "mso"))
+    staging = tmp_path / "staging"
+    staging.mkdir()
+    wav_files = []
+    for index in range(12):
+        wav_file = staging / f"C{index:03}_C{index:03}-0001_0001.wav"
+        wav_file.write_bytes(b"\x00" * (index + 1))
+        wav_files.append(str(wav_file))
+
+    pbo = PostBackupOperations(str(staging))
+    results = list(pbo.batch_access_file_generate(wav_files, max_workers=6))
+
+    assert sorted(result.wav_file for result in results if result.error is None) == sorted(wav_files)
+    for index in range(12):
+        assert os.listdir(tmp_path / "mso" / f"C{index:03}") == [f"C{index:03}_C{index:03}-0001_0001.m4a"]
+
+
+def test_encode_of_wav_under_a_dotted_directory(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "ffmpeg").write_text(FFMPEG_STUB)
+    os.chmod(bin_dir / "ffmpeg", 0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("MSO_STORE", str(tmp_path / "mso"))
+    staging = tmp_path / "tmp.x1Y2" / "staging.d"
+    staging.mkdir(parents=True)
+    wav_file = staging / "C1234_C1234-0001_0001.wav"
+    wav_file.write_bytes(b"\x00")
+
+    pbo = PostBackupOperations(str(staging))
+
+    assert pbo.get_shelfmark(str(wav_file)) == "C1234"
+    pbo.access_file_generate(str(wav_file))
+    assert os.listdir(tmp_path / "mso" / "C1234") == ["C1234_C1234-0001_0001.m4a"]
+
+
+def test_get_shelfmark_sets_no_state(tmp_path):
+    pbo = PostBackupOperations(str(tmp_path))
+    before = dict(vars(pbo))
+
+    assert pbo.get_shelfmark("/staging/C1234_C1234-0001_0001.wav") == "C1234"
+    assert pbo.get_shelfmark("/staging/C1234_1CD0012345_0001.wav") == "1CD"
+    assert vars(pbo) == before
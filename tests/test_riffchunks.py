@@ -0,0 +1,170 @@
+import struct
+
+import pytest
+
+from metadataoperations import WavHeaderRewrite, BLANKED_BEXT_FIELDS
+from riffchunks import read_wav_header, data_range, plan_header_rewrite, apply_header_rewrite, verify_header_rewrite
+from synthetic_wav import AUDIO, write_wav, fmt_chunk, bext_chunk, info_chunk, data_chunk, chunk
+
+ENGINEER = "Test Engineer"
+ODD_AUDIO = AUDIO[:-1]
+
+
+def audio_bytes(file):
+    offset, size = data_range(read_wav_header(file))
+    with open(file, "rb") as f:
+        f.seek(offset)
+        return f.read(size)
+
+
+def riff_size(file):
+    with open(file, "rb") as f:
+        return struct.unpack("<I", f.read(8)[4:])[0]
+
+
+def rewrite(file):
+    whr = WavHeaderRewrite()
+    whr.file_bext_export(file)
+    return whr.file_info_import(file, ENGINEER)
+
+
+LAYOUTS = {
+    "info before data": [bext_chunk(), fmt_chunk(), info_chunk({"ICMT": "note"}), data_chunk()],
+    "info after data": [bext_chunk(), fmt_chunk(), data_chunk(), info_chunk({"ICMT": "note"})],
+    "smaller replacement info": [bext_chunk(), fmt_chunk(), info_chunk({"ICMT": "x", "IENG": "x" * 400}), data_chunk()],
+    "larger replacement info": [bext_chunk(), fmt_chunk(), info_chunk({"ICMT": "x"}), data_chunk()],
+    "junk after data": [bext_chunk(), fmt_chunk(), data_chunk(), chunk(b"JUNK", b"\x00" * 100)],
+    "no info": [bext_chunk(), fmt_chunk(), data_chunk()],
+    "odd data with pad": [bext_chunk(), fmt_chunk(), data_chunk(ODD_AUDIO)],
+    "odd data without pad": [bext_chunk(), fmt_chunk(), data_chunk(ODD_AUDIO, pad=False)],
+    "info after odd data": [bext_chunk(), fmt_chunk(), data_chunk(ODD_AUDIO), info_chunk({"ICMT": "note"})],
+}
+
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+def test_native_rewrite(tmp_path, layout):
+    file = write_wav(tmp_path / "test.wav", LAYOUTS[layout])
+    audio = audio_bytes(file)
+    original_info = read_wav_header(file).info
+
+    plan = rewrite(file)
+
+    assert plan is not None  # written natively, not by bwfmetaedit
+    header = read_wav_header(file)
+    assert header.info["IARL"] == "GB, BL"
+    assert header.info["ICRD"] == "2024-01-01T10:00:00Z"
+    assert header.info["IENG"] == ENGINEER
+    assert header.info["ISFT"] == "Synthetic Recorder"
+    assert header.info.get("ICMT") == original_info.get("ICMT")  # other entries are kept
+    for field in BLANKED_BEXT_FIELDS:
+        assert header.bext[field] == ""
+    assert header.bext["description"] == "Synthetic recording"
+    assert riff_size(file) == len(open(file, "rb").read()) - 8
+    assert audio_bytes(file) == audio
+    assert [c.id for c in header.chunks].count(b"data") == 1
+    assert all(c.offset % 2 == 0 for c in header.chunks)
+
+
+def test_smaller_info_is_patched_in_place_with_junk_filler(tmp_path):
+    file = write_wav(tmp_path / "test.wav", LAYOUTS["smaller replacement info"])
+    size = len(open(file, "rb").read())
+
+    plan = rewrite(file)
+
+    assert plan.tail_offset is None
+    assert len(open(file, "rb").read()) == size
+    ids = [c.id for c in read_wav_header(file).chunks]
+    assert ids.index(b"LIST") < ids.index(b"JUNK") < ids.index(b"data")
+
+
+def test_larger_info_is_appended_and_old_one_junked(tmp_path):
+    file = write_wav(tmp_path / "test.wav", LAYOUTS["larger replacement info"])
+
+    rewrite(file)
+
+    ids = [c.id for c in read_wav_header(file).chunks]
+    assert ids == [b"bext", b"fmt ", b"JUNK", b"data", b"LIST"]
+
+
+def test_info_after_data_is_replaced(tmp_path):
+    file = write_wav(tmp_path / "test.wav", LAYOUTS["info after data"])
+
+    rewrite(file)
+
+    ids = [c.id for c in read_wav_header(file).chunks]
+    assert ids == [b"bext", b"fmt ", b"data", b"LIST"]
+
+
+def test_junk_after_data_is_kept(tmp_path):
+    file = write_wav(tmp_path / "test.wav", LAYOUTS["junk after data"])
+
+    rewrite(file)
+
+    ids = [c.id for c in read_wav_header(file).chunks]
+    assert ids == [b"bext", b"fmt ", b"data", b"JUNK", b"LIST"]
+
+
+def test_odd_data_without_pad_gets_pad_byte_before_info(tmp_path):
+    file = write_wav(tmp_path / "test.wav", LAYOUTS["odd data without pad"])
+
+    rewrite(file)
+
+    header = read_wav_header(file)
+    data, info = header.chunks[-2:]
+    assert (data.id, info.id) == (b"data", b"LIST")
+    assert info.offset == data.offset + 8 + len(ODD_AUDIO) + 1
+    with open(file, "rb") as f:
+        f.seek(info.offset - 1)
+        assert f.read(1) == b"\x00"
+
+
+def test_dry_run_leaves_file_unchanged(tmp_path):
+    file = write_wav(tmp_path / "test.wav", LAYOUTS["info before data"])
+    original = open(file, "rb").read()
+    whr = WavHeaderRewrite()
+    whr.file_bext_export(file)
+
+    plan = whr.file_info_import(file, ENGINEER, dry_run=True)
+
+    assert plan is not None and plan.patches != []
+    assert open(file, "rb").read() == original
+
+
+def test_verify_reports_unapplied_rewrite(tmp_path):
+    file = write_wav(tmp_path / "test.wav", LAYOUTS["no info"])
+    updates = {"IARL": "GB, BL"}
+
+    assert verify_header_rewrite(file, updates, BLANKED_BEXT_FIELDS) != []
+    apply_header_rewrite(file, plan_header_rewrite(file, updates, BLANKED_BEXT_FIELDS))
+    assert verify_header_rewrite(file, updates, BLANKED_BEXT_FIELDS) == []
+
+
+def test_rf64_is_not_planned(tmp_path):
+    file = write_wav(tmp_path / "test.wav", LAYOUTS["no info"])
+    with open(file, "r+b") as f:
+        f.write(b"RF64")
+
+    with pytest.raises(ValueError):
+        plan_header_rewrite(file, {"IARL": "GB, BL"})
+
+
+def test_short_bext_is_refused_at_planning(tmp_path):
+    file = write_wav(tmp_path / "test.wav", [chunk(b"bext", b"\x00" * 100), fmt_chunk(), data_chunk()])
+
+    with pytest.raises(ValueError, match="bext"):
+        plan_header_rewrite(file, {"IARL": "GB, BL"}, BLANKED_BEXT_FIELDS)
+    assert plan_header_rewrite(file, {"IARL": "GB, BL"}).file_size > 0  # nothing to blank
+
+
+def test_stray_bytes_after_last_chunk_are_dropped(tmp_path):
+    file = write_wav(tmp_path / "test.wav", LAYOUTS["smaller replacement info"])
+    size = len(open(file, "rb").read())
+    with open(file, "ab") as f:
+        f.write(b"\xff" * 3)
+
+    plan = rewrite(file)
+
+    assert plan.tail_offset is None
+    assert len(open(file, "rb").read()) == size
+    assert riff_size(file) == size - 8
+    assert audio_bytes(file) == AUDIO
@@ -0,0 +1,107 @@
+import os
+import threading
+import time
+
+import diffoperations
+import scanoperations
+from diffoperations import diff_trees
+from scanoperations import scan_trees_concurrently, ScanEntry
+
+
+def make_tree(root, count):
+    for index in range(count):
+        folder = os.path.join(root, f"dir_{index // 100:03}")
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"file_{index:05}.wav"), "wb") as f:
+            f.write(b"x" * (index % 7))
+
+
+def test_scans_yield_every_file(tmp_path):
+    make_tree(tmp_path / "a", 250)
+    make_tree(tmp_path / "b", 30)
+
+    a, b = scan_trees_concurrently(str(tmp_path / "a"), str(tmp_path / "b"))
+
+    assert len({entry.relpath for entry in b}) == 30
+    assert len({entry.relpath for entry in a}) == 250
+
+
+def test_unread_stream_buffers_a_bounded_number_of_records(tmp_path, monkeypatch):
+    monkeypatch.setattr(scanoperations, "SCAN_BATCH_SIZE", 10)
+    monkeypatch.setattr(scanoperations, "SCAN_QUEUE_SIZE", 2)
+    make_tree(tmp_path / "source", 20)
+    make_tree(tmp_path / "mirror", 500)
+
+    source, mirror = scan_trees_concurrently(str(tmp_path / "source"), str(tmp_path / "mirror"))
+    assert len(list(source)) == 20
+    time.sleep(0.5)  # give the mirror scan time to run ahead
+
+    assert mirror.queue.qsize() <= 2
+    assert len(list(mirror)) == 500
+
+
+def test_diff_reads_both_scans_in_turn(monkeypatch):
+    monkeypatch.setattr(diffoperations, "INTERLEAVE_BATCH_SIZE", 10)
+    reads = []
+
+    def side(name, count):
+        for index in range(count):
+            reads.append(name)
+            yield ScanEntry(f"{name}_{index:03}.wav", 1, 1)
+
+    results = list(diff_trees(side("source", 35), side("mirror", 25)))
+
+    assert len(results) == 60
+    first_switches = [reads[index] for index in range(0, 40, 10)]
+    assert first_switches == ["source", "mirror", "source", "mirror"]
+
+
+def test_diff_of_two_scans_with_small_queues(tmp_path, monkeypatch):
+    monkeypatch.setattr(scanoperations, "SCAN_BATCH_SIZE", 10)
+    monkeypatch.setattr(scanoperations, "SCAN_QUEUE_SIZE", 2)
+    make_tree(tmp_path / "source", 400)
+    make_tree(tmp_path / "mirror", 300)
+
+    source, mirror = scan_trees_concurrently(str(tmp_path / "source"), str(tmp_path / "mirror"))
+    kinds = [kind for kind, *_ in diff_trees(source, mirror)]
+
+    assert kinds.count("new") == 100
+    assert kinds.count("changed") == 0
+
+
+def test_closed_stream_stops_its_scan(tmp_path, monkeypatch):
+    monkeypatch.setattr(scanoperations, "SCAN_BATCH_SIZE", 10)
+    monkeypatch.setattr(scanoperations, "SCAN_QUEUE_SIZE", 1)
+    make_tree(tmp_path / "tree", 300)
+
+    (stream,) = scan_trees_concurrently(str(tmp_path / "tree"))
+    next(stream)
+    stream.close()
+
+    deadline = time.monotonic() + 5
+    while any(thread.name == f"scan:{tmp_path / 'tree'}" for thread in threading.enumerate()):
+        assert time.monotonic() < deadline, "scan thread still running after its stream was closed"
+        time.sleep(0.05)
+    assert list(stream) == []
+
+
+def test_scan_tree_records_relative_paths_sizes_and_mtimes(tmp_path):
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    (tmp_path / "a" / "b" / "take.wav").write_bytes(b"12345")
+    os.utime(tmp_path / "a" / "b" / "take.wav", ns=(10**18, 10**18))
+    (tmp_path / "top.json").write_bytes(b"{}")
+    (tmp_path / ".hidden.wav").write_bytes(b"x")
+    (tmp_path / ".hidden_dir").mkdir()
+    (tmp_path / ".hidden_dir" / "take.wav").write_bytes(b"x")
+    os.symlink(tmp_path / "a", tmp_path / "loop")  # directory symlinks are not followed
+
+    entries = sorted(scanoperations.scan_tree(str(tmp_path), max_workers=2))
+
+    assert entries == [
+        ScanEntry(os.path.join("a", "b", "take.wav"), 5, 10**18),
+        ScanEntry("top.json", 2, os.stat(tmp_path / "top.json").st_mtime_ns),
+    ]
+
+
+def test_scan_of_a_missing_root_yields_nothing(tmp_path):
+    assert list(scanoperations.scan_tree(str(tmp_path / "missing"))) == []
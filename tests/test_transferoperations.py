@@ -0,0 +1,176 @@
+import errno
+import hashlib
+import os
+
+import pytest
+
+import transferoperations
+from transferoperations import reflink, transfer_file
+
+DATA = os.urandom(256 * 1024)
+
+
+class FakeFcntl:
+    """Stands in for FICLONE (not available on every test filesystem) by copying, optionally corrupting."""
+
+    def __init__(self, corrupt=False):
+        self.corrupt = corrupt
+
+    def ioctl(self, dst, request, src):
+        data = bytearray(os.pread(src, len(DATA) + 1, 0))
+        if self.corrupt:
+            data[100] ^= 0xFF
+        os.pwrite(dst, bytes(data), 0)
+
+
+@pytest.fixture
+def staged(tmp_path):
+    source = tmp_path / "staged.wav"
+    source.write_bytes(DATA)
+    (tmp_path / "staged.wav.md5").write_text(f"{hashlib.md5(DATA).hexdigest()} *staged.wav")
+    (tmp_path / "backup").mkdir()
+    return str(source)
+
+
+def test_reflink_reads_back_the_clone(tmp_path, staged, monkeypatch):
+    monkeypatch.setattr(transferoperations, "fcntl", FakeFcntl())
+    destination = str(tmp_path / "backup" / "staged.wav")
+
+    reflink(staged, destination)
+
+    assert open(destination, "rb").read() == DATA
+
+
+def test_reflink_detects_a_bad_clone_even_with_a_cached_source_digest(tmp_path, staged, monkeypatch):
+    class Cache:
+        def get(self, file, algorithms=()):
+            return {"md5": hashlib.md5(DATA).hexdigest()}
+
+        def put(self, file, digests, stat=None):
+            pass
+
+    monkeypatch.setattr(transferoperations, "fcntl", FakeFcntl(corrupt=True))
+    destination = str(tmp_path / "backup" / "staged.wav")
+
+    with pytest.raises(ValueError):
+        reflink(staged, destination, Cache())
+
+    assert not os.path.exists(destination)
+    assert open(staged, "rb").read() == DATA
+
+
+def failing_second_rename(error):
+    rename = os.rename
+    calls = []
+
+    def fake_rename(source, destination):
+        calls.append(source)
+        if len(calls) == 2:
+            raise OSError(error, os.strerror(error))
+        rename(source, destination)
+
+    return fake_rename
+
+
+def test_failed_sidecar_rename_moves_the_file_back(tmp_path, staged, monkeypatch):
+    monkeypatch.setattr(transferoperations.os, "rename", failing_second_rename(errno.EACCES))
+
+    result = transfer_file(staged, str(tmp_path / "backup"), [f"{staged}.md5"], mode="rename")
+
+    assert result.error is not None
+    assert os.listdir(tmp_path / "backup") == []
+    assert open(staged, "rb").read() == DATA
+    assert os.path.exists(f"{staged}.md5")
+
+
+def test_refused_sidecar_rename_falls_back_to_copying_the_whole_group(tmp_path, staged, monkeypatch):
+    monkeypatch.setattr(transferoperations.os, "rename", failing_second_rename(errno.EXDEV))
+
+    result = transfer_file(staged, str(tmp_path / "backup"), [f"{staged}.md5"], mode="rename")
+
+    assert (result.error, result.method) == (None, "copy")
+    assert sorted(os.listdir(tmp_path / "backup")) == ["staged.wav", "staged.wav.md5"]
+    assert open(tmp_path / "backup" / "staged.wav", "rb").read() == DATA
+    assert not os.path.exists(staged) and not os.path.exists(f"{staged}.md5")
+
+
+def test_bad_sidecar_copy_fails_the_transfer_and_keeps_the_staged_files(tmp_path, staged, monkeypatch):
+    def corrupting_copy2(source, destination):
+        destination = os.path.join(destination, os.path.basename(source))
+        with open(destination, "w") as f:
+            f.write("0" * 32)
+        return destination
+
+    monkeypatch.setattr(transferoperations, "copy2", corrupting_copy2)
+
+    result = transfer_file(staged, str(tmp_path / "backup"), [f"{staged}.md5"], mode="copy")
+
+    assert result.error is not None
+    assert os.listdir(tmp_path / "backup") == []
+    assert open(staged, "rb").read() == DATA
+    assert os.path.exists(f"{staged}.md5")
+
+
+class RefusingFcntl:
+    """A filesystem without clone support."""
+
+    def ioctl(self, dst, request, src):
+        raise OSError(errno.EOPNOTSUPP, os.strerror(errno.EOPNOTSUPP))
+
+
+def refusing_rename(source, destination):
+    raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+
+
+def test_auto_mode_renames_on_one_device(tmp_path, staged):
+    inode = os.stat(staged).st_ino
+
+    result = transfer_file(staged, str(tmp_path / "backup"), [f"{staged}.md5"], mode="auto")
+
+    assert (result.error, result.method) == (None, "rename")
+    assert os.stat(tmp_path / "backup" / "staged.wav").st_ino == inode
+
+
+@pytest.mark.parametrize("fcntl, method", [(FakeFcntl(), "reflink"), (RefusingFcntl(), "copy")])
+def test_auto_mode_falls_back_when_rename_crosses_devices(tmp_path, staged, monkeypatch, fcntl, method):
+    monkeypatch.setattr(transferoperations.os, "rename", refusing_rename)
+    monkeypatch.setattr(transferoperations, "fcntl", fcntl)
+
+    result = transfer_file(staged, str(tmp_path / "backup"), [f"{staged}.md5"], mode="auto")
+
+    assert (result.error, result.method) == (None, method)
+    assert sorted(os.listdir(tmp_path / "backup")) == ["staged.wav", "staged.wav.md5"]
+    assert open(tmp_path / "backup" / "staged.wav", "rb").read() == DATA
+    assert not os.path.exists(staged) and not os.path.exists(f"{staged}.md5")
+
+
+def test_hardlink_mode_links_a_file_with_no_other_link(tmp_path, staged):
+    inode = os.stat(staged).st_ino
+
+    result = transfer_file(staged, str(tmp_path / "backup"), [f"{staged}.md5"], mode="hardlink")
+
+    assert (result.error, result.method) == (None, "hardlink")
+    assert os.stat(tmp_path / "backup" / "staged.wav").st_ino == inode
+    assert os.stat(tmp_path / "backup" / "staged.wav").st_nlink == 1
+    assert not os.path.exists(staged)
+
+
+def test_hardlink_mode_copies_a_file_with_other_links(tmp_path, staged, monkeypatch):
+    monkeypatch.setattr(transferoperations, "fcntl", RefusingFcntl())
+    os.link(staged, tmp_path / "other-name.wav")
+
+    result = transfer_file(staged, str(tmp_path / "backup"), [f"{staged}.md5"], mode="hardlink")
+
+    assert (result.error, result.method) == (None, "copy")
+    assert os.stat(tmp_path / "backup" / "staged.wav").st_ino != os.stat(tmp_path / "other-name.wav").st_ino
+
+
+def test_copy_of_a_file_that_no_longer_matches_its_sidecar_fails(tmp_path, staged):
+    with open(staged, "r+b") as f:
+        f.write(bytes([DATA[0] ^ 0xFF]))
+
+    result = transfer_file(staged, str(tmp_path / "backup"), [f"{staged}.md5"], mode="copy")
+
+    assert result.error is not None
+    assert os.listdir(tmp_path / "backup") == []
+    assert os.path.exists(staged) and os.path.exists(f"{staged}.md5")
@@ -0,0 +1,102 @@
+import hashlib
+import struct
+
+import pytest
+
+from metadataoperations import WavHeaderRewrite
+from riffchunks import read_wav_header, data_range, RF64_PLACEHOLDER
+from synthetic_wav import AUDIO, write_wav, fmt_chunk, bext_chunk, info_chunk, data_chunk, chunk
+
+
+def test_header_fields_are_read_without_the_audio(tmp_path):
+    md5 = hashlib.md5(AUDIO).digest()
+    file = write_wav(
+        tmp_path / "take.wav",
+        [fmt_chunk(), bext_chunk(), info_chunk({"ICMT": "note", "ITCH": "Tech"}), chunk(b"MD5 ", md5), data_chunk()],
+    )
+
+    header = read_wav_header(file)
+
+    assert header.form == b"RIFF"
+    assert [(c.id, c.list_type) for c in header.chunks] == [
+        (b"fmt ", None), (b"bext", None), (b"LIST", b"INFO"), (b"MD5 ", None), (b"data", None),
+    ]
+    assert header.fmt == {
+        "audio_format": 1, "channels": 2, "sample_rate": 96000, "byte_rate": 576000,
+        "block_align": 6, "bits_per_sample": 24,
+    }
+    assert header.bext == {
+        "description": "Synthetic recording",
+        "originator": "Synthetic Recorder",
+        "originator_reference": "SYNTH",
+        "origination_date": "2024-01-01",
+        "origination_time": "10-00-00",
+    }
+    assert header.info == {"ICMT": "note", "ITCH": "Tech"}
+    assert header.audio_md5 == md5.hex()
+    offset, size = data_range(header)
+    with open(file, "rb") as f:
+        f.seek(offset)
+        assert f.read(size) == AUDIO
+
+
+def test_rf64_data_size_comes_from_the_ds64_chunk(tmp_path):
+    ds64 = chunk(b"ds64", struct.pack("<QQQI", 0, len(AUDIO), 0, 0))
+    data = struct.pack("<4sI", b"data", RF64_PLACEHOLDER) + AUDIO
+    path = tmp_path / "take.wav"
+    path.write_bytes(b"RF64" + struct.pack("<I", RF64_PLACEHOLDER) + b"WAVE" + ds64 + fmt_chunk() + data)
+
+    header = read_wav_header(str(path))
+
+    assert header.form == b"RF64"
+    assert data_range(header)[1] == len(AUDIO)
+
+
+@pytest.mark.parametrize("contents", [b"not a wav file", b"RIFF\x04\x00\x00\x00AVI "])
+def test_non_wav_files_are_refused(tmp_path, contents):
+    path = tmp_path / "take.wav"
+    path.write_bytes(contents)
+
+    with pytest.raises(ValueError):
+        read_wav_header(str(path))
+
+
+def test_truncated_md5_chunk_is_refused(tmp_path):
+    file = write_wav(tmp_path / "take.wav", [fmt_chunk(), data_chunk(), struct.pack("<4sI", b"MD5 ", 16) + b"\x00" * 4])
+
+    with pytest.raises(ValueError):
+        read_wav_header(file)
+
+
+def test_bext_export_prefers_bext_fields(tmp_path):
+    file = write_wav(
+        tmp_path / "take.wav",
+        [fmt_chunk(), bext_chunk(), info_chunk({"ITCH": "Tech", "ICRD": "2020-02-02"}), data_chunk()],
+    )
+    whr = WavHeaderRewrite()
+
+    whr.file_bext_export(file)
+
+    assert whr.results == {"encoded_by": "Synthetic Recorder", "date": "2024-01-01", "creation_time": "10-00-00"}
+
+
+def test_bext_export_falls_back_to_info_entries(tmp_path):
+    info = info_chunk({"ITCH": "Tech", "ICRD": "2020-02-02"})
+    bext = bext_chunk(originator="", date="", time="")
+    file = write_wav(tmp_path / "take.wav", [fmt_chunk(), bext, info, data_chunk()])
+    whr = WavHeaderRewrite()
+
+    whr.file_bext_export(file)
+
+    assert whr.results == {"encoded_by": "Tech", "date": "2020-02-02", "creation_time": ""}
+
+
+def test_bext_export_passes_unreadable_files_to_ffprobe(tmp_path, monkeypatch):
+    path = tmp_path / "take.wav"
+    path.write_bytes(b"not a wav file")
+    probed = []
+    monkeypatch.setattr(WavHeaderRewrite, "ffprobe_bext_export", lambda self, wav_file: probed.append(wav_file))
+
+    WavHeaderRewrite().file_bext_export(str(path))
+
+    assert probed == [str(path)]
@@ -0,0 +1,302 @@
+"""Verified transfer of staged files into the backup and MSO locations.
+
+When a staged file and its target directory are on the same device the file
+is moved with an atomic os.rename (or hard link): no data is copied. On one
+filesystem seen through different mounts or btrfs subvolumes, where rename
+is refused, it is cloned with copy-on-write (FICLONE) where the filesystem
+supports it (btrfs, XFS, bcachefs), so only metadata is written, and the
+clone is read back and checked against the .md5 sidecar. Otherwise it
+is copied (to a hidden partial file, renamed into place once complete), the
+copy is flushed to disk and read back, and its MD5 is checked against the
+file's .md5 sidecar (or, for files without one, the digest of the bytes read
+from staging) before the staged file is removed. Sidecars copied with a clone
+or copy are read back and compared byte for byte with the staged sidecar. A
+file and its sidecars move as a group: if one of them cannot be renamed, the
+ones already renamed are moved back. Transfers run concurrently on a bounded
+thread pool.
+
+Each transfer is logged with the method it took and its throughput.
+
+Environment variables used:
+  * TRANSFER_MODE: "auto" (default; rename, else reflink, else copy),
+    "rename", "hardlink", "reflink" or "copy" (see TRANSFER_MODES); each
+    falls back to the next method when the filesystem refuses it.
+  * TRANSFER_WORKERS: concurrent transfers (default 4).
+"""
+import os
+import errno
+import shutil
+import time
+from collections import namedtuple
+from dotenv import load_dotenv
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+from logging_module import logger
+from copyoperations import copy2
+from checksumoperations import copy_and_hash, hash_file, _read_md5_sidecar, _bounded_map
+
+load_dotenv()
+
+FICLONE = 0x40049409  # _IOW(0x94, 9, int) from linux/fs.h
+TRANSFER_MODES = {  # methods tried in order
+    "auto": ["rename", "reflink", "copy"],
+    "rename": ["rename", "copy"],
+    "hardlink": ["hardlink", "reflink", "copy"],
+    "reflink": ["reflink", "copy"],
+    "copy": ["copy"],
+}
+TRANSFER_MODE = (os.getenv("TRANSFER_MODE") or "auto").lower()
+TRANSFER_WORKERS = int(os.getenv("TRANSFER_WORKERS") or 4)
+PARTIAL_SUFFIX = ".transfer-partial"
+FALLBACK_ERRNOS = {  # the filesystem cannot rename, link or clone between the paths
+    errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.ENOSYS, errno.EPERM, errno.EMLINK,
+}
+
+TransferResult = namedtuple("TransferResult", ["source", "destination", "method", "bytes", "elapsed", "error"])
+
+
+def _drop_cached_pages(file):
+    """Ask the kernel to drop a file's cached pages, so reading it back reads the disk."""
+    if hasattr(os, "posix_fadvise"):
+        with open(file, "rb") as f:
+            os.fsync(f.fileno())
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def _partial_path(destination):
+    directory, name = os.path.split(destination)
+    return os.path.join(directory, f".{name}{PARTIAL_SUFFIX}")
+
+
+def _expected_md5(source):
+    """Return the digest in a staged file's .md5 sidecar, or None if it has none."""
+    return _read_md5_sidecar(source) if os.path.exists(f"{source}.md5") else None
+
+
+def verified_copy(source, destination, algorithms=(), cache=None):
+    """Copy a file as per shutil.copy2 and check the copy by reading it back.
+
+    Args:
+        source (str): Staged file.
+        destination (str): Target path (must not exist).
+        algorithms (iterable[str]): Extra digests to compute while copying.
+        cache (ChecksumCache|None): Digest cache to update.
+    Raises:
+        ValueError: If the source no longer matches its .md5 sidecar or the
+            copy does not match the source (the copy is removed).
+        OSError: If the file cannot be read or written.
+    """
+    temp_path = _partial_path(destination)
+    try:
+        digests = copy_and_hash(source, destination, algorithms, cache, temp_path=temp_path)
+        expected = _expected_md5(source) or digests["md5"]
+        if digests["md5"] != expected:
+            raise ValueError(f"{source} does not match its .md5 sidecar")
+        _drop_cached_pages(destination)
+        copied, _ = hash_file(destination)
+        if copied["md5"] != expected:
+            raise ValueError(f"Copy of {source} at {destination} does not match its checksum")
+    except BaseException:
+        for partial in (temp_path, destination):
+            if os.path.exists(partial):
+                os.remove(partial)
+        raise
+
+
+def reflink(source, destination, cache=None):
+    """Clone a file with copy-on-write (FICLONE), as per shutil.copy2 but sharing its blocks.
+
+    The clone is read back and its MD5 checked against the .md5 sidecar
+    (the source's cached digest says nothing about the clone). A file without
+    a sidecar is not checked.
+
+    Args:
+        source (str): Staged file.
+        destination (str): Target path (must not exist).
+        cache (ChecksumCache|None): Digest cache, updated with the clone's digest.
+    Raises:
+        OSError: If the filesystem cannot clone between the two paths
+            (e.g. errno EXDEV, EOPNOTSUPP).
+        ValueError: If the clone does not match the .md5 sidecar (it is removed).
+    """
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "FICLONE is not available on this platform")
+    temp_path = _partial_path(destination)
+    try:
+        with open(source, "rb") as src, open(temp_path, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        shutil.copystat(source, temp_path)
+        os.replace(temp_path, destination)
+        expected = _expected_md5(source)
+        if expected is not None:
+            stat = os.stat(destination)
+            digests, _ = hash_file(destination)
+            if digests["md5"] != expected:
+                raise ValueError(f"Clone of {source} at {destination} does not match its .md5 sidecar")
+            if cache is not None:
+                cache.put(destination, digests, stat)
+    except BaseException:
+        for partial in (temp_path, destination):
+            if os.path.exists(partial):
+                os.remove(partial)
+        raise
+
+
+def _rename_all(pairs):
+    """Rename every source to its destination, or (if one fails) none of them."""
+    renamed = []
+    try:
+        for source, destination in pairs:
+            os.rename(source, destination)
+            renamed.append((source, destination))
+    except BaseException:
+        for source, destination in reversed(renamed):
+            os.rename(destination, source)
+        raise
+
+
+def _copy_sidecar(sidecar, destination_dir):
+    """Copy a checksum sidecar as per shutil.copy2 and check the copy by reading it back.
+
+    Raises:
+        ValueError: If the copy differs from the sidecar (the copy is removed).
+        OSError: If the sidecar cannot be read or written.
+    """
+    destination = copy2(sidecar, destination_dir)
+    _drop_cached_pages(destination)
+    with open(sidecar, "rb") as expected, open(destination, "rb") as copied:
+        if copied.read() != expected.read():
+            os.remove(destination)
+            raise ValueError(f"Copy of {sidecar} at {destination} does not match it")
+
+
+def _hardlink_all(pairs):
+    """Link every source to its destination, then unlink the sources.
+
+    Only used for files with no other link, so the backup copy ends up as
+    the file's only name and nothing else can modify it in place.
+    Never replaces an existing file (os.link fails with EEXIST).
+    """
+    if any(os.stat(source).st_nlink != 1 for source, _ in pairs):
+        raise OSError(errno.EMLINK, "file already has other hard links")
+    linked = []
+    try:
+        for source, destination in pairs:
+            os.link(source, destination)
+            linked.append(destination)
+    except BaseException:
+        for destination in linked:
+            os.remove(destination)
+        raise
+    for source, _ in pairs:
+        os.remove(source)
+
+
+def transfer_file(source, destination_dir, sidecars=(), algorithms=(), cache=None, mode=None):
+    """Move a staged file and its sidecars into destination_dir.
+
+    Transfer methods are tried in the order TRANSFER_MODES gives for the
+    mode, moving on when the filesystem refuses one (different device, no
+    clone support, ...):
+      * rename: atomic os.rename (same device).
+      * hardlink: os.link then unlink the staged file (same device).
+      * reflink: copy-on-write clone (see reflink), e.g. across btrfs
+        subvolumes or bind mounts of one filesystem.
+      * copy: verified_copy.
+    Renames move the file and its sidecars together or not at all. For clones
+    and copies the staged file and its sidecars are only removed once the
+    transferred file and sidecars have verified; if any of them fails, the
+    ones already transferred are removed.
+
+    Args:
+        source (str): Staged file.
+        destination_dir (str): Existing target directory.
+        sidecars (iterable[str]): Checksum sidecars moving with the file.
+        algorithms (iterable[str]): Extra digests to compute while copying.
+        cache (ChecksumCache|None): Digest cache to read and update.
+        mode (str|None): Key of TRANSFER_MODES; defaults to TRANSFER_MODE.
+    Returns:
+        TransferResult: source, destination, method (the one used), bytes,
+            elapsed (seconds) and error (None on success).
+    """
+    start = time.perf_counter()
+    destination = os.path.join(destination_dir, os.path.basename(source))
+    pairs = [(file, os.path.join(destination_dir, os.path.basename(file))) for file in [source, *sidecars]]
+    method = None
+    size = 0
+    try:
+        size = os.path.getsize(source)
+        for _, target in pairs:
+            if os.path.exists(target):
+                raise FileExistsError(f"{target} already exists")
+        mode = mode or TRANSFER_MODE
+        if mode not in TRANSFER_MODES:
+            raise ValueError(f"Unknown transfer mode: {mode}")
+        methods = TRANSFER_MODES[mode]
+        for method in methods:
+            try:
+                if method == "rename":
+                    _rename_all(pairs)
+                elif method == "hardlink":
+                    _hardlink_all(pairs)
+                else:
+                    if method == "reflink":
+                        reflink(source, destination, cache)
+                    else:
+                        verified_copy(source, destination, algorithms, cache)
+                    try:
+                        for sidecar in sidecars:
+                            _copy_sidecar(sidecar, destination_dir)
+                    except BaseException:
+                        for _, target in pairs:
+                            if os.path.exists(target):
+                                os.remove(target)
+                        raise
+                    for file in [source, *sidecars]:
+                        os.remove(file)
+                break
+            except OSError as e:
+                if method == methods[-1] or e.errno not in FALLBACK_ERRNOS:
+                    raise
+                logger.info(f"{method} not possible for {source}, trying {methods[methods.index(method) + 1]}. {e}")
+    except Exception as e:
+        elapsed = time.perf_counter() - start
+        logger.critical(f"Error moving {source} to {destination_dir}. {e}")
+        return TransferResult(source, destination, method, size, elapsed, str(e))
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"{source} moved to {destination_dir} by {method}: {size / 1e6:.1f} MB in {elapsed:.2f}s"
+        f" ({size / 1e6 / max(elapsed, 1e-6):.1f} MB/s)"
+    )
+    return TransferResult(source, destination, method, size, elapsed, None)
+
+
+def transfer_files(files, destination_dir, cs, max_workers=None, mode=None):
+    """Move many staged files (with their checksum sidecars) into destination_dir.
+
+    Args:
+        files (iterable[str]): Staged files (not sidecars).
+        destination_dir (str): Existing target directory.
+        cs (ChecksumService): Provides the sidecars, extra algorithms and cache.
+        max_workers (int|None): Concurrent transfers; defaults to TRANSFER_WORKERS.
+        mode (str|None): Key of TRANSFER_MODES; defaults to TRANSFER_MODE.
+    Yields:
+        TransferResult: One per file, in completion order.
+    """
+    def worker(file):
+        return transfer_file(file, destination_dir, cs.checksum_sidecars(file), cs.algorithms, cs.cache, mode)
+
+    start = time.perf_counter()
+    total = 0
+    for result in _bounded_map(worker, files, max_workers or TRANSFER_WORKERS):
+        total += result.bytes
+        yield result
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Transfer to {destination_dir}: {total / 1e6:.1f} MB in {elapsed:.2f}s"
+        f" ({total / 1e6 / max(elapsed, 1e-6):.1f} MB/s)"
+    )